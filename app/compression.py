@@ -0,0 +1,98 @@
+from collections.abc import Callable
+from time import thread_time
+from typing import Protocol
+from zlib import DEFLATED, compressobj
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+
+class Encoder(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class GzipEncoder:
+    __slots__ = ("compressor",)
+
+    def __init__(self, level: int = 6) -> None:
+        self.compressor = compressobj(level, DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliEncoder:
+    __slots__ = ("compressor",)
+
+    def __init__(self, quality: int = 4) -> None:
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdEncoder:
+    __slots__ = ("compressor",)
+
+    def __init__(self, level: int = 3) -> None:
+        self.compressor = zstd.ZstdCompressor(level=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+ENCODERS: dict[str, Callable[[], Encoder]] = {"gzip": GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = BrotliEncoder
+if zstd is not None:
+    ENCODERS["zstd"] = ZstdEncoder
+
+
+def accepted_encodings(accept_encoding: str) -> tuple[set[str], set[str]]:
+    accepted: set[str] = set()
+    refused: set[str] = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        try:
+            quality = float(params.strip().lower().removeprefix("q=")) if params else 1.0
+        except ValueError:
+            quality = 1.0
+        (accepted if quality > 0 else refused).add(coding.strip().lower())
+    return accepted, refused
+
+
+def negotiate(accept_encoding: str, encodings: list[str] | tuple[str, ...]) -> str | None:
+    accepted, refused = accepted_encodings(accept_encoding)
+    for encoding in encodings:
+        if encoding in accepted or ("*" in accepted and encoding not in refused):
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith(("json", "xml", "javascript"))
+
+
+def timed(fn: Callable[[bytes], bytes], data: bytes) -> tuple[bytes, float]:
+    start = thread_time()
+    output = fn(data)
+    return output, thread_time() - start
@@ -11,9 +11,54 @@ HOP_BY_HOP_HEADERS = {
     "upgrade",
 }
 
+REQUEST_SKIP_HEADERS = frozenset(
+    name.encode("latin1") for name in HOP_BY_HOP_HEADERS | {"host", "content-length"}
+)
+
+RESPONSE_SKIP_HEADERS = frozenset(
+    name.encode("latin1") for name in HOP_BY_HOP_HEADERS | {"content-length", "date", "server"}
+)
+
+SAFE_METHODS = {"GET", "HEAD"}
+
+CACHEABLE_STATUS_CODES = {200, 203, 204, 300, 301, 404, 410}
+
+REQUEST_KEY_HEADERS = ("authorization", "cookie", "x-api-key", "accept", "accept-encoding")
+
+METRIC_ROUTES = {"auth", "depex", "vexgen"}
+
+PROXY_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH")
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"}
+
+OPENAPI_OPERATIONS = frozenset({"get", "put", "post", "delete", "options", "head", "patch", "trace"})
+
+OPENAPI_SERVICE_TAGS = {
+    "auth": ("Secure Chain Auth", {"/user": "User", "/api-keys": "API Keys"}),
+    "depex": (
+        "Secure Chain Depex",
+        {"/graph/": "Graph", "/operation/ssc/": "Operation/SSC", "/operation/smt/": "Operation/SMT"},
+    ),
+    "vexgen": ("Secure Chain VEXGen", {"/vex/": "VEX", "/tix/": "TIX", "/vex_tix/": "VEX/TIX"}),
+}
+
+FALLBACK_OPENAPI_SCHEMA = {
+    "openapi": "3.1.0",
+    "info": {"title": "Error", "version": "0.0.0"},
+    "paths": {},
+}
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
 
 class RateLimit(str, Enum):
     HEALTH_CHECK = "25/minute"
+    ADMIN = "25/minute"
+    PROXY_DEFAULT = "75/minute"
     PROXY_AUTH = "75/minute"
     PROXY_DEPEX = "75/minute"
     PROXY_VEXGEN = "75/minute"
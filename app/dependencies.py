@@ -1,11 +1,44 @@
-from app.utils import JSONEncoder, OpenAPIManager, ProxyHandler
+from hmac import compare_digest
+
+from fastapi import Header, HTTPException, status
+
+from app.constants import RateLimit
+from app.settings import settings
+from app.utils import (
+    AdmissionController,
+    CircuitBreaker,
+    JSONEncoder,
+    LoadBalancer,
+    OpenAPIManager,
+    OpenAPIRefresher,
+    ProxyHandler,
+    RequestProfiler,
+    ResponseCache,
+    RetryBudget,
+    RetryPolicy,
+    ServiceRegistry,
+    SingleFlight,
+    TimeoutPolicy,
+    UpstreamPool,
+)
 
 
 class ServiceContainer:
     instance: ServiceContainer | None = None
     json_encoder_obj: JSONEncoder | None = None
+    service_registry_obj: ServiceRegistry | None = None
+    upstream_pool_obj: UpstreamPool | None = None
+    response_cache_obj: ResponseCache | None = None
+    single_flight_obj: SingleFlight | None = None
+    circuit_breakers_obj: dict[str, CircuitBreaker] | None = None
+    admission_controllers_obj: dict[str, AdmissionController] | None = None
+    load_balancer_obj: LoadBalancer | None = None
+    retry_policy_obj: RetryPolicy | None = None
+    timeout_policy_obj: TimeoutPolicy | None = None
     proxy_handler_obj: ProxyHandler | None = None
     openapi_manager_obj: OpenAPIManager | None = None
+    openapi_refresher_obj: OpenAPIRefresher | None = None
+    request_profiler_obj: RequestProfiler | None = None
 
     def __new__(cls) -> ServiceContainer:
         if cls.instance is None:
@@ -18,10 +51,160 @@ class ServiceContainer:
             self.json_encoder_obj = JSONEncoder()
         return self.json_encoder_obj
 
+    @property
+    def service_registry(self) -> ServiceRegistry:
+        if self.service_registry_obj is None:
+            services: dict[str, dict] = {
+                "auth": {
+                    "url": settings.AUTH_SERVICE_URL,
+                    "rate_limit": RateLimit.PROXY_AUTH.value,
+                    "replicas": settings.AUTH_SERVICE_REPLICAS,
+                },
+                "depex": {
+                    "url": settings.DEPEX_SERVICE_URL,
+                    "rate_limit": RateLimit.PROXY_DEPEX.value,
+                    "replicas": settings.DEPEX_SERVICE_REPLICAS,
+                },
+                "vexgen": {
+                    "url": settings.VEXGEN_SERVICE_URL,
+                    "rate_limit": RateLimit.PROXY_VEXGEN.value,
+                    "replicas": settings.VEXGEN_SERVICE_REPLICAS,
+                },
+            }
+            for name, config in settings.GATEWAY_SERVICES.items():
+                services[name] = {**services.get(name, {}), **config}
+            self.service_registry_obj = ServiceRegistry.from_config(services)
+        return self.service_registry_obj
+
+    @property
+    def upstream_pool(self) -> UpstreamPool:
+        if self.upstream_pool_obj is None:
+            self.upstream_pool_obj = UpstreamPool(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+                host_max_connections=settings.UPSTREAM_HOST_MAX_CONNECTIONS,
+                http2=settings.UPSTREAM_HTTP2,
+            )
+        return self.upstream_pool_obj
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self.response_cache_obj is None:
+            self.response_cache_obj = ResponseCache(
+                max_bytes=settings.CACHE_MAX_BYTES,
+                max_entry_bytes=settings.CACHE_MAX_ENTRY_BYTES,
+                default_ttl=settings.CACHE_DEFAULT_TTL,
+                route_ttls=settings.CACHE_ROUTE_TTLS,
+            )
+        return self.response_cache_obj
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        if self.single_flight_obj is None:
+            self.single_flight_obj = SingleFlight()
+        return self.single_flight_obj
+
+    @property
+    def circuit_breakers(self) -> dict[str, CircuitBreaker]:
+        if self.circuit_breakers_obj is None:
+            self.circuit_breakers_obj = {}
+            if settings.CIRCUIT_BREAKER_ENABLED:
+                for route in sorted(self.service_registry.routes):
+                    self.circuit_breakers_obj[route] = CircuitBreaker(
+                        route,
+                        window=settings.CIRCUIT_BREAKER_WINDOW,
+                        min_requests=settings.CIRCUIT_BREAKER_MIN_REQUESTS,
+                        error_rate=settings.CIRCUIT_BREAKER_ERROR_RATE,
+                        slow_call_duration=settings.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+                        slow_call_rate=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                        open_duration=settings.CIRCUIT_BREAKER_OPEN_DURATION,
+                        half_open_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+                    )
+        return self.circuit_breakers_obj
+
+    @property
+    def admission_controllers(self) -> dict[str, AdmissionController]:
+        if self.admission_controllers_obj is None:
+            self.admission_controllers_obj = {}
+            if settings.ADMISSION_CONTROL_ENABLED:
+                for route, service in sorted(self.service_registry.routes.items()):
+                    self.admission_controllers_obj[route] = AdmissionController(
+                        route,
+                        max_concurrency=service.max_concurrency or settings.ADMISSION_MAX_CONCURRENCY,
+                        min_concurrency=settings.ADMISSION_MIN_CONCURRENCY,
+                        queue_size=settings.ADMISSION_QUEUE_SIZE,
+                        target_delay=settings.ADMISSION_TARGET_DELAY,
+                        interval=settings.ADMISSION_INTERVAL,
+                        max_wait=settings.ADMISSION_MAX_WAIT,
+                    )
+        return self.admission_controllers_obj
+
+    @property
+    def load_balancer(self) -> LoadBalancer:
+        if self.load_balancer_obj is None:
+            self.load_balancer_obj = LoadBalancer(
+                upstream_pool=self.upstream_pool,
+                services={
+                    route.url: route.replicas
+                    for route in self.service_registry.routes.values()
+                    if route.replicas
+                },
+                strategy=settings.LOAD_BALANCER_STRATEGY,
+                eject_failures=settings.LOAD_BALANCER_EJECT_FAILURES,
+                eject_duration=settings.LOAD_BALANCER_EJECT_DURATION,
+                health_path=settings.HEALTH_CHECK_PATH,
+                health_timeout=settings.HEALTH_CHECK_TIMEOUT,
+            )
+        return self.load_balancer_obj
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        if self.retry_policy_obj is None:
+            self.retry_policy_obj = RetryPolicy(
+                retry_routes=settings.RETRY_ROUTES,
+                hedge_routes=settings.HEDGE_ROUTES,
+                max_attempts=settings.RETRY_MAX_ATTEMPTS,
+                backoff_base=settings.RETRY_BACKOFF_BASE,
+                backoff_max=settings.RETRY_BACKOFF_MAX,
+                time_budget=settings.RETRY_TIME_BUDGET,
+                hedge_quantile=settings.HEDGE_QUANTILE,
+                hedge_min_delay=settings.HEDGE_MIN_DELAY,
+                budget=RetryBudget(
+                    ratio=settings.RETRY_BUDGET_RATIO,
+                    min_per_second=settings.RETRY_BUDGET_MIN_PER_SECOND,
+                ),
+            )
+        return self.retry_policy_obj
+
+    @property
+    def timeout_policy(self) -> TimeoutPolicy:
+        if self.timeout_policy_obj is None:
+            self.timeout_policy_obj = TimeoutPolicy(
+                connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+                read=settings.UPSTREAM_READ_TIMEOUT,
+                write=settings.UPSTREAM_WRITE_TIMEOUT,
+                pool=settings.UPSTREAM_POOL_TIMEOUT,
+                route_timeouts=settings.UPSTREAM_ROUTE_TIMEOUTS,
+                deadline_header=settings.DEADLINE_HEADER,
+                max_deadline=settings.DEADLINE_MAX,
+            )
+        return self.timeout_policy_obj
+
     @property
     def proxy_handler(self) -> ProxyHandler:
         if self.proxy_handler_obj is None:
-            self.proxy_handler_obj = ProxyHandler()
+            self.proxy_handler_obj = ProxyHandler(
+                upstream_pool=self.upstream_pool,
+                streaming=settings.PROXY_STREAMING,
+                response_cache=self.response_cache if settings.CACHE_ENABLED else None,
+                single_flight=self.single_flight if settings.COALESCE_ENABLED else None,
+                circuit_breakers=self.circuit_breakers,
+                load_balancer=self.load_balancer if self.load_balancer.services else None,
+                retry_policy=self.retry_policy if settings.RETRY_ROUTES or settings.HEDGE_ROUTES else None,
+                timeout_policy=self.timeout_policy,
+                admission_controllers=self.admission_controllers,
+            )
         return self.proxy_handler_obj
 
     @property
@@ -32,19 +215,102 @@ class ServiceContainer:
             )
         return self.openapi_manager_obj
 
+    @property
+    def openapi_refresher(self) -> OpenAPIRefresher:
+        if self.openapi_refresher_obj is None:
+            self.openapi_refresher_obj = OpenAPIRefresher(
+                openapi_manager=self.openapi_manager,
+                upstream_pool=self.upstream_pool,
+                services={
+                    "auth": settings.AUTH_SERVICE_URL,
+                    "depex": settings.DEPEX_SERVICE_URL,
+                    "vexgen": settings.VEXGEN_SERVICE_URL,
+                },
+                timeout=settings.OPENAPI_FETCH_TIMEOUT,
+                service_timeouts=settings.OPENAPI_SERVICE_TIMEOUTS,
+                snapshot_path=settings.OPENAPI_SNAPSHOT_PATH,
+            )
+        return self.openapi_refresher_obj
+
+    @property
+    def request_profiler(self) -> RequestProfiler:
+        if self.request_profiler_obj is None:
+            self.request_profiler_obj = RequestProfiler(
+                directory=settings.PROFILE_DIR,
+                max_files=settings.PROFILE_MAX_FILES,
+                sample_rate=settings.PROFILE_SAMPLE_RATE,
+                token=settings.ADMIN_TOKEN,
+                header=settings.PROFILE_HEADER,
+            )
+        return self.request_profiler_obj
+
     def reset(self) -> None:
         self.json_encoder_obj = None
+        self.service_registry_obj = None
+        self.upstream_pool_obj = None
+        self.response_cache_obj = None
+        self.single_flight_obj = None
+        self.circuit_breakers_obj = None
+        self.admission_controllers_obj = None
+        self.load_balancer_obj = None
+        self.retry_policy_obj = None
+        self.timeout_policy_obj = None
         self.proxy_handler_obj = None
         self.openapi_manager_obj = None
+        self.openapi_refresher_obj = None
+        self.request_profiler_obj = None
 
 
 def get_json_encoder() -> JSONEncoder:
     return ServiceContainer().json_encoder
 
 
+def get_service_registry() -> ServiceRegistry:
+    return ServiceContainer().service_registry
+
+
+def get_upstream_pool() -> UpstreamPool:
+    return ServiceContainer().upstream_pool
+
+
+def get_response_cache() -> ResponseCache:
+    return ServiceContainer().response_cache
+
+
+def get_single_flight() -> SingleFlight:
+    return ServiceContainer().single_flight
+
+
+def get_circuit_breakers() -> dict[str, CircuitBreaker]:
+    return ServiceContainer().circuit_breakers
+
+
+def get_admission_controllers() -> dict[str, AdmissionController]:
+    return ServiceContainer().admission_controllers
+
+
+def get_load_balancer() -> LoadBalancer:
+    return ServiceContainer().load_balancer
+
+
 def get_proxy_handler() -> ProxyHandler:
     return ServiceContainer().proxy_handler
 
 
 def get_openapi_manager() -> OpenAPIManager:
     return ServiceContainer().openapi_manager
+
+
+def get_openapi_refresher() -> OpenAPIRefresher:
+    return ServiceContainer().openapi_refresher
+
+
+def get_request_profiler() -> RequestProfiler:
+    return ServiceContainer().request_profiler
+
+
+def verify_admin_token(x_admin_token: str | None = Header(None)) -> None:
+    if settings.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    if x_admin_token is None or not compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="forbidden")
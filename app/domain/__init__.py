@@ -1,4 +1,34 @@
+from .admission_controller import AdmissionController
+from .circuit_breaker import CircuitBreaker
+from .load_balancer import LoadBalancer, Replica
+from .openapi_document import OpenAPIDocument
 from .openapi_manager import OpenAPIManager
+from .openapi_refresher import OpenAPIRefresher
 from .proxy_handler import ProxyHandler
+from .request_profiler import RequestProfiler
+from .response_cache import ResponseCache
+from .retry_policy import RetryBudget, RetryPolicy
+from .service_registry import ServiceRegistry, ServiceRoute
+from .single_flight import SingleFlight
+from .timeout_policy import TimeoutPolicy
+from .upstream_pool import UpstreamPool
 
-__all__ = ["OpenAPIManager", "ProxyHandler"]
+__all__ = [
+    "AdmissionController",
+    "CircuitBreaker",
+    "LoadBalancer",
+    "OpenAPIDocument",
+    "OpenAPIManager",
+    "OpenAPIRefresher",
+    "ProxyHandler",
+    "Replica",
+    "RequestProfiler",
+    "ResponseCache",
+    "RetryBudget",
+    "RetryPolicy",
+    "ServiceRegistry",
+    "ServiceRoute",
+    "SingleFlight",
+    "TimeoutPolicy",
+    "UpstreamPool",
+]
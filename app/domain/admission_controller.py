@@ -0,0 +1,151 @@
+from asyncio import CancelledError, Future, get_running_loop, timeout
+from collections import deque
+from contextlib import suppress
+from math import ceil
+from time import monotonic
+from typing import Any
+
+from app.logger import logger
+from app.metrics import metrics
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 100,
+        min_concurrency: int = 4,
+        queue_size: int = 100,
+        target_delay: float = 0.1,
+        interval: float = 1.0,
+        max_wait: float = 5.0,
+        backoff: float = 0.9,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.queue_size = queue_size
+        self.target_delay = target_delay
+        self.interval = interval
+        self.max_wait = max_wait
+        self.backoff = backoff
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.waiters: deque[tuple[Future, float]] = deque()
+        self.above_target_until = 0.0
+        self.dropping = False
+        self.decreased_at = 0.0
+        self.admitted = 0
+        self.shed = 0
+        metrics.admission_limit.set((name,), max_concurrency)
+
+    def publish(self) -> None:
+        metrics.admission_in_flight.set((self.name,), self.in_flight)
+        metrics.admission_queue_depth.set((self.name,), len(self.waiters))
+
+    def reject(self, reason: str) -> bool:
+        self.shed += 1
+        metrics.admission_shed.inc((self.name, reason))
+        return False
+
+    def decrease(self, now: float) -> None:
+        if now - self.decreased_at < self.interval:
+            return
+        self.decreased_at = now
+        limit = max(float(self.min_concurrency), self.limit * self.backoff)
+        if int(limit) != int(self.limit):
+            metrics.admission_limit.set((self.name,), int(limit))
+        self.limit = limit
+
+    def increase(self) -> None:
+        limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        if int(limit) != int(self.limit):
+            metrics.admission_limit.set((self.name,), int(limit))
+        self.limit = limit
+
+    def overloaded(self, sojourn: float, now: float) -> bool:
+        if sojourn < self.target_delay:
+            self.above_target_until = 0.0
+            self.dropping = False
+        elif not self.above_target_until:
+            self.above_target_until = now + self.interval
+        elif now >= self.above_target_until and not self.dropping:
+            self.dropping = True
+            self.decrease(now)
+            logger.warning(
+                f"Shedding load for {self.name}: queue delay {sojourn * 1000:.0f}ms over "
+                f"{self.target_delay * 1000:.0f}ms target, concurrency limit {int(self.limit)}"
+            )
+        return self.dropping
+
+    def wake(self) -> None:
+        now = monotonic()
+        while self.waiters and self.in_flight < int(self.limit):
+            future, enqueued_at = self.waiters.popleft()
+            if future.done():
+                continue
+            if self.overloaded(now - enqueued_at, now):
+                future.set_result(self.reject("queue_delay"))
+                continue
+            self.in_flight += 1
+            self.admitted += 1
+            future.set_result(True)
+        if not self.waiters:
+            self.dropping = False
+        self.publish()
+
+    async def acquire(self) -> bool:
+        if not self.waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self.admitted += 1
+            self.publish()
+            return True
+        if self.dropping:
+            return self.reject("queue_delay")
+        if len(self.waiters) >= self.queue_size:
+            return self.reject("queue_full")
+        entry = (get_running_loop().create_future(), monotonic())
+        self.waiters.append(entry)
+        self.publish()
+        future = entry[0]
+        try:
+            async with timeout(self.max_wait):
+                return await future
+        except TimeoutError:
+            if future.done() and not future.cancelled():
+                return future.result()
+            self.discard(entry)
+            return self.reject("timeout")
+        except CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                self.release(None)
+            else:
+                self.discard(entry)
+            raise
+
+    def discard(self, entry: tuple[Future, float]) -> None:
+        with suppress(ValueError):
+            self.waiters.remove(entry)
+        self.publish()
+
+    def release(self, failed: bool | None) -> None:
+        self.in_flight -= 1
+        if failed:
+            self.decrease(monotonic())
+        elif failed is not None and not self.dropping:
+            self.increase()
+        self.wake()
+
+    def retry_after(self) -> int:
+        return max(1, ceil(self.interval))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "dropping": self.dropping,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
@@ -0,0 +1,131 @@
+from collections import deque
+from math import ceil
+from time import monotonic
+from typing import Any
+
+from app.constants import CircuitState
+from app.logger import logger
+from app.metrics import metrics
+
+
+class WindowBucket:
+    __slots__ = ("failures", "second", "slow", "total")
+
+    def __init__(self, second: int) -> None:
+        self.second = second
+        self.total = 0
+        self.failures = 0
+        self.slow = 0
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: float = 30.0,
+        min_requests: int = 20,
+        error_rate: float = 0.5,
+        slow_call_duration: float = 5.0,
+        slow_call_rate: float = 0.8,
+        open_duration: float = 30.0,
+        half_open_calls: int = 3,
+    ) -> None:
+        self.name = name
+        self.window = window
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.buckets: deque[WindowBucket] = deque()
+        self.state = CircuitState.CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        metrics.circuit_state.set((name,), 0)
+
+    def transition(self, state: CircuitState, now: float) -> None:
+        logger.warning(f"Circuit breaker for {self.name} moved from {self.state.value} to {state.value}")
+        self.state = state
+        self.probes = 0
+        self.probe_successes = 0
+        if state is CircuitState.OPEN:
+            self.opened_at = now
+        if state is CircuitState.CLOSED:
+            self.buckets.clear()
+        metrics.circuit_state.set((self.name,), list(CircuitState).index(state))
+        metrics.circuit_transitions.inc((self.name, state.value))
+
+    def trim(self, now: float) -> None:
+        oldest = int(now - self.window)
+        while self.buckets and self.buckets[0].second <= oldest:
+            self.buckets.popleft()
+
+    def totals(self, now: float) -> tuple[int, int, int]:
+        self.trim(now)
+        return (
+            sum(bucket.total for bucket in self.buckets),
+            sum(bucket.failures for bucket in self.buckets),
+            sum(bucket.slow for bucket in self.buckets),
+        )
+
+    def allow(self) -> bool:
+        now = monotonic()
+        if self.state is CircuitState.OPEN and now - self.opened_at >= self.open_duration:
+            self.transition(CircuitState.HALF_OPEN, now)
+        if self.state is CircuitState.CLOSED:
+            return True
+        if self.state is CircuitState.HALF_OPEN and self.probes < self.half_open_calls:
+            self.probes += 1
+            return True
+        self.rejected += 1
+        metrics.circuit_rejected.inc((self.name,))
+        return False
+
+    def discard(self) -> None:
+        if self.state is CircuitState.HALF_OPEN and self.probes > 0:
+            self.probes -= 1
+
+    def record(self, duration: float, failed: bool) -> None:
+        now = monotonic()
+        slow = duration >= self.slow_call_duration
+        if self.state is CircuitState.HALF_OPEN:
+            if failed or slow:
+                self.transition(CircuitState.OPEN, now)
+                return
+            self.probe_successes += 1
+            if self.probe_successes >= self.half_open_calls:
+                self.transition(CircuitState.CLOSED, now)
+            return
+        if self.state is CircuitState.OPEN:
+            return
+
+        second = int(now)
+        if not self.buckets or self.buckets[-1].second != second:
+            self.buckets.append(WindowBucket(second))
+        bucket = self.buckets[-1]
+        bucket.total += 1
+        bucket.failures += failed
+        bucket.slow += slow
+
+        total, failures, slow_calls = self.totals(now)
+        if total >= self.min_requests and (
+            failures / total >= self.error_rate or slow_calls / total >= self.slow_call_rate
+        ):
+            self.transition(CircuitState.OPEN, now)
+
+    def retry_after(self) -> int:
+        return max(1, ceil(self.opened_at + self.open_duration - monotonic()))
+
+    def stats(self) -> dict[str, Any]:
+        total, failures, slow_calls = self.totals(monotonic())
+        return {
+            "state": self.state.value,
+            "requests": total,
+            "failures": failures,
+            "slow_calls": slow_calls,
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state is CircuitState.OPEN else 0,
+        }
@@ -0,0 +1,136 @@
+from asyncio import CancelledError, Task, create_task, gather, sleep
+from contextlib import suppress
+from random import choice, sample
+from time import monotonic
+from typing import Any, Literal
+
+from app.logger import logger
+from app.metrics import metrics
+
+from .upstream_pool import UpstreamPool
+
+
+class Replica:
+    __slots__ = ("ejected_until", "errors", "failures", "healthy", "outstanding", "requests", "url")
+
+    def __init__(self, url: str) -> None:
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+
+class LoadBalancer:
+    def __init__(
+        self,
+        upstream_pool: UpstreamPool,
+        services: dict[str, list[str]],
+        strategy: Literal["p2c", "least_outstanding"] = "p2c",
+        eject_failures: int = 5,
+        eject_duration: float = 30.0,
+        health_path: str = "/health",
+        health_timeout: float = 2.0,
+    ) -> None:
+        self.upstream_pool = upstream_pool
+        self.services: dict[str, list[Replica]] = {
+            base.rstrip("/"): [Replica(url) for url in replicas] for base, replicas in services.items()
+        }
+        self.strategy = strategy
+        self.eject_failures = eject_failures
+        self.eject_duration = eject_duration
+        self.health_path = health_path
+        self.health_timeout = health_timeout
+        self.task: Task | None = None
+
+    def pick(self, replicas: list[Replica]) -> Replica:
+        now = monotonic()
+        candidates = [replica for replica in replicas if replica.available(now)] or replicas
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.strategy == "least_outstanding":
+            fewest = min(replica.outstanding for replica in candidates)
+            return choice([replica for replica in candidates if replica.outstanding == fewest])
+        first, second = sample(candidates, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+    def acquire(self, url: str) -> tuple[Replica | None, str]:
+        for base, replicas in self.services.items():
+            if url == base or url.startswith(f"{base}/"):
+                replica = self.pick(replicas)
+                replica.outstanding += 1
+                replica.requests += 1
+                metrics.replica_outstanding.set((replica.url,), replica.outstanding)
+                return replica, f"{replica.url}{url[len(base):]}"
+        return None, url
+
+    def release(self, replica: Replica, failed: bool) -> None:
+        replica.outstanding -= 1
+        metrics.replica_outstanding.set((replica.url,), replica.outstanding)
+        if not failed:
+            replica.failures = 0
+            return
+        replica.errors += 1
+        replica.failures += 1
+        if replica.failures >= self.eject_failures and replica.available(monotonic()):
+            replica.ejected_until = monotonic() + self.eject_duration
+            metrics.replica_ejections.inc((replica.url,))
+            logger.warning(f"Ejected upstream replica {replica.url} after {replica.failures} consecutive failures")
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            response = await self.upstream_pool.client_for(replica.url).get(
+                f"{replica.url}{self.health_path}", timeout=self.health_timeout
+            )
+            healthy = response.is_success
+        except Exception:
+            healthy = False
+        if healthy and not replica.healthy:
+            logger.info(f"Upstream replica {replica.url} is healthy again")
+            replica.failures = 0
+        elif not healthy and replica.healthy:
+            logger.warning(f"Upstream replica {replica.url} failed its health check")
+            metrics.replica_ejections.inc((replica.url,))
+        replica.healthy = healthy
+        metrics.replica_healthy.set((replica.url,), int(healthy))
+
+    async def check_all(self) -> None:
+        await gather(*(self.check(replica) for replicas in self.services.values() for replica in replicas))
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await self.check_all()
+            await sleep(interval)
+
+    def start(self, interval: float) -> None:
+        if interval > 0 and self.services and self.task is None:
+            self.task = create_task(self.run(interval))
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(CancelledError):
+                await self.task
+            self.task = None
+
+    def stats(self) -> dict[str, list[dict[str, Any]]]:
+        now = monotonic()
+        return {
+            base: [
+                {
+                    "url": replica.url,
+                    "available": replica.available(now),
+                    "healthy": replica.healthy,
+                    "outstanding": replica.outstanding,
+                    "requests": replica.requests,
+                    "errors": replica.errors,
+                }
+                for replica in replicas
+            ]
+            for base, replicas in self.services.items()
+        }
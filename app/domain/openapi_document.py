@@ -0,0 +1,45 @@
+from gzip import compress
+from hashlib import sha256
+from typing import Any
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+from app.compression import brotli, negotiate
+from app.serialization import dumps
+
+
+class OpenAPIDocument:
+    __slots__ = ("etags", "variants")
+
+    def __init__(self, schema: dict[str, Any]) -> None:
+        body = dumps(schema)
+        digest = sha256(body).hexdigest()[:32]
+        self.variants: dict[str, bytes] = {"identity": body, "gzip": compress(body, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body)
+        self.etags: dict[str, str] = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def negotiate(self, accept_encoding: str) -> str:
+        encodings = tuple(encoding for encoding in ("br", "gzip") if encoding in self.variants)
+        return negotiate(accept_encoding, encodings) or "identity"
+
+    def not_modified(self, if_none_match: str) -> bool:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or not tags.isdisjoint(self.etags.values())
+
+    def response(self, headers: Headers) -> Response:
+        encoding = self.negotiate(headers.get("accept-encoding", ""))
+        response_headers = {
+            "etag": self.etags[encoding],
+            "vary": "accept-encoding",
+            "cache-control": "no-cache",
+        }
+        if self.not_modified(headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != "identity":
+            response_headers["content-encoding"] = encoding
+        return Response(self.variants[encoding], media_type="application/json", headers=response_headers)
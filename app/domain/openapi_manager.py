@@ -1,5 +1,66 @@
 from typing import Any
 
+from app.constants import OPENAPI_OPERATIONS, OPENAPI_SERVICE_TAGS
+
+
+class TagTable:
+    __slots__ = ("default", "lengths", "prefixes")
+
+    def __init__(self, base_tag: str, rules: dict[str, str]) -> None:
+        self.prefixes = {prefix: f"{base_tag} - {label}" for prefix, label in rules.items()}
+        self.lengths = sorted({len(prefix) for prefix in rules}, reverse=True)
+        self.default = f"{base_tag} - Health"
+
+    def lookup(self, path: str) -> str:
+        for length in self.lengths:
+            tag = self.prefixes.get(path[:length])
+            if tag is not None:
+                return tag
+        return self.default
+
+
+class PreparedSchema:
+    __slots__ = ("components", "paths", "rewritten", "source", "tags")
+
+    def __init__(
+        self,
+        source: dict[str, Any],
+        paths: dict[str, Any],
+        components: dict[str, dict[str, Any]],
+        tags: set[str],
+    ) -> None:
+        self.source = source
+        self.paths = paths
+        self.components = components
+        self.tags = tags
+        self.rewritten: tuple[dict[str, str], dict[str, Any], dict[str, dict[str, Any]]] | None = None
+
+
+def rewrite_refs(node: Any, renames: dict[str, str]) -> Any:
+    if type(node) is dict:
+        changed: dict[str, Any] | None = None
+        for key, value in node.items():
+            if key == "$ref":
+                new_value = renames.get(value, value) if type(value) is str else value
+            elif type(value) is dict or type(value) is list:
+                new_value = rewrite_refs(value, renames)
+            else:
+                continue
+            if new_value is not value:
+                if changed is None:
+                    changed = dict(node)
+                changed[key] = new_value
+        return node if changed is None else changed
+    changed_list: list[Any] | None = None
+    for index, value in enumerate(node):
+        if type(value) is dict or type(value) is list:
+            new_value = rewrite_refs(value, renames)
+            if new_value is not value:
+                if changed_list is None:
+                    changed_list = list(node)
+                changed_list[index] = new_value
+    return node if changed_list is None else changed_list
+
 
 class OpenAPIManager:
     def __init__(
@@ -8,6 +69,7 @@ class OpenAPIManager:
         version: str = "1.1.0",
         contact: dict[str, str] | None = None,
         license_info: dict[str, str] | None = None,
+        service_tags: dict[str, tuple[str, dict[str, str]]] | None = None,
     ) -> None:
         self.title = title
         self.version = version
@@ -20,36 +82,26 @@ class OpenAPIManager:
             "name": "GNU General Public License v3.0 or later (GPLv3+)",
             "url": "https://www.gnu.org/licenses/gpl-3.0.html",
         }
+        self.service_tags = service_tags or OPENAPI_SERVICE_TAGS
+        self.tag_tables = {base_tag: TagTable(base_tag, rules) for base_tag, rules in self.service_tags.values()}
+        self.prepared: dict[str, PreparedSchema] = {}
 
     def determine_tag(self, path: str, base_tag: str) -> str | None:
-        match base_tag:
-            case "Secure Chain Depex":
-                if "/graph/" in path:
-                    return f"{base_tag} - Graph"
-                elif "/operation/ssc/" in path:
-                    return f"{base_tag} - Operation/SSC"
-                elif "/operation/smt/" in path:
-                    return f"{base_tag} - Operation/SMT"
-                else:
-                    return f"{base_tag} - Health"
-
-            case "Secure Chain VEXGen":
-                if "/vex/" in path:
-                    return f"{base_tag} - VEX"
-                elif "/tix/" in path:
-                    return f"{base_tag} - TIX"
-                elif "/vex_tix/" in path:
-                    return f"{base_tag} - VEX/TIX"
-                else:
-                    return f"{base_tag} - Health"
-
-            case "Secure Chain Auth":
-                if "/user" in path:
-                    return f"{base_tag} - User"
-                elif "/api-keys" in path:
-                    return f"{base_tag} - API Keys"
-                else:
-                    return f"{base_tag} - Health"
+        table = self.tag_tables.get(base_tag)
+        return table.lookup(path) if table is not None else None
+
+    def tag_operations(self, methods: dict[str, Any], tag: str | None) -> dict[str, Any]:
+        if tag is None:
+            return methods
+        tags = [tag]
+        tagged: dict[str, Any] | None = None
+        for method, details in methods.items():
+            if method not in OPENAPI_OPERATIONS or not isinstance(details, dict) or details.get("tags") == tags:
+                continue
+            if tagged is None:
+                tagged = dict(methods)
+            tagged[method] = {**details, "tags": tags}
+        return methods if tagged is None else tagged
 
     def prefix_and_tag_paths(
         self, schema: dict[str, Any], prefix: str, base_tag: str
@@ -59,40 +111,82 @@ class OpenAPIManager:
 
         for path, methods in schema.get("paths", {}).items():
             full_path = path if path.startswith(prefix) else f"{prefix}{path}"
-            tag = self.determine_tag(path, base_tag)
+            tag = self.determine_tag(full_path[len(prefix):], base_tag)
             if tag is not None:
                 tags_used.add(tag)
+            tagged_paths[full_path] = self.tag_operations(methods, tag)
 
-            new_methods: dict[str, Any] = {}
-            for method, details in methods.items():
-                operation: dict[str, Any] = dict(details)
-                operation["tags"] = [tag]
-                new_methods[method] = operation
+        return tagged_paths, tags_used
 
-            tagged_paths[full_path] = new_methods
+    def prepare(self, name: str, schema: dict[str, Any]) -> PreparedSchema:
+        prepared = self.prepared.get(name)
+        if prepared is not None and prepared.source is schema:
+            return prepared
+        base_tag = self.service_tags.get(name, (None, {}))[0]
+        paths, tags = self.prefix_and_tag_paths(schema, f"/{name}", base_tag)
+        components = {
+            section: entries
+            for section, entries in schema.get("components", {}).items()
+            if isinstance(entries, dict)
+        }
+        prepared = self.prepared[name] = PreparedSchema(schema, paths, components, tags)
+        return prepared
 
-        return tagged_paths, tags_used
+    def component_renames(self, prepared: dict[str, PreparedSchema]) -> dict[str, dict[str, str]]:
+        owners: dict[tuple[str, str], list[str]] = {}
+        for name, service in prepared.items():
+            for section, entries in service.components.items():
+                for component in entries:
+                    owners.setdefault((section, component), []).append(name)
+        renames: dict[str, dict[str, str]] = {name: {} for name in prepared}
+        for (section, component), names in owners.items():
+            if len(names) < 2:
+                continue
+            first = prepared[names[0]].components[section][component]
+            if all(prepared[name].components[section][component] == first for name in names[1:]):
+                continue
+            for name in names:
+                renames[name][f"#/components/{section}/{component}"] = f"#/components/{section}/{name}.{component}"
+        return renames
 
-    def merge_schemas(
-        self,
-        auth_schema: dict[str, Any],
-        depex_schema: dict[str, Any],
-        vexgen_schema: dict[str, Any],
-    ) -> dict[str, Any]:
-        prefixed_auth_paths, auth_tags = self.prefix_and_tag_paths(
-            auth_schema, "/auth", "Secure Chain Auth"
-        )
-        prefixed_depex_paths, depex_tags = self.prefix_and_tag_paths(
-            depex_schema, "/depex", "Secure Chain Depex"
-        )
-        prefixed_vexgen_paths, vexgen_tags = self.prefix_and_tag_paths(
-            vexgen_schema, "/vexgen", "Secure Chain VEXGen"
-        )
-
-        all_tags: list[str] = sorted(auth_tags.union(depex_tags).union(vexgen_tags))
-        merged_tags: list[dict[str, str]] = [{"name": tag, "description": f"Endpoints for {tag}"} for tag in all_tags]
-
-        merged: dict[str, Any] = {
+    def rewrite(
+        self, service: PreparedSchema, renames: dict[str, str]
+    ) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+        if service.rewritten is not None and service.rewritten[0] == renames:
+            return service.rewritten[1], service.rewritten[2]
+        if not renames:
+            paths, components = service.paths, service.components
+        else:
+            paths = rewrite_refs(service.paths, renames)
+            components = {}
+            for section, entries in service.components.items():
+                local = f"#/components/{section}/"
+                components[section] = {
+                    renames.get(f"{local}{component}", f"{local}{component}")[len(local):]: (
+                        rewrite_refs(definition, renames) if type(definition) is dict else definition
+                    )
+                    for component, definition in entries.items()
+                }
+        service.rewritten = (renames, paths, components)
+        return paths, components
+
+    def merge(self, schemas: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        prepared = {name: self.prepare(name, schema) for name, schema in schemas.items()}
+        for name in self.prepared.keys() - prepared.keys():
+            del self.prepared[name]
+        renames = self.component_renames(prepared)
+
+        paths: dict[str, Any] = {}
+        components: dict[str, dict[str, Any]] = {}
+        tags: set[str] = set()
+        for name, service in prepared.items():
+            service_paths, service_components = self.rewrite(service, renames[name])
+            paths.update(service_paths)
+            for section, entries in service_components.items():
+                components.setdefault(section, {}).update(entries)
+            tags |= service.tags
+
+        return {
             "openapi": "3.1.0",
             "info": {
                 "title": self.title,
@@ -100,19 +194,15 @@ class OpenAPIManager:
                 "contact": self.contact,
                 "license": self.license_info,
             },
-            "paths": {
-                **prefixed_auth_paths,
-                **prefixed_depex_paths,
-                **prefixed_vexgen_paths,
-            },
-            "components": {
-                "schemas": {
-                    **auth_schema.get("components", {}).get("schemas", {}),
-                    **depex_schema.get("components", {}).get("schemas", {}),
-                    **vexgen_schema.get("components", {}).get("schemas", {}),
-                }
-            },
-            "tags": merged_tags,
+            "paths": paths,
+            "components": {"schemas": {}, **components},
+            "tags": [{"name": tag, "description": f"Endpoints for {tag}"} for tag in sorted(tags)],
         }
 
-        return merged
+    def merge_schemas(
+        self,
+        auth_schema: dict[str, Any],
+        depex_schema: dict[str, Any],
+        vexgen_schema: dict[str, Any],
+    ) -> dict[str, Any]:
+        return self.merge({"auth": auth_schema, "depex": depex_schema, "vexgen": vexgen_schema})
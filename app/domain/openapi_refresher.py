@@ -0,0 +1,159 @@
+from asyncio import CancelledError, Task, create_task, gather, sleep, to_thread
+from contextlib import suppress
+from os import replace
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Any
+
+from app.constants import FALLBACK_OPENAPI_SCHEMA
+from app.domain.openapi_document import OpenAPIDocument
+from app.domain.openapi_manager import OpenAPIManager
+from app.domain.upstream_pool import UpstreamPool
+from app.logger import logger
+from app.serialization import dumps, loads
+
+SNAPSHOT_VERSION = 1
+
+
+class OpenAPIRefresher:
+    def __init__(
+        self,
+        openapi_manager: OpenAPIManager,
+        upstream_pool: UpstreamPool,
+        services: dict[str, str],
+        timeout: float = 5.0,
+        service_timeouts: dict[str, float] | None = None,
+        snapshot_path: str | None = None,
+        retry_delay: float = 1.0,
+        retry_delay_max: float = 60.0,
+    ) -> None:
+        self.openapi_manager = openapi_manager
+        self.upstream_pool = upstream_pool
+        self.services = services
+        self.timeout = timeout
+        self.service_timeouts = service_timeouts or {}
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.retry_delay = retry_delay
+        self.retry_delay_max = retry_delay_max
+        self.schemas: dict[str, dict[str, Any]] = {}
+        self.etags: dict[str, str] = {}
+        self.schema: dict[str, Any] | None = None
+        self.document = OpenAPIDocument(FALLBACK_OPENAPI_SCHEMA)
+        self.swaps = 0
+        self.restored = False
+        self.task: Task | None = None
+
+    def timeout_for(self, name: str) -> float:
+        return self.service_timeouts.get(name, self.timeout)
+
+    async def fetch(self, name: str, url: str) -> bool:
+        etag = self.etags.get(name)
+        headers = {"if-none-match": etag} if etag and name in self.schemas else {}
+        try:
+            response = await self.upstream_pool.client_for(url).get(
+                f"{url}/openapi.json", headers=headers, timeout=self.timeout_for(name)
+            )
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
+            schema = response.json()
+        except Exception as e:
+            logger.warning(f"Failed to fetch {name} OpenAPI spec, keeping last known good: {e}")
+            return False
+        etag = response.headers.get("etag")
+        if etag:
+            self.etags[name] = etag
+        if self.schemas.get(name) == schema:
+            return False
+        self.schemas[name] = schema
+        return True
+
+    async def refresh(self) -> dict[str, Any] | None:
+        changed = await gather(*(self.fetch(name, url) for name, url in self.services.items()))
+        if any(changed):
+            schema = self.openapi_manager.merge({name: self.schemas.get(name, {}) for name in self.services})
+            document = await to_thread(OpenAPIDocument, schema)
+            self.schema, self.document = schema, document
+            self.swaps += 1
+            if self.snapshot_path is not None:
+                await to_thread(self.save, schema)
+        return self.schema
+
+    def save(self, schema: dict[str, Any]) -> None:
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "services": self.services,
+            "etags": self.etags,
+            "schemas": self.schemas,
+            "schema": schema,
+        }
+        partial: Path | None = None
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile(
+                dir=self.snapshot_path.parent, prefix=f".{self.snapshot_path.name}.", suffix=".tmp", delete=False
+            ) as file:
+                partial = Path(file.name)
+                file.write(dumps(snapshot))
+            replace(partial, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to write OpenAPI snapshot {self.snapshot_path}: {e}")
+            if partial is not None:
+                partial.unlink(missing_ok=True)
+
+    def load(self) -> tuple[dict[str, Any], OpenAPIDocument] | None:
+        try:
+            snapshot = loads(self.snapshot_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable OpenAPI snapshot {self.snapshot_path}: {e}")
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("services") != self.services:
+            return None
+        return snapshot, OpenAPIDocument(snapshot["schema"])
+
+    async def restore(self) -> bool:
+        if self.snapshot_path is None or self.schema is not None:
+            return False
+        loaded = await to_thread(self.load)
+        if loaded is None or self.schema is not None:
+            return False
+        snapshot, self.document = loaded
+        self.schemas, self.etags, self.schema = snapshot["schemas"], snapshot["etags"], snapshot["schema"]
+        self.restored = True
+        return True
+
+    def complete(self) -> bool:
+        return self.schema is not None and all(name in self.schemas for name in self.services)
+
+    async def run(self, interval: float) -> None:
+        try:
+            await self.restore()
+        except Exception as e:
+            logger.exception(f"Failed to restore OpenAPI snapshot: {e}")
+        delay = self.retry_delay
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.exception(f"Failed to refresh OpenAPI schema: {e}")
+            if self.complete():
+                if interval <= 0:
+                    return
+                delay = self.retry_delay
+                await sleep(interval)
+            else:
+                await sleep(delay)
+                delay = min(delay * 2, interval if interval > 0 else self.retry_delay_max)
+
+    def start(self, interval: float) -> None:
+        if self.task is None:
+            self.task = create_task(self.run(interval))
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            with suppress(CancelledError):
+                await self.task
+            self.task = None
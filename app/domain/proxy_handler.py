@@ -1,76 +1,356 @@
+from asyncio import CancelledError, timeout
+from collections.abc import AsyncIterator, Awaitable, Callable
+from functools import partial
+from hashlib import sha256
+from time import perf_counter
 from typing import Any
 
 from fastapi import Request
-from fastapi.responses import JSONResponse, Response
-from httpx import AsyncClient
+from fastapi.responses import Response, StreamingResponse
+from httpx import USE_CLIENT_DEFAULT, Headers, TimeoutException
+from httpx import Response as HTTPXResponse
+from starlette.types import Receive, Scope, Send
 
-from app.constants import HOP_BY_HOP_HEADERS
+from app.constants import (
+    REQUEST_KEY_HEADERS,
+    REQUEST_SKIP_HEADERS,
+    RESPONSE_SKIP_HEADERS,
+    SAFE_METHODS,
+)
 from app.logger import logger
+from app.metrics import metrics
+from app.serialization import JSONBytesResponse, dumps
+from app.tracing import UpstreamTrace, current_trace
+
+from .admission_controller import AdmissionController
+from .circuit_breaker import CircuitBreaker
+from .load_balancer import LoadBalancer, Replica
+from .response_cache import ResponseCache
+from .retry_policy import RetryPolicy
+from .single_flight import SingleFlight
+from .timeout_policy import TimeoutPolicy
+from .upstream_pool import UpstreamPool
+
+
+class UpstreamStream:
+    __slots__ = ("closed", "on_close", "upstream")
+
+    def __init__(self, upstream: HTTPXResponse) -> None:
+        self.upstream = upstream
+        self.on_close: list[Callable[[bool], None]] = []
+        self.closed = False
+
+    async def close(self, failed: bool) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.upstream.aclose()
+        finally:
+            for callback in self.on_close:
+                callback(failed)
+
+
+class RelayResponse(StreamingResponse):
+    def __init__(self, stream: UpstreamStream, content: AsyncIterator[bytes]) -> None:
+        super().__init__(content, status_code=stream.upstream.status_code)
+        self.stream = stream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.stream.close(self.stream.upstream.status_code >= 500)
 
 
 class ProxyHandler:
-    def __init__(self, follow_redirects: bool = False) -> None:
+    def __init__(
+        self,
+        upstream_pool: UpstreamPool | None = None,
+        follow_redirects: bool = False,
+        streaming: bool = False,
+        response_cache: ResponseCache | None = None,
+        single_flight: SingleFlight | None = None,
+        circuit_breakers: dict[str, CircuitBreaker] | None = None,
+        load_balancer: LoadBalancer | None = None,
+        retry_policy: RetryPolicy | None = None,
+        timeout_policy: TimeoutPolicy | None = None,
+        admission_controllers: dict[str, AdmissionController] | None = None,
+    ) -> None:
+        self.upstream_pool = upstream_pool or UpstreamPool()
         self.follow_redirects = follow_redirects
+        self.streaming = streaming
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.circuit_breakers = circuit_breakers or {}
+        self.load_balancer = load_balancer
+        self.retry_policy = retry_policy
+        self.timeout_policy = timeout_policy
+        self.admission_controllers = admission_controllers or {}
+
+    def filter_request_headers(self, raw: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+        return [(name, value) for name, value in raw if name not in REQUEST_SKIP_HEADERS]
+
+    def filter_response_headers(self, raw: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+        return [
+            (lowered, value)
+            for name, value in raw
+            if (lowered := name.lower()) not in RESPONSE_SKIP_HEADERS
+        ]
+
+    def apply_upstream_headers(self, resp: Response, upstream_headers: Headers) -> Response:
+        resp.raw_headers.extend(self.filter_response_headers(upstream_headers.raw))
+        return resp
+
+    def has_body(self, request: Request) -> bool:
+        return request.headers.get("content-length", "0") != "0" or "transfer-encoding" in request.headers
+
+    def is_shareable(self, request: Request) -> bool:
+        return request.method in SAFE_METHODS and not self.has_body(request)
+
+    def request_key(self, url: str, request: Request) -> str:
+        digest = sha256(f"{request.method} {url}?{request.url.query}".encode())
+        for name in REQUEST_KEY_HEADERS:
+            digest.update(b"\0" + ",".join(request.headers.getlist(name)).encode("latin1"))
+        return digest.hexdigest()
+
+    async def relay_body(self, stream: UpstreamStream, route: str, start_time: float) -> AsyncIterator[bytes]:
+        failed = stream.upstream.status_code >= 500
+        try:
+            async for chunk in stream.upstream.aiter_raw():
+                yield chunk
+            metrics.upstream_duration.observe((route,), perf_counter() - start_time)
+        except Exception as e:
+            failed = True
+            logger.error(f"Proxy stream failed: {e}")
+            raise
+        finally:
+            await stream.close(failed)
+
+    def bad_gateway(self, request: Request, error: Exception) -> JSONBytesResponse:
+        if isinstance(error, TimeoutException):
+            return self.gateway_timeout(request)
+        logger.error(f"Proxy request failed: {error}")
+        metrics.upstream_errors.inc((metrics.route(request.url.path),))
+        return JSONBytesResponse(dumps({"code": "internal_error"}), status_code=502)
+
+    def gateway_timeout(self, request: Request) -> JSONBytesResponse:
+        logger.warning(f"Proxy request timed out: {request.method} {request.url.path}")
+        metrics.upstream_timeouts.inc((metrics.route(request.url.path),))
+        return JSONBytesResponse(dumps({"code": "gateway_timeout"}), status_code=504)
+
+    def deadline_exceeded(self, request: Request) -> JSONBytesResponse:
+        metrics.deadline_exceeded.inc((metrics.route(request.url.path),))
+        return JSONBytesResponse(dumps({"code": "deadline_exceeded"}), status_code=504)
 
-    def filter_request_headers(self, items: list[tuple[str, str]]) -> dict[str, str]:
-        skip = HOP_BY_HOP_HEADERS | {"host", "content-length"}
-        return {k: v for k, v in items if k.lower() not in skip}
+    def service_unavailable(self, retry_after: int) -> JSONBytesResponse:
+        return JSONBytesResponse(
+            dumps({"code": "service_unavailable"}),
+            status_code=503,
+            headers={"retry-after": str(retry_after)},
+        )
 
-    def filter_response_headers(self, upstream_headers: dict[str, Any]) -> dict[str, str]:
-        skip = HOP_BY_HOP_HEADERS | {"content-length", "date", "server", "set-cookie"}
-        filtered: dict[str, str] = {}
-        for k, v in upstream_headers.items():
-            if k.lower() not in skip:
-                filtered[k] = v
-        return filtered
+    def build_response(self, content: bytes, status_code: int, upstream_headers: Headers) -> Response:
+        return self.apply_upstream_headers(Response(content=content, status_code=status_code), upstream_headers)
 
-    def extract_cookies(self, upstream_headers: Any) -> list[str]:
-        set_cookies: list[str] = []
+    def upstream_timeout(self, request: Request, headers: list[tuple[bytes, bytes]]) -> Any:
+        if self.timeout_policy is None:
+            return USE_CLIENT_DEFAULT
+        return self.timeout_policy.upstream_timeout(request, headers)
 
-        if hasattr(upstream_headers, "get_list"):
-            set_cookies = upstream_headers.get_list("set-cookie") or []
+    def trace_upstream(self, headers: list[tuple[bytes, bytes]]) -> dict[str, Any] | None:
+        trace = current_trace.get()
+        if trace is None:
+            return None
+        headers[:] = [(name, value) for name, value in headers if name != b"traceparent"]
+        headers.append((b"traceparent", trace.traceparent.encode("latin1")))
+        return {"trace": UpstreamTrace(trace)}
 
-        if not set_cookies:
-            raw = getattr(upstream_headers, "raw", None)
-            if raw is not None:
-                for k, v in raw:
-                    name = k.decode("latin1") if isinstance(k, (bytes, bytearray)) else str(k)
-                    if name.lower() == "set-cookie":
-                        value = v.decode("latin1") if isinstance(v, (bytes, bytearray)) else str(v)
-                        set_cookies.append(value)
+    def acquire_replica(self, url: str) -> tuple[Replica | None, str]:
+        if self.load_balancer is None:
+            return None, url
+        return self.load_balancer.acquire(url)
 
-        return set_cookies
+    def release_replica(self, replica: Replica | None, failed: bool) -> None:
+        if replica is not None and self.load_balancer is not None:
+            self.load_balancer.release(replica, failed)
+
+    async def send_request(self, url: str, request: Request, content: bytes | None = None) -> HTTPXResponse:
+        if self.retry_policy is not None and self.retry_policy.applies(request):
+            return await self.retry_policy.execute(
+                request, metrics.route(request.url.path), partial(self.send_once, url, request, content)
+            )
+        return await self.send_once(url, request, content)
+
+    async def send_once(self, url: str, request: Request, content: bytes | None = None) -> HTTPXResponse:
+        route = (metrics.route(request.url.path),)
+        replica, url = self.acquire_replica(url)
+        failed = True
+        try:
+            client = self.upstream_pool.client_for(url)
+            headers = self.filter_request_headers(request.headers.raw)
+            request_timeout = self.upstream_timeout(request, headers)
+            extensions = self.trace_upstream(headers)
+            upstream_request = client.build_request(
+                request.method,
+                url,
+                headers=headers,
+                params=request.query_params,
+                content=content,
+                timeout=request_timeout,
+                extensions=extensions,
+            )
+            start_time = perf_counter()
+            upstream = await client.send(
+                upstream_request, stream=True, follow_redirects=self.follow_redirects
+            )
+            metrics.upstream_ttfb.observe(route, perf_counter() - start_time)
+            try:
+                await upstream.aread()
+            finally:
+                await upstream.aclose()
+            metrics.upstream_duration.observe(route, perf_counter() - start_time)
+            failed = upstream.status_code >= 500
+            return upstream
+        except CancelledError:
+            failed = False
+            raise
+        finally:
+            self.release_replica(replica, failed)
 
     async def proxy_request(self, url: str, request: Request) -> Response:
+        if self.timeout_policy is not None:
+            request.state.deadline = self.timeout_policy.deadline(request)
+        return await self.forward_within_deadline(url, request)
+
+    async def guarded(self, request: Request, call: Callable[[], Awaitable[Any]]) -> Any:
+        route = metrics.route(request.url.path)
+        controller = self.admission_controllers.get(route)
+        if controller is not None and not await controller.acquire():
+            return self.service_unavailable(controller.retry_after())
+        breaker = self.circuit_breakers.get(route)
+        if breaker is not None and not breaker.allow():
+            if controller is not None:
+                controller.release(None)
+            return self.service_unavailable(breaker.retry_after())
+        start_time = perf_counter()
+        result: Any = None
+        failed: bool | None = True
+        try:
+            result = await call()
+            failed = result.status_code >= 500
+            return result
+        except CancelledError:
+            failed = None
+            raise
+        finally:
+            if breaker is not None:
+                if failed is None:
+                    breaker.discard()
+                else:
+                    breaker.record(perf_counter() - start_time, failed)
+            if controller is not None:
+                if isinstance(result, RelayResponse):
+                    result.stream.on_close.append(controller.release)
+                else:
+                    controller.release(failed)
+
+    async def forward_within_deadline(self, url: str, request: Request) -> Response:
+        remaining = self.timeout_policy.remaining(request) if self.timeout_policy is not None else None
+        if remaining is None:
+            return await self.forward(url, request)
+        if remaining <= 0:
+            return self.deadline_exceeded(request)
+        try:
+            async with timeout(remaining):
+                return await self.forward(url, request)
+        except TimeoutError:
+            return self.deadline_exceeded(request)
+
+    async def forward(self, url: str, request: Request) -> Response:
+        if (self.response_cache is not None or self.single_flight is not None) and self.is_shareable(request):
+            return await self.shared_request(url, request)
+        if self.streaming and (self.retry_policy is None or not self.retry_policy.applies(request)):
+            return await self.guarded(request, partial(self.stream_request, url, request))
+        return await self.guarded(request, partial(self.buffered_request, url, request))
+
+    async def buffered_request(self, url: str, request: Request) -> Response:
+        try:
+            upstream = await self.send_request(url, request, await request.body())
+            return self.build_response(upstream.content, upstream.status_code, upstream.headers)
+
+        except Exception as e:
+            return self.bad_gateway(request, e)
+
+    async def shared_request(self, url: str, request: Request) -> Response:
+        key = self.request_key(url, request)
+        cacheable = self.response_cache is not None and self.response_cache.is_cacheable_request(request)
+        if cacheable:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return self.build_response(cached.content, cached.status_code, cached.headers)
         try:
-            async with AsyncClient(follow_redirects=self.follow_redirects) as client:
-                upstream = await client.request(
-                    request.method,
-                    url,
-                    headers=self.filter_request_headers(request.headers.items()),
-                    params=request.query_params,
-                    content=await request.body(),
-                )
-
-            resp = Response(
-                content=upstream.content,
-                status_code=upstream.status_code,
-                media_type=upstream.headers.get("content-type"),
+            fetch = partial(self.guarded, request, partial(self.fetch_shared, key, url, request, cacheable))
+            if self.single_flight is not None:
+                upstream = await self.single_flight.do(key, fetch)
+            else:
+                upstream = await fetch()
+            if (
+                not isinstance(upstream, Response)
+                and "set-cookie" in upstream.headers
+                and not getattr(request.state, "shared_leader", False)
+            ):
+                upstream = await self.guarded(request, partial(self.send_request, url, request))
+            if isinstance(upstream, Response):
+                return upstream
+            return self.build_response(upstream.content, upstream.status_code, upstream.headers)
+
+        except Exception as e:
+            return self.bad_gateway(request, e)
+
+    async def fetch_shared(self, key: str, url: str, request: Request, cacheable: bool) -> HTTPXResponse:
+        request.state.shared_leader = True
+        upstream = await self.send_request(url, request)
+        if cacheable and self.response_cache is not None:
+            self.response_cache.store(
+                key, request.url.path, upstream.status_code, upstream.headers, upstream.content
             )
+        return upstream
 
-            filtered_headers = self.filter_response_headers(dict(upstream.headers))
-            for k, v in filtered_headers.items():
-                resp.headers[k] = v
+    async def stream_request(self, url: str, request: Request) -> Response:
+        replica, url = self.acquire_replica(url)
+        try:
+            client = self.upstream_pool.client_for(url)
+            headers = self.filter_request_headers(request.headers.raw)
+            if "content-length" in request.headers:
+                headers.append((b"content-length", request.headers["content-length"].encode("latin1")))
+            request_timeout = self.upstream_timeout(request, headers)
+            extensions = self.trace_upstream(headers)
+            upstream_request = client.build_request(
+                request.method,
+                url,
+                headers=headers,
+                params=request.query_params,
+                content=request.stream() if self.has_body(request) else None,
+                timeout=request_timeout,
+                extensions=extensions,
+            )
+            route = metrics.route(request.url.path)
+            start_time = perf_counter()
+            upstream = await client.send(
+                upstream_request, stream=True, follow_redirects=self.follow_redirects
+            )
+            metrics.upstream_ttfb.observe((route,), perf_counter() - start_time)
 
-            set_cookies = self.extract_cookies(upstream.headers)
-            if set_cookies:
-                raw_headers = list(resp.raw_headers)
-                for cookie in set_cookies:
-                    raw_headers.append((b"set-cookie", cookie.encode("latin1")))
-                resp.raw_headers = raw_headers
+            stream = UpstreamStream(upstream)
+            stream.on_close.append(partial(self.release_replica, replica))
+            resp = RelayResponse(stream, self.relay_body(stream, route, start_time))
 
-            return resp
+            return self.apply_upstream_headers(resp, upstream.headers)
 
+        except CancelledError:
+            self.release_replica(replica, False)
+            raise
         except Exception as e:
-            logger.error(f"Proxy request failed: {e}")
-            return JSONResponse(status_code=502, content={"code": "internal_error"})
+            self.release_replica(replica, True)
+            return self.bad_gateway(request, e)
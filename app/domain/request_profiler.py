@@ -0,0 +1,125 @@
+from asyncio import to_thread
+from cProfile import Profile
+from hmac import compare_digest
+from pathlib import Path
+from pstats import Stats
+from random import random
+from time import time_ns
+from typing import Any
+
+from starlette.datastructures import Headers
+
+from app.logger import logger
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        directory: str,
+        max_files: int = 50,
+        sample_rate: float = 0.0,
+        token: str | None = None,
+        header: str = "x-gateway-profile",
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.sample_rate = sample_rate
+        self.token = token
+        self.header = header.lower()
+        self.active = False
+        self.captured = 0
+        self.skipped = 0
+
+    def requested(self, headers: Headers) -> bool:
+        value = headers.get(self.header)
+        return value is not None and self.token is not None and compare_digest(value, self.token)
+
+    def wants(self, headers: Headers) -> bool:
+        if not self.requested(headers) and (self.sample_rate <= 0 or random() >= self.sample_rate):
+            return False
+        if self.active:
+            self.skipped += 1
+            return False
+        return True
+
+    def start(self) -> Profile | None:
+        profile = Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            logger.warning(f"Request profiling unavailable: {e}")
+            self.skipped += 1
+            return None
+        self.active = True
+        return profile
+
+    def stop(self, profile: Profile) -> None:
+        profile.disable()
+        self.active = False
+
+    def name_for(self, method: str, route: str) -> str:
+        return f"{time_ns()}-{method.lower()}-{route}"
+
+    def files(self) -> list[Path]:
+        return sorted(self.directory.glob("*.prof")) if self.directory.is_dir() else []
+
+    def write(self, profile: Profile, name: str) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.directory / f"{name}.prof.tmp"
+        profile.dump_stats(partial)
+        partial.replace(self.directory / f"{name}.prof")
+        for path in self.files()[: -self.max_files]:
+            path.unlink(missing_ok=True)
+
+    async def save(self, profile: Profile, name: str) -> None:
+        try:
+            await to_thread(self.write, profile, name)
+            self.captured += 1
+        except OSError as e:
+            logger.error(f"Failed to write request profile {name}: {e}")
+
+    def path_for(self, name: str) -> Path | None:
+        path = self.directory / f"{name}.prof"
+        return path if Path(name).name == name and path.is_file() else None
+
+    def profiles(self) -> list[dict[str, Any]]:
+        entries: list[dict[str, Any]] = []
+        for path in reversed(self.files()):
+            timestamp, method, route = path.stem.split("-", 2)
+            entries.append(
+                {
+                    "name": path.stem,
+                    "captured_at": int(timestamp) / 1_000_000_000,
+                    "method": method.upper(),
+                    "route": route,
+                    "bytes": path.stat().st_size,
+                }
+            )
+        return entries
+
+    def summary(self, name: str, limit: int = 25) -> dict[str, Any] | None:
+        path = self.path_for(name)
+        if path is None:
+            return None
+        stats = Stats(str(path))
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return {
+            "name": name,
+            "total_time": stats.total_tt,
+            "frames": [
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "calls": calls,
+                    "own_time": own_time,
+                    "cumulative_time": cumulative_time,
+                }
+                for (filename, line, function), (_, calls, own_time, cumulative_time, _) in rows
+            ],
+        }
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "captured": self.captured,
+            "skipped": self.skipped,
+            "profiles": self.profiles(),
+        }
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from time import monotonic, time
+
+from fastapi import Request
+from httpx import Headers
+
+from app.constants import CACHEABLE_STATUS_CODES, SAFE_METHODS
+
+
+class CachedResponse:
+    __slots__ = ("content", "expires_at", "headers", "size", "status_code")
+
+    def __init__(
+        self, status_code: int, headers: Headers, content: bytes, expires_at: float
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.expires_at = expires_at
+        self.size = len(content) + sum(len(k) + len(v) for k, v in headers.raw) + 256
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entry_bytes: int = 4 * 1024 * 1024,
+        default_ttl: float = 0.0,
+        route_ttls: dict[str, float] | None = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.default_ttl = default_ttl
+        self.route_ttls = sorted((route_ttls or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_cacheable_request(self, request: Request) -> bool:
+        if request.method not in SAFE_METHODS:
+            return False
+        directives = request.headers.get("cache-control", "").lower()
+        return "no-store" not in directives and "no-cache" not in directives
+
+    def route_ttl(self, path: str) -> float | None:
+        for prefix, ttl in self.route_ttls:
+            if path.startswith(prefix):
+                return ttl
+        return None
+
+    @staticmethod
+    def cache_directives(headers: Headers) -> dict[str, str]:
+        directives: dict[str, str] = {}
+        for directive in headers.get("cache-control", "").lower().split(","):
+            name, _, value = directive.strip().partition("=")
+            if name:
+                directives[name] = value.strip('"')
+        return directives
+
+    def upstream_ttl(self, headers: Headers, directives: dict[str, str]) -> float | None:
+        for name in ("s-maxage", "max-age"):
+            if name in directives:
+                try:
+                    return float(directives[name]) - float(headers.get("age", "0") or 0)
+                except ValueError:
+                    return 0.0
+
+        if "expires" in headers:
+            try:
+                expires = parsedate_to_datetime(headers["expires"]).timestamp()
+                now = parsedate_to_datetime(headers["date"]).timestamp() if "date" in headers else time()
+            except (TypeError, ValueError):
+                return 0.0
+            return expires - now
+        return None
+
+    def ttl_for(self, path: str, headers: Headers) -> float:
+        directives = self.cache_directives(headers)
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return 0.0
+        route_ttl = self.route_ttl(path)
+        if route_ttl is not None:
+            return route_ttl
+        upstream_ttl = self.upstream_ttl(headers, directives)
+        return self.default_ttl if upstream_ttl is None else upstream_ttl
+
+    def get(self, key: str) -> CachedResponse | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= monotonic():
+            self.remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(
+        self, key: str, path: str, status_code: int, headers: Headers, content: bytes
+    ) -> CachedResponse | None:
+        if status_code not in CACHEABLE_STATUS_CODES or "set-cookie" in headers:
+            return None
+        ttl = self.ttl_for(path, headers)
+        if ttl <= 0:
+            return None
+        entry = CachedResponse(status_code, Headers(headers.raw), content, monotonic() + ttl)
+        if entry.size > self.max_entry_bytes:
+            return None
+
+        self.remove(key)
+        self.entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,143 @@
+from asyncio import FIRST_COMPLETED, Task, create_task, sleep, timeout, wait
+from collections import deque
+from collections.abc import Awaitable, Callable
+from random import random
+from time import monotonic
+
+from fastapi import Request
+from httpx import ConnectError, ConnectTimeout, TimeoutException
+from httpx import Response as HTTPXResponse
+
+from app.constants import SAFE_METHODS
+from app.metrics import metrics
+
+RETRYABLE_ERRORS = (ConnectError, ConnectTimeout)
+
+
+class RetryBudget:
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 100.0) -> None:
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = min(max_tokens, min_per_second)
+        self.updated_at = monotonic()
+
+    def deposit(self) -> None:
+        now = monotonic()
+        refill = (now - self.updated_at) * self.min_per_second + self.ratio
+        self.tokens = min(self.max_tokens, self.tokens + refill)
+        self.updated_at = now
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        retry_routes: list[str] | None = None,
+        hedge_routes: list[str] | None = None,
+        max_attempts: int = 3,
+        backoff_base: float = 0.05,
+        backoff_max: float = 1.0,
+        time_budget: float = 3.0,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.01,
+        hedge_min_samples: int = 20,
+        budget: RetryBudget | None = None,
+    ) -> None:
+        self.retry_routes = tuple(retry_routes or ())
+        self.hedge_routes = tuple(hedge_routes or ())
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.time_budget = time_budget
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.budget = budget or RetryBudget()
+        self.latencies: dict[str, deque[float]] = {}
+        self.hedge_delays: dict[str, float] = {}
+
+    def applies(self, request: Request) -> bool:
+        return request.method in SAFE_METHODS and (
+            request.url.path.startswith(self.retry_routes) or request.url.path.startswith(self.hedge_routes)
+        )
+
+    def observe(self, route: str, duration: float) -> None:
+        samples = self.latencies.get(route)
+        if samples is None:
+            samples = self.latencies[route] = deque(maxlen=200)
+        samples.append(duration)
+        if len(samples) >= self.hedge_min_samples and len(samples) % 10 == 0:
+            ordered = sorted(samples)
+            quantile = ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_quantile))]
+            self.hedge_delays[route] = max(self.hedge_min_delay, quantile)
+
+    def backoff(self, attempt: int) -> float:
+        return min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)) * random()
+
+    async def timed(self, route: str, fn: Callable[[], Awaitable[HTTPXResponse]]) -> HTTPXResponse:
+        start_time = monotonic()
+        response = await fn()
+        self.observe(route, monotonic() - start_time)
+        return response
+
+    async def hedged(self, route: str, fn: Callable[[], Awaitable[HTTPXResponse]]) -> HTTPXResponse:
+        delay = self.hedge_delays.get(route)
+        if delay is None:
+            return await self.timed(route, fn)
+        tasks: set[Task] = {create_task(self.timed(route, fn))}
+        try:
+            done, _ = await wait(tasks, timeout=delay)
+            if not done and self.budget.withdraw():
+                metrics.upstream_hedges.inc((route,))
+                tasks.add(create_task(self.timed(route, fn)))
+            pending = set(tasks)
+            while True:
+                done, pending = await wait(pending, return_when=FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code < 500:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def execute(
+        self, request: Request, route: str, fn: Callable[[], Awaitable[HTTPXResponse]]
+    ) -> HTTPXResponse:
+        path = request.url.path
+        retry = path.startswith(self.retry_routes)
+        hedge = path.startswith(self.hedge_routes)
+        deadline = monotonic() + self.time_budget
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            error: Exception | None = None
+            response: HTTPXResponse | None = None
+            try:
+                async with timeout(max(0.0, deadline - monotonic())):
+                    response = await (self.hedged(route, fn) if hedge else self.timed(route, fn))
+            except RETRYABLE_ERRORS as e:
+                error = e
+            except TimeoutError as e:
+                raise TimeoutException(f"Retry time budget of {self.time_budget}s exhausted") from e
+            if response is not None and response.status_code < 500:
+                return response
+            delay = self.backoff(attempt)
+            if not retry or attempt >= self.max_attempts or monotonic() + delay >= deadline:
+                break
+            if not self.budget.withdraw():
+                metrics.retry_budget_exhausted.inc((route,))
+                break
+            metrics.upstream_retries.inc((route,))
+            await sleep(delay)
+        if response is not None:
+            return response
+        raise error
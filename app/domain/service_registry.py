@@ -0,0 +1,56 @@
+from typing import Any
+
+from limits import RateLimitItem, parse
+
+from app.constants import PROXY_METHODS, RateLimit
+from app.metrics import metrics
+
+
+class ServiceRoute:
+    __slots__ = ("limit", "max_concurrency", "methods", "name", "prefix", "replicas", "url")
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        rate_limit: str = RateLimit.PROXY_DEFAULT.value,
+        methods: list[str] | None = None,
+        replicas: list[str] | None = None,
+        max_concurrency: int | None = None,
+    ) -> None:
+        self.name = name
+        self.prefix = f"/{name}/"
+        self.url = url.rstrip("/")
+        self.limit: RateLimitItem = parse(rate_limit)
+        self.methods = frozenset(method.upper() for method in methods or PROXY_METHODS)
+        self.replicas = list(replicas or [])
+        self.max_concurrency = max_concurrency
+
+    def upstream_url(self, path: str) -> str:
+        return f"{self.url}/{path[len(self.prefix):]}"
+
+
+class ServiceRegistry:
+    def __init__(self, routes: list[ServiceRoute]) -> None:
+        self.routes = {route.name: route for route in routes}
+        metrics.routes.update(self.routes)
+
+    @classmethod
+    def from_config(cls, services: dict[str, dict[str, Any]]) -> ServiceRegistry:
+        return cls([ServiceRoute(name, **config) for name, config in services.items()])
+
+    def match(self, path: str) -> ServiceRoute | None:
+        name, slash, _ = path[1:].partition("/")
+        return self.routes.get(name) if slash else None
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {
+                "url": route.url,
+                "rate_limit": str(route.limit),
+                "methods": sorted(route.methods),
+                "replicas": route.replicas,
+                "max_concurrency": route.max_concurrency,
+            }
+            for name, route in self.routes.items()
+        }
@@ -0,0 +1,49 @@
+from asyncio import CancelledError, Task, create_task, shield
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class SharedCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self.calls: dict[str, SharedCall] = {}
+        self.leaders = 0
+        self.saved = 0
+
+    def forget(self, key: str, call: SharedCall) -> None:
+        if self.calls.get(key) is call:
+            del self.calls[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self.calls.get(key)
+        if call is None or call.task.cancelling():
+            call = SharedCall(create_task(fn()))
+            self.calls[key] = call
+            self.leaders += 1
+            call.task.add_done_callback(lambda _: self.forget(key, call))
+        else:
+            self.saved += 1
+
+        call.waiters += 1
+        try:
+            return await shield(call.task)
+        except CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "in_flight": len(self.calls),
+            "upstream_calls": self.leaders,
+            "saved": self.saved,
+        }
@@ -0,0 +1,57 @@
+from math import isfinite
+from time import perf_counter
+
+from fastapi import Request
+from httpx import Timeout
+
+
+class TimeoutPolicy:
+    def __init__(
+        self,
+        connect: float = 5.0,
+        read: float = 5.0,
+        write: float = 5.0,
+        pool: float = 5.0,
+        route_timeouts: dict[str, dict[str, float]] | None = None,
+        deadline_header: str = "x-request-timeout-ms",
+        max_deadline: float = 300.0,
+    ) -> None:
+        self.defaults = {"connect": connect, "read": read, "write": write, "pool": pool}
+        self.route_timeouts = sorted(
+            (route_timeouts or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.deadline_header = deadline_header.lower()
+        self.deadline_name = self.deadline_header.encode("latin1")
+        self.max_deadline = max_deadline
+
+    def timeouts_for(self, path: str) -> dict[str, float]:
+        for prefix, overrides in self.route_timeouts:
+            if path.startswith(prefix):
+                return {**self.defaults, **overrides}
+        return self.defaults
+
+    def deadline(self, request: Request) -> float | None:
+        value = request.headers.get(self.deadline_header)
+        if value is None:
+            return None
+        try:
+            budget = float(value) / 1000
+        except ValueError:
+            return None
+        if not isfinite(budget):
+            return None
+        return perf_counter() + min(max(budget, 0.0), self.max_deadline)
+
+    def remaining(self, request: Request) -> float | None:
+        deadline = getattr(request.state, "deadline", None)
+        return deadline - perf_counter() if deadline is not None else None
+
+    def upstream_timeout(self, request: Request, headers: list[tuple[bytes, bytes]]) -> Timeout:
+        timeouts = self.timeouts_for(request.url.path)
+        remaining = self.remaining(request)
+        if remaining is None:
+            return Timeout(**timeouts)
+        remaining = max(remaining, 0.001)
+        headers[:] = [(name, value) for name, value in headers if name != self.deadline_name]
+        headers.append((self.deadline_name, str(max(1, int(remaining * 1000))).encode("latin1")))
+        return Timeout(**{name: min(value, remaining) for name, value in timeouts.items()})
@@ -0,0 +1,97 @@
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from importlib.util import find_spec
+from typing import Any
+from urllib.parse import urlsplit
+
+from httpx import AsyncBaseTransport, AsyncClient, AsyncHTTPTransport, Limits
+
+from app.logger import logger
+
+
+class UpstreamPool:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        host_max_connections: dict[str, int] | None = None,
+        http2: bool = False,
+        transport: AsyncBaseTransport | None = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.host_max_connections = host_max_connections or {}
+        self.http2 = http2 and self.http2_available()
+        self.transport = transport
+        self.clients: dict[str, AsyncClient] = {}
+        self.transports: dict[str, AsyncBaseTransport] = {}
+
+    @staticmethod
+    def http2_available() -> bool:
+        if find_spec("h2") is None:
+            logger.warning("HTTP/2 requested for upstreams but 'h2' is not installed, using HTTP/1.1")
+            return False
+        return True
+
+    @staticmethod
+    def origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def limits_for(self, origin: str) -> Limits:
+        host = urlsplit(origin).hostname or ""
+        max_connections = self.host_max_connections.get(
+            origin, self.host_max_connections.get(host, self.max_connections)
+        )
+        return Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(self.max_keepalive_connections, max_connections),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def client_for(self, url: str) -> AsyncClient:
+        origin = self.origin(url)
+        client = self.clients.get(origin)
+        if client is None or client.is_closed:
+            transport = self.transport or AsyncHTTPTransport(
+                limits=self.limits_for(origin), http2=self.http2
+            )
+            client = AsyncClient(
+                transport=transport, cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+            )
+            self.clients[origin] = client
+            self.transports[origin] = transport
+        return client
+
+    @staticmethod
+    def transport_stats(transport: AsyncBaseTransport) -> dict[str, int]:
+        pool: Any = getattr(transport, "_pool", None)
+        if isinstance(transport, AsyncHTTPTransport) and not hasattr(pool, "_requests"):
+            logger.warning("Upstream pool stats are unavailable with this httpx version")
+        connections = list(getattr(pool, "connections", []))
+        requests = list(getattr(pool, "_requests", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        closed = sum(1 for connection in connections if connection.is_closed())
+        return {
+            "connections": len(connections) - closed,
+            "in_use": len(connections) - idle - closed,
+            "idle": idle,
+            "waiting": sum(1 for request in requests if request.is_queued()),
+        }
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            origin: self.transport_stats(transport)
+            for origin, transport in self.transports.items()
+        }
+
+    async def aclose(self) -> None:
+        clients = list(self.clients.values())
+        self.clients.clear()
+        self.transports.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close upstream client: {e}")
@@ -1,4 +1,13 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+from app.rate_limit_storage import SharedMemoryStorage
+from app.settings import settings
+
+__all__ = ["SharedMemoryStorage", "limiter"]
+
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+)
@@ -1,7 +1,93 @@
-from logging import INFO, Formatter, getLogger
+from json import dumps
+from logging import INFO, Formatter, Handler, LogRecord, getLogger
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Any
+from queue import Empty, Full, Queue
+from random import random
+from threading import Thread
+from typing import Any, Literal
+
+
+class JSONFormatter(Formatter):
+    def format(self, record: LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "file": record.filename,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return dumps(entry, default=str)
+
+
+class QueueingHandler(Handler):
+    def __init__(self, queue: Queue, overflow: Literal["drop", "block"] = "drop") -> None:
+        super().__init__()
+        self.queue = queue
+        self.overflow = overflow
+        self.dropped = 0
+
+    def emit(self, record: LogRecord) -> None:
+        record.msg = record.getMessage()
+        record.args = None
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class BatchWriter(Thread):
+    def __init__(self, queue: Queue, handler: RotatingFileHandler, batch_size: int = 256) -> None:
+        super().__init__(name="securechain-log-writer", daemon=True)
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = batch_size
+
+    def run(self) -> None:
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except Empty:
+                    break
+                if record is None:
+                    self.write(batch)
+                    return
+                batch.append(record)
+            self.write(batch)
+
+    def write(self, batch: list[LogRecord]) -> None:
+        handler = self.handler
+        with handler.lock:
+            for record in batch:
+                try:
+                    msg = handler.format(record) + handler.terminator
+                    if handler.stream is None:
+                        handler.stream = handler._open()
+                    if handler.maxBytes > 0 and handler.stream.tell() + len(msg) >= handler.maxBytes:
+                        handler.doRollover()
+                    handler.stream.write(msg)
+                except Exception:
+                    handler.handleError(record)
+            if handler.stream is not None:
+                handler.stream.flush()
+
+    def stop(self) -> None:
+        self.queue.put(None)
+        self.join()
 
 
 class LoggerManager:
@@ -10,24 +96,76 @@ class LoggerManager:
         log_file: str = "errors.log",
         max_bytes: int = 5 * 1024 * 1024,
         backup_count: int = 5,
+        name: str = "securechain",
     ) -> None:
-        self.logger = getLogger("securechain")
+        self.logger = getLogger(name)
         self.logger.setLevel(INFO)
         self.logger.propagate = False
 
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
 
-        file_handler = RotatingFileHandler(
+        self.file_handler = RotatingFileHandler(
             log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
         )
-        formatter = Formatter(
+        self.formatter = Formatter(
             "%(asctime)s - %(levelname)s - %(name)s - %(filename)s:%(lineno)d - %(message)s"
         )
-        file_handler.setFormatter(formatter)
+        self.file_handler.setFormatter(self.formatter)
+        self.queue_handler: QueueingHandler | None = None
+        self.writer: BatchWriter | None = None
+        self.sample_rates: list[tuple[str, float]] = []
 
         if not self.logger.handlers:
-            self.logger.addHandler(file_handler)
+            self.logger.addHandler(self.file_handler)
+
+    @property
+    def dropped(self) -> int:
+        return self.queue_handler.dropped if self.queue_handler is not None else 0
+
+    def configure(
+        self,
+        async_mode: bool = False,
+        queue_size: int = 10000,
+        overflow: Literal["drop", "block"] = "drop",
+        batch_size: int = 256,
+        json_format: bool = False,
+        sample_rates: dict[str, float] | None = None,
+    ) -> None:
+        self.shutdown()
+        self.file_handler.setFormatter(JSONFormatter() if json_format else self.formatter)
+        self.sample_rates = sorted(
+            (sample_rates or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        if async_mode and self.file_handler in self.logger.handlers:
+            queue: Queue = Queue(maxsize=queue_size)
+            self.queue_handler = QueueingHandler(queue, overflow)
+            self.writer = BatchWriter(queue, self.file_handler, batch_size)
+            self.writer.start()
+            self.logger.removeHandler(self.file_handler)
+            self.logger.addHandler(self.queue_handler)
+
+    def shutdown(self) -> None:
+        if self.queue_handler is not None:
+            self.logger.removeHandler(self.queue_handler)
+            self.logger.addHandler(self.file_handler)
+            self.queue_handler = None
+        if self.writer is not None:
+            self.writer.stop()
+            self.writer = None
+
+    def sample_rate(self, path: str) -> float:
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return rate
+        return 1.0
+
+    def access(self, msg: str, path: str, status_code: int, **fields: Any) -> None:
+        if status_code < 500 and self.sample_rates:
+            rate = self.sample_rate(path)
+            if rate < 1.0 and random() >= rate:
+                return
+        self.logger.info(msg, extra={"fields": {"path": path, "status": status_code, **fields}}, stacklevel=2)
 
     def info(self, msg: str, *args: Any, **kwargs: Any) -> None:
         self.logger.info(msg, *args, **kwargs)
@@ -1,16 +1,56 @@
+from asyncio import to_thread
 from contextlib import asynccontextmanager
 
-from fastapi import Depends, FastAPI, Request, status
-from httpx import AsyncClient
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from slowapi.errors import RateLimitExceeded
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import PlainTextResponse, Response
 
-from app.constants import RateLimit
-from app.dependencies import get_json_encoder, get_openapi_manager, get_proxy_handler
+from app.constants import FALLBACK_OPENAPI_SCHEMA, RateLimit
+from app.dependencies import (
+    get_admission_controllers,
+    get_circuit_breakers,
+    get_json_encoder,
+    get_load_balancer,
+    get_openapi_refresher,
+    get_proxy_handler,
+    get_request_profiler,
+    get_response_cache,
+    get_service_registry,
+    get_single_flight,
+    get_upstream_pool,
+    verify_admin_token,
+)
 from app.limiter import limiter
-from app.middleware import LogRequestMiddleware
+from app.logger import logger
+from app.metrics import metrics
+from app.middleware import (
+    CompressionMiddleware,
+    LogRequestMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    ProxyDispatchMiddleware,
+    TracingMiddleware,
+)
+from app.serialization import JSONBytesResponse, dumps
 from app.settings import settings
-from app.utils import JSONEncoder, OpenAPIManager, ProxyHandler
+from app.tracing import load_sink
+from app.utils import (
+    AdmissionController,
+    CircuitBreaker,
+    JSONEncoder,
+    LoadBalancer,
+    OpenAPIRefresher,
+    ProxyHandler,
+    RequestProfiler,
+    ResponseCache,
+    ServiceRegistry,
+    SingleFlight,
+    UpstreamPool,
+)
+
+span_sink = load_sink(settings.TRACE_SINK, settings.TRACE_FILE) if settings.TRACING_ENABLED else None
 
 DESCRIPTION = """
 A tool for managing and interacting with all microservices developed by Secure Chain.
@@ -19,39 +59,34 @@ A tool for managing and interacting with all microservices developed by Secure C
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    openapi_manager: OpenAPIManager = get_openapi_manager()
-    async with AsyncClient() as client:
-        try:
-            auth = await client.get(f"{settings.AUTH_SERVICE_URL}/openapi.json")
-            auth.raise_for_status()
-            depex = await client.get(f"{settings.DEPEX_SERVICE_URL}/openapi.json")
-            depex.raise_for_status()
-            vexgen = await client.get(f"{settings.VEXGEN_SERVICE_URL}/openapi.json")
-            vexgen.raise_for_status()
-            auth_schema = auth.json()
-            depex_schema = depex.json()
-            vexgen_schema = vexgen.json()
-            app.openapi_schema = openapi_manager.merge_schemas(
-                auth_schema, depex_schema, vexgen_schema
-            )
-            app.openapi = lambda: app.openapi_schema or {
-                "openapi": "3.1.0",
-                "info": {"title": "Error", "version": "0.0.0"},
-                "paths": {},
-            }
-        except Exception as e:
-            print(f"Failed to fetch OpenAPI specs: {e}")
-            app.openapi = lambda: {
-                "openapi": "3.1.0",
-                "info": {"title": "Error", "version": "0.0.0"},
-                "paths": {},
-            }
+    logger.configure(
+        async_mode=settings.LOG_ASYNC,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        overflow=settings.LOG_OVERFLOW,
+        batch_size=settings.LOG_BATCH_SIZE,
+        json_format=settings.LOG_JSON,
+        sample_rates=settings.LOG_SAMPLE_RATES,
+    )
+    upstream_pool: UpstreamPool = get_upstream_pool()
+    openapi_refresher: OpenAPIRefresher = get_openapi_refresher()
+    app.openapi = lambda: openapi_refresher.schema or FALLBACK_OPENAPI_SCHEMA
+    openapi_refresher.start(settings.OPENAPI_REFRESH_INTERVAL)
+    load_balancer: LoadBalancer = get_load_balancer()
+    load_balancer.start(settings.HEALTH_CHECK_INTERVAL)
     yield
+    await load_balancer.stop()
+    await openapi_refresher.stop()
+    await upstream_pool.aclose()
+    if span_sink is not None:
+        span_sink.close()
+    logger.shutdown()
 
 app = FastAPI(
     title="Secure Chain Gateway",
     description=DESCRIPTION,
-    docs_url=settings.DOCS_URL,
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
     version="1.1.1",
     contact={
         "name": "Secure Chain Team",
@@ -64,7 +99,31 @@ app = FastAPI(
     },
     lifespan=lifespan
 )
+
+
+def resolve_proxy_handler() -> ProxyHandler:
+    return app.dependency_overrides.get(get_proxy_handler, get_proxy_handler)()
+
+
+app.add_middleware(
+    ProxyDispatchMiddleware,
+    registry=get_service_registry(),
+    proxy_handler=resolve_proxy_handler,
+    limiter=limiter,
+)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=settings.COMPRESSION_ENCODINGS,
+        min_size=settings.COMPRESSION_MIN_SIZE,
+        offload_size=settings.COMPRESSION_OFFLOAD_SIZE,
+    )
 app.add_middleware(LogRequestMiddleware)
+app.add_middleware(MetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=get_request_profiler())
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, sink=span_sink, server_timing=settings.SERVER_TIMING_ENABLED)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.GATEWAY_ALLOWED_ORIGINS,
@@ -74,6 +133,12 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded(request: Request, exc: RateLimitExceeded) -> Response:
+    metrics.rate_limited.inc((metrics.route(request.url.path),))
+    return JSONBytesResponse(dumps({"detail": exc.detail}), status_code=exc.status_code, headers=exc.headers)
+
+
 @app.get(
     "/health",
     summary="Health Check",
@@ -86,7 +151,7 @@ async def health_check(
     request: Request,
     json_encoder: JSONEncoder = Depends(get_json_encoder),
 ):
-    return JSONResponse(
+    return JSONBytesResponse(
         status_code=status.HTTP_200_OK,
         content=json_encoder.encode(
             {
@@ -96,34 +161,215 @@ async def health_check(
     )
 
 
-@app.api_route("/auth/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@limiter.limit(RateLimit.PROXY_AUTH)
-async def proxy_auth(
-    path: str,
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_document(
+    request: Request,
+    openapi_refresher: OpenAPIRefresher = Depends(get_openapi_refresher),
+):
+    return openapi_refresher.document.response(request.headers)
+
+
+if settings.DOCS_URL:
+    @app.get(settings.DOCS_URL, include_in_schema=False)
+    async def swagger_ui():
+        return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_admin_token)])
+@limiter.limit(RateLimit.ADMIN)
+async def prometheus_metrics(request: Request):
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get(
+    "/admin/upstreams",
+    summary="Upstream Pool Stats",
+    description="Live connection pool statistics for each upstream service.",
+    response_description="Connections in use, idle and waiting per upstream.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def upstream_stats(
+    request: Request,
+    upstream_pool: UpstreamPool = Depends(get_upstream_pool),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(upstream_pool.stats()),
+    )
+
+
+@app.get(
+    "/admin/cache",
+    summary="Response Cache Stats",
+    description="Hit, miss and eviction counters of the upstream response cache.",
+    response_description="Response cache statistics.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def cache_stats(
     request: Request,
-    proxy_handler: ProxyHandler = Depends(get_proxy_handler),
+    response_cache: ResponseCache = Depends(get_response_cache),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
 ):
-    url = f"{settings.AUTH_SERVICE_URL}/{path}"
-    return await proxy_handler.proxy_request(url, request)
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(response_cache.stats()),
+    )
 
 
-@app.api_route("/depex/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@limiter.limit(RateLimit.PROXY_DEPEX)
-async def proxy_depex(
-    path: str,
+@app.get(
+    "/admin/coalescing",
+    summary="Request Coalescing Stats",
+    description="Upstream calls made and saved by coalescing identical in-flight requests.",
+    response_description="Request coalescing statistics.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def coalescing_stats(
     request: Request,
-    proxy_handler: ProxyHandler = Depends(get_proxy_handler),
+    single_flight: SingleFlight = Depends(get_single_flight),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
 ):
-    url = f"{settings.DEPEX_SERVICE_URL}/{path}"
-    return await proxy_handler.proxy_request(url, request)
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(single_flight.stats()),
+    )
 
 
-@app.api_route("/vexgen/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
-@limiter.limit(RateLimit.PROXY_VEXGEN)
-async def proxy_vexgen(
-    path: str,
+@app.get(
+    "/admin/circuits",
+    summary="Circuit Breaker State",
+    description="State and rolling-window counters of the circuit breaker for each upstream service.",
+    response_description="Circuit breaker state per upstream.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def circuit_stats(
     request: Request,
-    proxy_handler: ProxyHandler = Depends(get_proxy_handler),
+    circuit_breakers: dict[str, CircuitBreaker] = Depends(get_circuit_breakers),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
 ):
-    url = f"{settings.VEXGEN_SERVICE_URL}/{path}"
-    return await proxy_handler.proxy_request(url, request)
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(
+            {route: breaker.stats() for route, breaker in circuit_breakers.items()}
+        ),
+    )
+
+
+@app.get(
+    "/admin/admission",
+    summary="Admission Control State",
+    description="Adaptive concurrency limit, in-flight requests, queue depth and shed count for each upstream service.",
+    response_description="Admission control state per upstream.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def admission_stats(
+    request: Request,
+    admission_controllers: dict[str, AdmissionController] = Depends(get_admission_controllers),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(
+            {route: controller.stats() for route, controller in admission_controllers.items()}
+        ),
+    )
+
+
+@app.get(
+    "/admin/replicas",
+    summary="Upstream Replica State",
+    description="Health, in-flight requests and error counters of each upstream replica.",
+    response_description="Replica state per upstream service.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def replica_stats(
+    request: Request,
+    load_balancer: LoadBalancer = Depends(get_load_balancer),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(load_balancer.stats()),
+    )
+
+
+@app.get(
+    "/admin/services",
+    summary="Service Registry",
+    description="Upstream services the gateway proxies, with their URL, rate limit, methods and replicas.",
+    response_description="Registered upstream services by path prefix.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def service_stats(
+    request: Request,
+    service_registry: ServiceRegistry = Depends(get_service_registry),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(service_registry.stats()),
+    )
+
+
+@app.get(
+    "/admin/profiles",
+    summary="Request Profiles",
+    description="Profiles captured by the on-demand request profiler, newest first.",
+    response_description="Captured and skipped counts and the profiles kept on disk.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def profile_list(
+    request: Request,
+    request_profiler: RequestProfiler = Depends(get_request_profiler),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(await to_thread(request_profiler.stats)),
+    )
+
+
+@app.get(
+    "/admin/profiles/{name}",
+    summary="Request Profile Summary",
+    description="Top frames of a captured request profile, sorted by cumulative time.",
+    response_description="Total time and the slowest frames of the profile.",
+    tags=["Secure Chain Gateway Admin"],
+    dependencies=[Depends(verify_admin_token)],
+)
+@limiter.limit(RateLimit.ADMIN)
+async def profile_summary(
+    request: Request,
+    name: str,
+    limit: int = 25,
+    request_profiler: RequestProfiler = Depends(get_request_profiler),
+    json_encoder: JSONEncoder = Depends(get_json_encoder),
+):
+    summary = await to_thread(request_profiler.summary, name, limit)
+    if summary is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="not_found")
+    return JSONBytesResponse(
+        status_code=status.HTTP_200_OK,
+        content=json_encoder.encode(summary),
+    )
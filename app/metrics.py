@@ -0,0 +1,260 @@
+from bisect import bisect_left
+from collections.abc import Iterable
+from typing import TypeVar
+
+from app.constants import METRIC_ROUTES
+
+DURATION_BUCKETS: tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+RATIO_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0)
+
+
+def escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, labels: tuple = ()) -> float:
+        return self.values.get(labels, 0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, labels: tuple = (), value: float = 0) -> None:
+        self.values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, labels: tuple = ()) -> float:
+        series = self.series.get(labels)
+        return series[-1] if series is not None else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self.series.items():
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, "+Inf"), series[:-2], strict=True):
+                cumulative += count
+                le = 'le="' + str(bound) + '"'
+                yield f"{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{format_labels(self.labels, labels)} {series[-2]}"
+            yield f"{self.name}_count{format_labels(self.labels, labels)} {series[-1]}"
+
+
+Collector = TypeVar("Collector", "Counter", "Gauge", "Histogram")
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self.requests = Counter(
+            "gateway_requests_total", "Requests handled by the gateway.", ("route", "method", "status")
+        )
+        self.request_duration = Histogram(
+            "gateway_request_duration_seconds",
+            "Total time spent handling a request in the gateway.",
+            ("route", "method", "status"),
+        )
+        self.request_bytes = Counter(
+            "gateway_request_bytes_total", "Request body bytes received from clients.", ("route", "method", "status")
+        )
+        self.response_bytes = Counter(
+            "gateway_response_bytes_total", "Response body bytes sent to clients.", ("route", "method", "status")
+        )
+        self.upstream_ttfb = Histogram(
+            "gateway_upstream_ttfb_seconds", "Time until upstream response headers arrive.", ("route",)
+        )
+        self.upstream_duration = Histogram(
+            "gateway_upstream_duration_seconds", "Time until the upstream response body is complete.", ("route",)
+        )
+        self.rate_limited = Counter(
+            "gateway_rate_limited_total", "Requests rejected by the rate limiter.", ("route",)
+        )
+        self.upstream_errors = Counter(
+            "gateway_upstream_errors_total", "Proxied requests answered with 502 after an upstream failure.", ("route",)
+        )
+        self.compression_input_bytes = Counter(
+            "gateway_compression_input_bytes_total", "Response bytes fed to the compressor.", ("route", "encoding")
+        )
+        self.compression_output_bytes = Counter(
+            "gateway_compression_output_bytes_total", "Compressed response bytes sent to clients.", ("route", "encoding")
+        )
+        self.compression_cpu = Counter(
+            "gateway_compression_cpu_seconds_total", "CPU time spent compressing responses.", ("route", "encoding")
+        )
+        self.compression_ratio = Histogram(
+            "gateway_compression_ratio",
+            "Compressed to uncompressed size ratio per response.",
+            ("route", "encoding"),
+            RATIO_BUCKETS,
+        )
+        self.circuit_state = Gauge(
+            "gateway_circuit_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).", ("route",)
+        )
+        self.circuit_transitions = Counter(
+            "gateway_circuit_transitions_total", "Circuit breaker state changes per upstream.", ("route", "state")
+        )
+        self.circuit_rejected = Counter(
+            "gateway_circuit_rejected_total", "Requests failed fast by an open circuit breaker.", ("route",)
+        )
+        self.replica_outstanding = Gauge(
+            "gateway_upstream_replica_outstanding", "In-flight requests per upstream replica.", ("replica",)
+        )
+        self.replica_healthy = Gauge(
+            "gateway_upstream_replica_healthy", "Last active health check result per upstream replica.", ("replica",)
+        )
+        self.replica_ejections = Counter(
+            "gateway_upstream_replica_ejections_total", "Times an upstream replica was taken out of rotation.", ("replica",)
+        )
+        self.upstream_retries = Counter(
+            "gateway_upstream_retries_total", "Idempotent upstream requests retried after a failure.", ("route",)
+        )
+        self.upstream_hedges = Counter(
+            "gateway_upstream_hedges_total", "Hedged duplicate upstream requests sent.", ("route",)
+        )
+        self.retry_budget_exhausted = Counter(
+            "gateway_retry_budget_exhausted_total", "Retries skipped because the retry budget was spent.", ("route",)
+        )
+        self.upstream_timeouts = Counter(
+            "gateway_upstream_timeouts_total", "Proxied requests answered with 504 after an upstream timeout.", ("route",)
+        )
+        self.deadline_exceeded = Counter(
+            "gateway_deadline_exceeded_total", "Proxied requests answered with 504 after the client deadline ran out.", ("route",)
+        )
+        self.profiles = Counter("gateway_profiles_total", "Requests captured by the on-demand profiler.", ("route",))
+        self.admission_limit = Gauge(
+            "gateway_admission_limit", "Adaptive concurrency limit per upstream.", ("route",)
+        )
+        self.admission_in_flight = Gauge(
+            "gateway_admission_in_flight", "Admitted requests in flight per upstream.", ("route",)
+        )
+        self.admission_queue_depth = Gauge(
+            "gateway_admission_queue_depth", "Requests waiting for an upstream concurrency slot.", ("route",)
+        )
+        self.admission_shed = Counter(
+            "gateway_admission_shed_total", "Requests shed with 503 by admission control.", ("route", "reason")
+        )
+        self.routes: set[str] = set(METRIC_ROUTES)
+        self.collectors: list[Counter | Gauge | Histogram] = [
+            self.requests,
+            self.request_duration,
+            self.request_bytes,
+            self.response_bytes,
+            self.upstream_ttfb,
+            self.upstream_duration,
+            self.rate_limited,
+            self.upstream_errors,
+            self.compression_input_bytes,
+            self.compression_output_bytes,
+            self.compression_cpu,
+            self.compression_ratio,
+            self.circuit_state,
+            self.circuit_transitions,
+            self.circuit_rejected,
+            self.replica_outstanding,
+            self.replica_healthy,
+            self.replica_ejections,
+            self.upstream_retries,
+            self.upstream_hedges,
+            self.retry_budget_exhausted,
+            self.upstream_timeouts,
+            self.deadline_exceeded,
+            self.profiles,
+            self.admission_limit,
+            self.admission_in_flight,
+            self.admission_queue_depth,
+            self.admission_shed,
+        ]
+
+    def route(self, path: str) -> str:
+        segment = path[1:].partition("/")[0]
+        return segment if segment in self.routes else "gateway"
+
+    def register(self, collector: Collector) -> Collector:
+        self.collectors.append(collector)
+        return collector
+
+    def observe_request(
+        self, route: str, method: str, status: int, duration: float, received: int, sent: int
+    ) -> None:
+        labels = (route, method, status)
+        self.requests.inc(labels)
+        self.request_duration.observe(labels, duration)
+        if received:
+            self.request_bytes.inc(labels, received)
+        if sent:
+            self.response_bytes.inc(labels, sent)
+
+    def observe_compression(
+        self, route: str, encoding: str, received: int, sent: int, cpu_time: float
+    ) -> None:
+        labels = (route, encoding)
+        self.compression_input_bytes.inc(labels, received)
+        self.compression_output_bytes.inc(labels, sent)
+        self.compression_cpu.inc(labels, cpu_time)
+        if received:
+            self.compression_ratio.observe(labels, sent / received)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for collector in self.collectors:
+            lines.append(f"# HELP {collector.name} {collector.documentation}")
+            lines.append(f"# TYPE {collector.name} {collector.kind}")
+            lines.extend(collector.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for collector in self.collectors:
+            if isinstance(collector, Histogram):
+                collector.series.clear()
+            else:
+                collector.values.clear()
+
+
+metrics: Metrics = Metrics()
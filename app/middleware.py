@@ -1,28 +1,297 @@
+from asyncio import to_thread
 from collections.abc import Callable
 from http import HTTPStatus
-from time import time
+from time import perf_counter
 
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.compression import ENCODERS, Encoder, is_compressible, negotiate, timed
+from app.constants import HTTP_METHODS
 from app.logger import logger
+from app.metrics import metrics
+from app.serialization import JSONBytesResponse, dumps
+from app.tracing import SpanSink, Trace, current_trace
+from app.utils import ProxyHandler, RequestProfiler, ServiceRegistry, ServiceRoute
 
+STATUS_PHRASES: dict[int, str] = {status.value: status.phrase for status in HTTPStatus}
+
+
+class LogRequestMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            process_time = (perf_counter() - start_time) * 1000
+            path = scope["path"]
+            query_string = scope.get("query_string", b"")
+            url = f"{path}?{query_string.decode('latin1')}" if query_string else path
+            host, port = scope.get("client") or (None, None)
+            trace = current_trace.get()
+            logger.access(
+                f'{host}:{port} - "{scope["method"]} {url}" {status_code} '
+                f"{STATUS_PHRASES.get(status_code, '')} {process_time:.2f}ms",
+                path,
+                status_code,
+                method=scope["method"],
+                client=host,
+                duration_ms=round(process_time, 2),
+                trace_id=trace.trace_id if trace is not None else None,
+            )
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = perf_counter()
+        status_code = 500
+        received = 0
+        sent = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            metrics.observe_request(
+                metrics.route(scope["path"]),
+                method,
+                status_code,
+                perf_counter() - start_time,
+                received,
+                sent,
+            )
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: list[str] | tuple[str, ...] = ("zstd", "br", "gzip"),
+        min_size: int = 1024,
+        offload_size: int = 64 * 1024,
+    ) -> None:
+        self.app = app
+        self.encodings = tuple(encoding for encoding in encodings if encoding in ENCODERS)
+        self.min_size = min_size
+        self.offload_size = offload_size
+
+    async def compress(self, fn: Callable[[bytes], bytes], data: bytes) -> tuple[bytes, float]:
+        if len(data) >= self.offload_size:
+            return await to_thread(timed, fn, data)
+        return timed(fn, data)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = metrics.route(scope["path"]) if scope["type"] == "http" else "gateway"
+        if route == "gateway" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        encoder: Encoder | None = None
+        received = 0
+        sent = 0
+        cpu_time = 0.0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, encoder, received, sent, cpu_time
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                length = headers.get("content-length")
+                size = int(length) if length is not None else self.min_size if more_body else len(body)
+                if (
+                    "content-encoding" not in headers
+                    and is_compressible(headers.get("content-type", ""))
+                    and size >= self.min_size
+                ):
+                    encoder = ENCODERS[encoding]()
+                    headers["content-encoding"] = encoding
+                    headers.add_vary_header("accept-encoding")
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    etag = headers.get("etag")
+                    if etag is not None and not etag.startswith("W/"):
+                        headers["etag"] = f"W/{etag}"
+                await send(start_message)
+                start_message = None
+
+            if encoder is None:
+                await send(message)
+                return
+
+            output, elapsed = await self.compress(encoder.compress, body)
+            if not more_body:
+                output += encoder.flush()
+            received += len(body)
+            sent += len(output)
+            cpu_time += elapsed
+            await send({"type": "http.response.body", "body": output, "more_body": more_body})
+            if not more_body:
+                metrics.observe_compression(route, encoding, received, sent, cpu_time)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class ProxyDispatchMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        registry: ServiceRegistry,
+        proxy_handler: Callable[[], ProxyHandler],
+        limiter: Limiter,
+    ) -> None:
+        self.app = app
+        self.registry = registry
+        self.proxy_handler = proxy_handler
+        self.limiter = limiter
+
+    def allowed(self, route: ServiceRoute, request: Request) -> bool:
+        if not self.limiter.enabled:
+            return True
+        return self.limiter.limiter.hit(route.limit, get_remote_address(request), f"proxy:{route.name}")
+
+    async def dispatch(self, route: ServiceRoute, request: Request) -> Response:
+        if request.method not in route.methods:
+            return JSONBytesResponse(
+                dumps({"detail": "Method Not Allowed"}),
+                status_code=405,
+                headers={"allow": ", ".join(sorted(route.methods))},
+            )
+        trace = current_trace.get()
+        start_time = perf_counter()
+        allowed = self.allowed(route, request)
+        if trace is not None:
+            trace.add("ratelimit", perf_counter() - start_time)
+        if not allowed:
+            logger.warning(f"Rate limit {route.limit} exceeded for {route.name}")
+            metrics.rate_limited.inc((route.name,))
+            return JSONBytesResponse(dumps({"detail": str(route.limit)}), status_code=429)
+        return await self.proxy_handler().proxy_request(route.upstream_url(request.scope["path"]), request)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.registry.match(scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        response = await self.dispatch(route, Request(scope, receive))
+        await response(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, profiler: RequestProfiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.wants(Headers(scope=scope)):
+            await self.app(scope, receive, send)
+            return
+
+        header = self.profiler.header.encode("latin1")
+        scope = {**scope, "headers": [(name, value) for name, value in scope["headers"] if name != header]}
+        profile = self.profiler.start()
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        route = metrics.route(scope["path"])
+        name = self.profiler.name_for(scope["method"], route)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-gateway-profile-id", name.encode("latin1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.profiler.stop(profile)
+            metrics.profiles.inc((route,))
+            await self.profiler.save(profile, name)
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp, sink: SpanSink | None = None, server_timing: bool = True) -> None:
+        self.app = app
+        self.sink = sink
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = next((value for name, value in scope["headers"] if name == b"traceparent"), None)
+        trace = Trace(traceparent.decode("latin1") if traceparent is not None else None)
+        token = current_trace.set(trace)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"server-timing", trace.server_timing().encode("latin1")),
+                    ]
+            await send(message)
 
-class LogRequestMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        url = f"{request.url.path}?{request.query_params}" if request.query_params else request.url.path
-        start_time = time()
-        response = await call_next(request)
-        process_time = (time() - start_time) * 1000
-        formatted_process_time = f"{process_time:.2f}"
-        host = getattr(getattr(request, "client", None), "host", None)
-        port = getattr(getattr(request, "client", None), "port", None)
         try:
-            status_phrase = HTTPStatus(response.status_code).phrase
-        except ValueError:
-            status_phrase = ""
-        logger.info(
-            f'{host}:{port} - "{request.method} {url}" {response.status_code} {status_phrase} {formatted_process_time}ms'
-        )
-        return response
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_trace.reset(token)
+            if self.sink is not None:
+                self.sink.export(trace.span(scope["method"], metrics.route(scope["path"]), scope["path"], status_code))
@@ -0,0 +1,191 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from fcntl import LOCK_EX, LOCK_UN, flock
+from hashlib import blake2b
+from math import floor
+from mmap import mmap
+from os import O_CREAT, O_RDWR, fstat, ftruncate, pread, pwrite
+from os import close as close_fd
+from os import open as open_fd
+from pathlib import Path
+from struct import Struct
+from tempfile import gettempdir
+from threading import Lock
+from time import time
+from typing import ClassVar
+from urllib.parse import parse_qs, urlsplit
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+
+HEADER = Struct("<4sIQ")
+MAGIC = b"SCRL"
+VERSION = 1
+SLOT = Struct("<Qqqqqdd")
+EMPTY_SLOT = bytes(SLOT.size)
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    STORAGE_SCHEME: ClassVar[list[str]] = ["shm"]
+
+    def __init__(
+        self,
+        uri: str | None = None,
+        wrap_exceptions: bool = False,
+        slots: int = 8192,
+        probes: int = 8,
+        **options: float | str | bool,
+    ) -> None:
+        parts = urlsplit(uri or "shm://securechain-gateway-ratelimit")
+        name = f"{parts.netloc}{parts.path}"
+        slots = int(parse_qs(parts.query).get("slots", [slots])[0])
+        shm_dir = Path("/dev/shm")
+        base = shm_dir if shm_dir.is_dir() else Path(gettempdir())
+        self.path = Path(name) if name.startswith("/") else base / name
+        self.lock = Lock()
+        self.fd = open_fd(self.path, O_RDWR | O_CREAT, 0o600)
+        with self.locked():
+            if fstat(self.fd).st_size < HEADER.size:
+                ftruncate(self.fd, HEADER.size + slots * SLOT.size)
+                pwrite(self.fd, HEADER.pack(MAGIC, VERSION, slots), 0)
+            magic, _, self.slots = HEADER.unpack(pread(self.fd, HEADER.size, 0))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a rate limit storage file")
+        self.buffer = mmap(self.fd, HEADER.size + self.slots * SLOT.size)
+        self.probes = min(probes, self.slots)
+        self.evictions = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> type[Exception] | tuple[type[Exception], ...]:
+        return OSError
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        with self.lock:
+            flock(self.fd, LOCK_EX)
+            try:
+                yield
+            finally:
+                flock(self.fd, LOCK_UN)
+
+    @staticmethod
+    def key_hash(key: str) -> int:
+        return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def offset(self, index: int) -> int:
+        return HEADER.size + index * SLOT.size
+
+    def read(self, index: int) -> tuple:
+        return SLOT.unpack_from(self.buffer, self.offset(index))
+
+    def write(self, index: int, *row: float) -> None:
+        SLOT.pack_into(self.buffer, self.offset(index), *row)
+
+    def find(self, key: str, now: float, expiry: int, create: bool) -> int | None:
+        key_hash = self.key_hash(key)
+        start = key_hash % self.slots
+        free: int | None = None
+        oldest: int | None = None
+        oldest_touched = now
+        for probe in range(self.probes):
+            index = (start + probe) % self.slots
+            slot_key, slot_expiry, _, _, _, _, touched = self.read(index)
+            if slot_key == key_hash:
+                return index
+            if slot_key == 0 or now - touched > 2 * max(slot_expiry, 1):
+                if free is None:
+                    free = index
+            elif touched <= oldest_touched:
+                oldest, oldest_touched = index, touched
+        if not create:
+            return None
+        if free is None:
+            free = oldest if oldest is not None else start
+            self.evictions += 1
+        self.write(free, key_hash, expiry, 0, 0, 0, 0.0, now)
+        return free
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time()
+        with self.locked():
+            index = self.find(key, now, expiry, create=True)
+            slot_key, _, window, current, previous, reset_at, _ = self.read(index)
+            if now >= reset_at:
+                current, reset_at = 0, now + expiry
+            current += amount
+            self.write(index, slot_key, expiry, window, current, previous, reset_at, now)
+            return current
+
+    def get(self, key: str) -> int:
+        now = time()
+        with self.locked():
+            index = self.find(key, now, 0, create=False)
+            if index is None:
+                return 0
+            _, _, _, current, _, reset_at, _ = self.read(index)
+            return current if now < reset_at else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time()
+        with self.locked():
+            index = self.find(key, now, 0, create=False)
+            if index is None:
+                return now
+            return max(self.read(index)[5], now)
+
+    def clear(self, key: str) -> None:
+        with self.locked():
+            index = self.find(key, time(), 0, create=False)
+            if index is not None:
+                self.buffer[self.offset(index) : self.offset(index + 1)] = EMPTY_SLOT
+
+    def reset(self) -> int | None:
+        with self.locked():
+            cleared = sum(1 for index in range(self.slots) if self.read(index)[0])
+            self.buffer[HEADER.size :] = bytes(self.slots * SLOT.size)
+            return cleared
+
+    def check(self) -> bool:
+        return not self.buffer.closed
+
+    @staticmethod
+    def roll(window: int, slot_window: int, current: int, previous: int) -> tuple[int, int]:
+        if slot_window == window:
+            return current, previous
+        if slot_window == window - 1:
+            return 0, current
+        return 0, 0
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time()
+        window = int(now // expiry)
+        with self.locked():
+            index = self.find(key, now, expiry, create=True)
+            slot_key, _, slot_window, current, previous, reset_at, _ = self.read(index)
+            current, previous = self.roll(window, slot_window, current, previous)
+            weighted = previous * (expiry - now % expiry) / expiry + current
+            acquired = floor(weighted) + amount <= limit
+            if acquired:
+                current += amount
+            self.write(index, slot_key, expiry, window, current, previous, reset_at, now)
+            return acquired
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        now = time()
+        remaining = expiry - now % expiry
+        with self.locked():
+            index = self.find(key, now, expiry, create=False)
+            if index is None:
+                return 0, 0.0, 0, remaining + expiry
+            _, _, slot_window, current, previous, _, _ = self.read(index)
+        current, previous = self.roll(int(now // expiry), slot_window, current, previous)
+        return previous, remaining if previous else 0.0, current, remaining + expiry
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
+
+    def close(self) -> None:
+        self.buffer.close()
+        close_fd(self.fd)
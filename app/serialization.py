@@ -0,0 +1,42 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from json import dumps as json_dumps
+from json import loads as json_loads
+from typing import Any
+from uuid import UUID
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def default(o: Any) -> Any:
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, (UUID, Decimal)):
+        return str(o)
+    if isinstance(o, (set, frozenset, tuple)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json_dumps(obj, default=default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json_loads(data)
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
@@ -0,0 +1,190 @@
+from importlib.util import find_spec
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from os import environ, process_cpu_count
+from signal import SIGINT, SIGTERM, signal
+from socket import AF_INET, AF_INET6, SO_REUSEADDR, SOL_SOCKET, socket
+from threading import Event
+from time import monotonic
+from typing import Any
+
+from uvicorn import Config, Server
+
+from app.logger import logger
+from app.settings import settings
+
+try:
+    from socket import SO_REUSEPORT
+except ImportError:
+    SO_REUSEPORT = None
+
+SHARED_RATE_LIMIT_STORAGE = "shm://securechain-gateway-ratelimit"
+
+
+def worker_count(workers: int) -> int:
+    return workers if workers > 0 else process_cpu_count() or 1
+
+
+def event_loop() -> str:
+    return "uvloop" if find_spec("uvloop") is not None else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if find_spec("httptools") is not None else "h11"
+
+
+def server_options(
+    app: str, host: str, port: int, graceful_timeout: float, access_log: bool = True, backlog: int = 2048
+) -> dict[str, Any]:
+    return {
+        "app": app,
+        "host": host,
+        "port": port,
+        "backlog": backlog,
+        "loop": event_loop(),
+        "http": http_protocol(),
+        "access_log": access_log,
+        "timeout_graceful_shutdown": graceful_timeout,
+    }
+
+
+def bind_socket(host: str, port: int, reuse_port: bool, backlog: int = 2048) -> socket:
+    sock = socket(AF_INET6 if ":" in host else AF_INET)
+    sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(options: dict[str, Any], sock: socket | None) -> None:
+    if sock is None:
+        sock = bind_socket(options["host"], options["port"], reuse_port=True, backlog=options["backlog"])
+    Server(Config(**options)).run(sockets=[sock])
+
+
+class Worker:
+    __slots__ = ("backoff", "process", "restart_at", "started")
+
+    def __init__(self, process: BaseProcess) -> None:
+        self.process = process
+        self.started = monotonic()
+        self.restart_at = 0.0
+        self.backoff = 0.0
+
+
+class Supervisor:
+    def __init__(
+        self,
+        app: str = "app.main:app",
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 1,
+        graceful_timeout: float = 30.0,
+        restart_delay: float = 1.0,
+        restart_delay_max: float = 30.0,
+        access_log: bool = True,
+        backlog: int = 2048,
+        reuse_port: bool | None = None,
+    ) -> None:
+        self.workers = worker_count(workers)
+        self.graceful_timeout = graceful_timeout
+        self.restart_delay = restart_delay
+        self.restart_delay_max = restart_delay_max
+        self.reuse_port = SO_REUSEPORT is not None if reuse_port is None else reuse_port
+        self.options = server_options(app, host, port, graceful_timeout, access_log, backlog)
+        self.context = get_context("spawn")
+        self.sock: socket | None = None
+        self.pool: list[Worker] = []
+        self.should_exit = Event()
+
+    def spawn(self) -> BaseProcess:
+        process = self.context.Process(target=serve, args=(self.options, self.sock), daemon=False)
+        process.start()
+        return process
+
+    def start(self) -> None:
+        if not self.reuse_port:
+            self.sock = bind_socket(self.options["host"], self.options["port"], False, self.options["backlog"])
+        self.pool = [Worker(self.spawn()) for _ in range(self.workers)]
+        logger.info(
+            f"Started {self.workers} gateway workers on {self.options['host']}:{self.options['port']} "
+            f"(loop={self.options['loop']}, http={self.options['http']}, reuse_port={self.reuse_port})"
+        )
+
+    def reap(self) -> None:
+        now = monotonic()
+        for worker in self.pool:
+            if worker.process.is_alive():
+                continue
+            if not worker.restart_at:
+                uptime = now - worker.started
+                worker.backoff = (
+                    self.restart_delay
+                    if uptime > self.restart_delay_max
+                    else min(self.restart_delay_max, max(self.restart_delay, worker.backoff * 2))
+                )
+                worker.restart_at = now + worker.backoff
+                logger.warning(
+                    f"Gateway worker {worker.process.pid} exited with code {worker.process.exitcode}, "
+                    f"restarting in {worker.backoff:.1f}s"
+                )
+            elif now >= worker.restart_at:
+                worker.process = self.spawn()
+                worker.started = now
+                worker.restart_at = 0.0
+
+    def stop(self) -> None:
+        for worker in self.pool:
+            if worker.process.is_alive():
+                worker.process.terminate()
+        deadline = monotonic() + self.graceful_timeout + 5.0
+        for worker in self.pool:
+            worker.process.join(max(0.0, deadline - monotonic()))
+            if worker.process.is_alive():
+                logger.warning(f"Gateway worker {worker.process.pid} did not drain in time, killing it")
+                worker.process.kill()
+                worker.process.join()
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def handle_exit(self, signum: int, frame: Any) -> None:
+        self.should_exit.set()
+
+    def run(self) -> None:
+        signal(SIGTERM, self.handle_exit)
+        signal(SIGINT, self.handle_exit)
+        self.start()
+        try:
+            while not self.should_exit.wait(0.5):
+                self.reap()
+        finally:
+            logger.info("Draining gateway workers")
+            self.stop()
+
+
+def main() -> None:
+    workers = worker_count(settings.GATEWAY_WORKERS)
+    if workers > 1 and "RATE_LIMIT_STORAGE_URI" not in settings.model_fields_set:
+        environ["RATE_LIMIT_STORAGE_URI"] = SHARED_RATE_LIMIT_STORAGE
+    if workers == 1:
+        options = server_options(
+            "app.main:app",
+            settings.GATEWAY_HOST,
+            settings.GATEWAY_PORT,
+            settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+            settings.SERVER_ACCESS_LOG,
+        )
+        Server(Config(**options)).run()
+        return
+    Supervisor(
+        host=settings.GATEWAY_HOST,
+        port=settings.GATEWAY_PORT,
+        workers=workers,
+        graceful_timeout=settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        restart_delay=settings.WORKER_RESTART_DELAY,
+        access_log=settings.SERVER_ACCESS_LOG,
+    ).run()
@@ -1,4 +1,7 @@
 from functools import lru_cache
+from pathlib import Path
+from tempfile import gettempdir
+from typing import Any, Literal
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -12,9 +15,131 @@ class Settings(BaseSettings):
     DEPEX_SERVICE_URL: str = Field(..., alias="DEPEX_SERVICE_URL")
     VEXGEN_SERVICE_URL: str = Field(..., alias="VEXGEN_SERVICE_URL")
 
+    # Additional or overridden upstream services, keyed by path prefix
+    GATEWAY_SERVICES: dict[str, dict[str, Any]] = Field({}, alias="GATEWAY_SERVICES")
+
     # Application settings (safe defaults)
     DOCS_URL: str | None = Field(None, alias="DOCS_URL")
     GATEWAY_ALLOWED_ORIGINS: list[str] = Field(["*"], alias="GATEWAY_ALLOWED_ORIGINS")
+    ADMIN_TOKEN: str | None = Field(None, alias="ADMIN_TOKEN")
+
+    # Server processes
+    GATEWAY_HOST: str = Field("0.0.0.0", alias="GATEWAY_HOST")
+    GATEWAY_PORT: int = Field(8000, alias="GATEWAY_PORT")
+    GATEWAY_WORKERS: int = Field(1, alias="GATEWAY_WORKERS")
+    GRACEFUL_SHUTDOWN_TIMEOUT: float = Field(30.0, alias="GRACEFUL_SHUTDOWN_TIMEOUT")
+    WORKER_RESTART_DELAY: float = Field(1.0, alias="WORKER_RESTART_DELAY")
+    SERVER_ACCESS_LOG: bool = Field(True, alias="SERVER_ACCESS_LOG")
+
+    # Logging
+    LOG_ASYNC: bool = Field(False, alias="LOG_ASYNC")
+    LOG_QUEUE_SIZE: int = Field(10000, alias="LOG_QUEUE_SIZE")
+    LOG_OVERFLOW: Literal["drop", "block"] = Field("drop", alias="LOG_OVERFLOW")
+    LOG_BATCH_SIZE: int = Field(256, alias="LOG_BATCH_SIZE")
+    LOG_JSON: bool = Field(False, alias="LOG_JSON")
+    LOG_SAMPLE_RATES: dict[str, float] = Field({}, alias="LOG_SAMPLE_RATES")
+
+    # Upstream connection pool
+    UPSTREAM_MAX_CONNECTIONS: int = Field(100, alias="UPSTREAM_MAX_CONNECTIONS")
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = Field(20, alias="UPSTREAM_MAX_KEEPALIVE_CONNECTIONS")
+    UPSTREAM_KEEPALIVE_EXPIRY: float = Field(30.0, alias="UPSTREAM_KEEPALIVE_EXPIRY")
+    UPSTREAM_HOST_MAX_CONNECTIONS: dict[str, int] = Field({}, alias="UPSTREAM_HOST_MAX_CONNECTIONS")
+    UPSTREAM_CONNECT_TIMEOUT: float = Field(5.0, alias="UPSTREAM_CONNECT_TIMEOUT")
+    UPSTREAM_READ_TIMEOUT: float = Field(5.0, alias="UPSTREAM_READ_TIMEOUT")
+    UPSTREAM_WRITE_TIMEOUT: float = Field(5.0, alias="UPSTREAM_WRITE_TIMEOUT")
+    UPSTREAM_POOL_TIMEOUT: float = Field(5.0, alias="UPSTREAM_POOL_TIMEOUT")
+    UPSTREAM_ROUTE_TIMEOUTS: dict[str, dict[str, float]] = Field({}, alias="UPSTREAM_ROUTE_TIMEOUTS")
+    DEADLINE_HEADER: str = Field("x-request-timeout-ms", alias="DEADLINE_HEADER")
+    DEADLINE_MAX: float = Field(300.0, alias="DEADLINE_MAX")
+    UPSTREAM_HTTP2: bool = Field(False, alias="UPSTREAM_HTTP2")
+
+    # Proxy behaviour
+    PROXY_STREAMING: bool = Field(False, alias="PROXY_STREAMING")
+
+    # Response cache for idempotent upstream GETs
+    CACHE_ENABLED: bool = Field(False, alias="CACHE_ENABLED")
+    CACHE_MAX_BYTES: int = Field(64 * 1024 * 1024, alias="CACHE_MAX_BYTES")
+    CACHE_MAX_ENTRY_BYTES: int = Field(4 * 1024 * 1024, alias="CACHE_MAX_ENTRY_BYTES")
+    CACHE_DEFAULT_TTL: float = Field(0.0, alias="CACHE_DEFAULT_TTL")
+    CACHE_ROUTE_TTLS: dict[str, float] = Field({}, alias="CACHE_ROUTE_TTLS")
+
+    # Request coalescing for identical in-flight GETs
+    COALESCE_ENABLED: bool = Field(False, alias="COALESCE_ENABLED")
+
+    # OpenAPI aggregation
+    OPENAPI_FETCH_TIMEOUT: float = Field(5.0, alias="OPENAPI_FETCH_TIMEOUT")
+    OPENAPI_SERVICE_TIMEOUTS: dict[str, float] = Field({}, alias="OPENAPI_SERVICE_TIMEOUTS")
+    OPENAPI_REFRESH_INTERVAL: float = Field(300.0, alias="OPENAPI_REFRESH_INTERVAL")
+    OPENAPI_SNAPSHOT_PATH: str | None = Field(
+        str(Path(gettempdir()) / "gateway-openapi.json"), alias="OPENAPI_SNAPSHOT_PATH"
+    )
+
+    # Per-upstream circuit breaker
+    CIRCUIT_BREAKER_ENABLED: bool = Field(False, alias="CIRCUIT_BREAKER_ENABLED")
+    CIRCUIT_BREAKER_WINDOW: float = Field(30.0, alias="CIRCUIT_BREAKER_WINDOW")
+    CIRCUIT_BREAKER_MIN_REQUESTS: int = Field(20, alias="CIRCUIT_BREAKER_MIN_REQUESTS")
+    CIRCUIT_BREAKER_ERROR_RATE: float = Field(0.5, alias="CIRCUIT_BREAKER_ERROR_RATE")
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION: float = Field(5.0, alias="CIRCUIT_BREAKER_SLOW_CALL_DURATION")
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = Field(0.8, alias="CIRCUIT_BREAKER_SLOW_CALL_RATE")
+    CIRCUIT_BREAKER_OPEN_DURATION: float = Field(30.0, alias="CIRCUIT_BREAKER_OPEN_DURATION")
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = Field(3, alias="CIRCUIT_BREAKER_HALF_OPEN_CALLS")
+
+    # Upstream replicas and load balancing
+    AUTH_SERVICE_REPLICAS: list[str] = Field([], alias="AUTH_SERVICE_REPLICAS")
+    DEPEX_SERVICE_REPLICAS: list[str] = Field([], alias="DEPEX_SERVICE_REPLICAS")
+    VEXGEN_SERVICE_REPLICAS: list[str] = Field([], alias="VEXGEN_SERVICE_REPLICAS")
+    LOAD_BALANCER_STRATEGY: Literal["p2c", "least_outstanding"] = Field("p2c", alias="LOAD_BALANCER_STRATEGY")
+    LOAD_BALANCER_EJECT_FAILURES: int = Field(5, alias="LOAD_BALANCER_EJECT_FAILURES")
+    LOAD_BALANCER_EJECT_DURATION: float = Field(30.0, alias="LOAD_BALANCER_EJECT_DURATION")
+    HEALTH_CHECK_PATH: str = Field("/health", alias="HEALTH_CHECK_PATH")
+    HEALTH_CHECK_INTERVAL: float = Field(10.0, alias="HEALTH_CHECK_INTERVAL")
+    HEALTH_CHECK_TIMEOUT: float = Field(2.0, alias="HEALTH_CHECK_TIMEOUT")
+
+    # Admission control and load shedding per upstream
+    ADMISSION_CONTROL_ENABLED: bool = Field(False, alias="ADMISSION_CONTROL_ENABLED")
+    ADMISSION_MAX_CONCURRENCY: int = Field(100, alias="ADMISSION_MAX_CONCURRENCY")
+    ADMISSION_MIN_CONCURRENCY: int = Field(4, alias="ADMISSION_MIN_CONCURRENCY")
+    ADMISSION_QUEUE_SIZE: int = Field(100, alias="ADMISSION_QUEUE_SIZE")
+    ADMISSION_TARGET_DELAY: float = Field(0.1, alias="ADMISSION_TARGET_DELAY")
+    ADMISSION_INTERVAL: float = Field(1.0, alias="ADMISSION_INTERVAL")
+    ADMISSION_MAX_WAIT: float = Field(5.0, alias="ADMISSION_MAX_WAIT")
+
+    # Retries and hedging for idempotent requests
+    RETRY_ROUTES: list[str] = Field([], alias="RETRY_ROUTES")
+    RETRY_MAX_ATTEMPTS: int = Field(3, alias="RETRY_MAX_ATTEMPTS")
+    RETRY_BACKOFF_BASE: float = Field(0.05, alias="RETRY_BACKOFF_BASE")
+    RETRY_BACKOFF_MAX: float = Field(1.0, alias="RETRY_BACKOFF_MAX")
+    RETRY_TIME_BUDGET: float = Field(3.0, alias="RETRY_TIME_BUDGET")
+    RETRY_BUDGET_RATIO: float = Field(0.1, alias="RETRY_BUDGET_RATIO")
+    RETRY_BUDGET_MIN_PER_SECOND: float = Field(1.0, alias="RETRY_BUDGET_MIN_PER_SECOND")
+    HEDGE_ROUTES: list[str] = Field([], alias="HEDGE_ROUTES")
+    HEDGE_QUANTILE: float = Field(0.95, alias="HEDGE_QUANTILE")
+    HEDGE_MIN_DELAY: float = Field(0.01, alias="HEDGE_MIN_DELAY")
+
+    # Compression of proxied responses
+    COMPRESSION_ENABLED: bool = Field(False, alias="COMPRESSION_ENABLED")
+    COMPRESSION_ENCODINGS: list[str] = Field(["zstd", "br", "gzip"], alias="COMPRESSION_ENCODINGS")
+    COMPRESSION_MIN_SIZE: int = Field(1024, alias="COMPRESSION_MIN_SIZE")
+    COMPRESSION_OFFLOAD_SIZE: int = Field(64 * 1024, alias="COMPRESSION_OFFLOAD_SIZE")
+
+    # Tracing and Server-Timing
+    TRACING_ENABLED: bool = Field(True, alias="TRACING_ENABLED")
+    SERVER_TIMING_ENABLED: bool = Field(True, alias="SERVER_TIMING_ENABLED")
+    TRACE_SINK: str = Field("none", alias="TRACE_SINK")
+    TRACE_FILE: str = Field("logs/spans.jsonl", alias="TRACE_FILE")
+
+    # On-demand request profiling
+    PROFILING_ENABLED: bool = Field(False, alias="PROFILING_ENABLED")
+    PROFILE_SAMPLE_RATE: float = Field(0.0, alias="PROFILE_SAMPLE_RATE")
+    PROFILE_HEADER: str = Field("x-gateway-profile", alias="PROFILE_HEADER")
+    PROFILE_DIR: str = Field(str(Path(gettempdir()) / "gateway-profiles"), alias="PROFILE_DIR")
+    PROFILE_MAX_FILES: int = Field(50, alias="PROFILE_MAX_FILES")
+
+    # Rate limiter storage shared across workers
+    RATE_LIMIT_STORAGE_URI: str = Field("memory://", alias="RATE_LIMIT_STORAGE_URI")
+    RATE_LIMIT_STRATEGY: Literal["fixed-window", "moving-window", "sliding-window-counter"] = Field(
+        "sliding-window-counter", alias="RATE_LIMIT_STRATEGY"
+    )
 
 
 @lru_cache
@@ -0,0 +1,174 @@
+from collections import deque
+from contextvars import ContextVar
+from importlib import import_module
+from pathlib import Path
+from queue import Empty, Full, Queue
+from random import getrandbits
+from re import compile as compile_pattern
+from threading import Thread
+from time import perf_counter, time
+from typing import Any, Protocol
+
+from app.serialization import dumps
+
+PHASE_ORDER = ("ratelimit", "pool", "connect", "ttfb", "body")
+
+TRACEPARENT = compile_pattern(r"([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?")
+
+
+def parse_traceparent(value: str) -> tuple[str, str, str] | None:
+    match = TRACEPARENT.fullmatch(value.strip())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags, rest = match.groups()
+    if version == "ff" or (version == "00" and rest) or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, flags
+
+
+def new_id(bits: int) -> str:
+    return f"{getrandbits(bits) or 1:0{bits // 4}x}"
+
+
+class Trace:
+    __slots__ = ("flags", "parent_span_id", "phases", "span_id", "start", "start_time", "trace_id", "traceparent")
+
+    def __init__(self, traceparent: str | None = None) -> None:
+        parsed = parse_traceparent(traceparent) if traceparent else None
+        if parsed is None:
+            self.trace_id, self.parent_span_id, self.flags = new_id(128), None, "01"
+        else:
+            self.trace_id, self.parent_span_id, self.flags = parsed
+        self.span_id = new_id(64)
+        self.traceparent = f"00-{self.trace_id}-{self.span_id}-{self.flags}"
+        self.start = perf_counter()
+        self.start_time = time()
+        self.phases: dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds * 1000
+
+    def elapsed(self) -> float:
+        return (perf_counter() - self.start) * 1000
+
+    def server_timing(self) -> str:
+        entries = [f"{phase};dur={self.phases[phase]:.2f}" for phase in PHASE_ORDER if phase in self.phases]
+        entries.append(f"total;dur={self.elapsed():.2f}")
+        return ", ".join(entries)
+
+    def span(self, method: str, route: str, path: str, status_code: int) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": f"{method} {route}",
+            "path": path,
+            "status": status_code,
+            "start_time": self.start_time,
+            "duration_ms": round(self.elapsed(), 3),
+            "phases": {phase: round(duration, 3) for phase, duration in self.phases.items()},
+        }
+
+
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+class UpstreamTrace:
+    __slots__ = ("connect_started", "headers_received", "request_started", "sent", "trace")
+
+    def __init__(self, trace: Trace) -> None:
+        self.trace = trace
+        self.sent = perf_counter()
+        self.connect_started: float | None = None
+        self.request_started: float | None = None
+        self.headers_received: float | None = None
+
+    async def __call__(self, event_name: str, info: dict[str, Any]) -> None:
+        now = perf_counter()
+        event = event_name.partition(".")[2]
+        if event == "connect_tcp.started":
+            self.connect_started = now
+        elif event == "send_request_headers.started":
+            self.request_started = now
+            self.trace.add("pool", (self.connect_started or now) - self.sent)
+            if self.connect_started is not None:
+                self.trace.add("connect", now - self.connect_started)
+        elif event == "receive_response_headers.complete" and self.request_started is not None:
+            self.headers_received = now
+            self.trace.add("ttfb", now - self.request_started)
+        elif event == "receive_response_body.complete" and self.headers_received is not None:
+            self.trace.add("body", now - self.headers_received)
+
+
+class SpanSink(Protocol):
+    def export(self, span: dict[str, Any]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class MemorySpanSink:
+    def __init__(self, max_spans: int = 1000) -> None:
+        self.spans: deque[dict[str, Any]] = deque(maxlen=max_spans)
+
+    def export(self, span: dict[str, Any]) -> None:
+        self.spans.append(span)
+
+    def close(self) -> None:
+        pass
+
+
+class FileSpanSink:
+    def __init__(self, path: str, queue_size: int = 10000, batch_size: int = 256) -> None:
+        self.path = Path(path)
+        self.queue: Queue = Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.writer: Thread | None = None
+
+    def export(self, span: dict[str, Any]) -> None:
+        if self.writer is None:
+            self.writer = Thread(target=self.run, name="securechain-span-writer", daemon=True)
+            self.writer.start()
+        try:
+            self.queue.put_nowait(span)
+        except Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as stream:
+            while True:
+                span = self.queue.get()
+                if span is None:
+                    return
+                batch = [span]
+                while len(batch) < self.batch_size:
+                    try:
+                        span = self.queue.get_nowait()
+                    except Empty:
+                        break
+                    if span is None:
+                        stream.write(b"".join(dumps(item) + b"\n" for item in batch))
+                        return
+                    batch.append(span)
+                stream.write(b"".join(dumps(item) + b"\n" for item in batch))
+                stream.flush()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+
+def load_sink(spec: str, path: str) -> SpanSink | None:
+    match spec:
+        case "none" | "":
+            return None
+        case "memory":
+            return MemorySpanSink()
+        case "file":
+            return FileSpanSink(path)
+        case _:
+            module, _, name = spec.partition(":")
+            return getattr(import_module(module), name)()
@@ -1,5 +1,42 @@
-from app.domain import OpenAPIManager, ProxyHandler
+from app.domain import (
+    AdmissionController,
+    CircuitBreaker,
+    LoadBalancer,
+    OpenAPIDocument,
+    OpenAPIManager,
+    OpenAPIRefresher,
+    ProxyHandler,
+    Replica,
+    RequestProfiler,
+    ResponseCache,
+    RetryBudget,
+    RetryPolicy,
+    ServiceRegistry,
+    ServiceRoute,
+    SingleFlight,
+    TimeoutPolicy,
+    UpstreamPool,
+)
 
 from .json_encoder import JSONEncoder
 
-__all__ = ["JSONEncoder", "OpenAPIManager", "ProxyHandler"]
+__all__ = [
+    "AdmissionController",
+    "CircuitBreaker",
+    "JSONEncoder",
+    "LoadBalancer",
+    "OpenAPIDocument",
+    "OpenAPIManager",
+    "OpenAPIRefresher",
+    "ProxyHandler",
+    "Replica",
+    "RequestProfiler",
+    "ResponseCache",
+    "RetryBudget",
+    "RetryPolicy",
+    "ServiceRegistry",
+    "ServiceRoute",
+    "SingleFlight",
+    "TimeoutPolicy",
+    "UpstreamPool",
+]
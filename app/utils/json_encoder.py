@@ -1,14 +1,12 @@
-from datetime import datetime
-from json import dumps, loads
 from typing import Any
 
+from app.serialization import default, dumps
+
 
 class JSONEncoder:
     @staticmethod
     def default(o: Any) -> Any:
-        if isinstance(o, datetime):
-            return o.isoformat()
-        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+        return default(o)
 
-    def encode(self, raw_response: dict[str, Any]) -> dict[str, Any]:
-        return loads(dumps(raw_response, default=self.default))
+    def encode(self, raw_response: Any) -> bytes:
+        return dumps(raw_response)
@@ -0,0 +1,106 @@
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+
+from fastapi import Depends, FastAPI, Request
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp
+
+from app.domain import ServiceRegistry, ServiceRoute
+from app.middleware import ProxyDispatchMiddleware
+
+
+class StubProxyHandler:
+    async def proxy_request(self, url: str, request: Request) -> Response:
+        return PlainTextResponse("ok")
+
+
+proxy_handler = StubProxyHandler()
+
+
+def get_proxy_handler() -> StubProxyHandler:
+    return proxy_handler
+
+
+def build_endpoint_app(requests: int) -> ASGIApp:
+    limiter = Limiter(key_func=get_remote_address)
+    app = FastAPI()
+    app.state.limiter = limiter
+
+    @app.get("/health")
+    async def health() -> Response:
+        return PlainTextResponse("healthy")
+
+    @app.api_route("/depex/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
+    @limiter.limit(f"{requests * 10}/minute")
+    async def proxy_depex(
+        path: str,
+        request: Request,
+        proxy_handler: StubProxyHandler = Depends(get_proxy_handler),
+    ):
+        return await proxy_handler.proxy_request(f"http://depex:8000/{path}", request)
+
+    return app
+
+
+def build_registry_app(requests: int) -> ASGIApp:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health() -> Response:
+        return PlainTextResponse("healthy")
+
+    registry = ServiceRegistry([ServiceRoute("depex", "http://depex:8000", rate_limit=f"{requests * 10}/minute")])
+    return ProxyDispatchMiddleware(
+        app, registry=registry, proxy_handler=get_proxy_handler, limiter=Limiter(key_func=get_remote_address)
+    )
+
+
+async def drive(app: ASGIApp, path: str, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"gateway")],
+        "client": ("127.0.0.1", 5000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    start = perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (perf_counter() - start) / requests * 1_000_000
+
+
+async def main(requests: int) -> None:
+    apps = {
+        "FastAPI endpoint": build_endpoint_app(requests),
+        "service registry": build_registry_app(requests),
+    }
+    print(f"{'dispatch':<20}{'route':<22}{'us/request':>12}")
+    for path in ("/health", "/depex/graph/pypi"):
+        for name, app in apps.items():
+            await drive(app, path, requests // 10)
+            cost = await drive(app, path, requests)
+            print(f"{name:<20}{path:<22}{cost:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Per-request dispatch cost of proxied routes.")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    run(main(args.requests))
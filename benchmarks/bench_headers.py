@@ -0,0 +1,104 @@
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Any
+
+from httpx import Headers
+from starlette.datastructures import Headers as RequestHeaders
+from starlette.responses import Response
+
+from app.constants import HOP_BY_HOP_HEADERS
+from app.domain import ProxyHandler
+
+REQUEST_HEADERS = [
+    (b"host", b"gateway.securechain.dev"),
+    (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/126.0 Safari/537.36"),
+    (b"accept", b"application/json, text/plain, */*"),
+    (b"accept-language", b"en-US,en;q=0.9,es;q=0.8"),
+    (b"accept-encoding", b"gzip, deflate, br, zstd"),
+    (b"authorization", b"Bearer eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiIxMjM0NTY3ODkwIn0.sig"),
+    (b"cookie", b"access_token=abc; refresh_token=def"),
+    (b"connection", b"keep-alive"),
+    (b"content-type", b"application/json"),
+    (b"content-length", b"128"),
+    (b"origin", b"https://securechain.dev"),
+    (b"referer", b"https://securechain.dev/graph"),
+    (b"sec-fetch-mode", b"cors"),
+    (b"sec-fetch-site", b"same-site"),
+    (b"x-request-id", b"6b1d2f7e-0c1a-4f1e-9d36-0f1f6f0f7c2a"),
+]
+
+RESPONSE_HEADERS = Headers(
+    [
+        ("date", "Mon, 01 Jan 2024 00:00:00 GMT"),
+        ("server", "uvicorn"),
+        ("content-type", "application/json"),
+        ("content-length", "2048"),
+        ("cache-control", "max-age=60"),
+        ("vary", "accept-encoding"),
+        ("vary", "authorization"),
+        ("etag", '"3f2a1b"'),
+        ("x-request-id", "6b1d2f7e-0c1a-4f1e-9d36-0f1f6f0f7c2a"),
+        ("set-cookie", "access_token=abc; HttpOnly; Secure"),
+        ("set-cookie", "refresh_token=def; HttpOnly; Secure"),
+        ("connection", "keep-alive"),
+    ]
+)
+
+
+class StringHeaderPipeline:
+    def filter_request_headers(self, items: list[tuple[str, str]]) -> dict[str, str]:
+        skip = HOP_BY_HOP_HEADERS | {"host", "content-length"}
+        return {k: v for k, v in items if k.lower() not in skip}
+
+    def filter_response_headers(self, upstream_headers: dict[str, Any]) -> dict[str, str]:
+        skip = HOP_BY_HOP_HEADERS | {"content-length", "date", "server", "set-cookie"}
+        return {k: v for k, v in upstream_headers.items() if k.lower() not in skip}
+
+    def build_response(self, content: bytes, upstream_headers: Headers) -> Response:
+        resp = Response(content=content, media_type=upstream_headers.get("content-type"))
+        for k, v in self.filter_response_headers(dict(upstream_headers)).items():
+            resp.headers[k] = v
+        set_cookies = upstream_headers.get_list("set-cookie")
+        if set_cookies:
+            raw_headers = list(resp.raw_headers)
+            for cookie in set_cookies:
+                raw_headers.append((b"set-cookie", cookie.encode("latin1")))
+            resp.raw_headers = raw_headers
+        return resp
+
+
+def measure(fn: Any, iterations: int) -> float:
+    for _ in range(iterations // 10):
+        fn()
+    start = perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (perf_counter() - start) / iterations * 1_000_000
+
+
+def main(iterations: int) -> None:
+    strings = StringHeaderPipeline()
+    raw = ProxyHandler()
+    body = b"x" * 2048
+    cases = {
+        "request headers": (
+            lambda: strings.filter_request_headers(RequestHeaders(raw=REQUEST_HEADERS).items()),
+            lambda: raw.filter_request_headers(RequestHeaders(raw=REQUEST_HEADERS).raw),
+        ),
+        "response headers": (
+            lambda: strings.build_response(body, RESPONSE_HEADERS),
+            lambda: raw.build_response(body, 200, RESPONSE_HEADERS),
+        ),
+    }
+    print(f"{'stage':<20}{'str/dict us':>14}{'raw bytes us':>14}{'speedup':>10}")
+    for name, (before, after) in cases.items():
+        old = measure(before, iterations)
+        new = measure(after, iterations)
+        print(f"{name:<20}{old:>14.2f}{new:>14.2f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Per-request cost of proxy header filtering.")
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.iterations)
@@ -0,0 +1,241 @@
+from argparse import ArgumentParser
+from asyncio import create_subprocess_exec, run, sleep
+from asyncio.subprocess import Process
+from json import dumps, loads
+from os import environ, pathsep, sysconf
+from pathlib import Path
+from platform import python_version
+from socket import socket
+from sys import executable, exit
+from tempfile import mkdtemp
+from time import time
+
+from httpx import AsyncClient, HTTPError, Limits
+
+from benchmarks.bench_upstream_pool import measure, percentile
+from benchmarks.stub_upstream import StubUpstream
+
+ROOT = Path(__file__).resolve().parent.parent
+
+COOKIES = [("set-cookie", f"session_{i}=" + "v" * 96 + "; Path=/; HttpOnly; Secure") for i in range(6)]
+
+SCENARIOS = {
+    "small-json": {"service": "depex", "path": "/depex/graph/packages/requests", "size": 256},
+    "graph-large": {"service": "depex", "path": "/depex/graph/expand", "size": 4 * 1024 * 1024},
+    "auth-cookies": {
+        "service": "auth",
+        "path": "/auth/user/account_exists",
+        "size": 512,
+        "headers": COOKIES,
+        "request_headers": {"cookie": "; ".join(f"session_{i}=" + "v" * 96 for i in range(6))},
+    },
+    "upstream-errors": {"service": "vexgen", "path": "/vexgen/vex/generate", "size": 256, "error_rate": 0.2},
+}
+
+
+def free_port() -> int:
+    with socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree(pid: int) -> list[int]:
+    try:
+        children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    except OSError:
+        return [pid]
+    return [pid, *(descendant for child in children for descendant in process_tree(int(child)))]
+
+
+def process_usage(pid: int) -> tuple[float, float] | None:
+    usages = [usage for child in process_tree(pid) if (usage := thread_usage(child)) is not None]
+    if not usages:
+        return None
+    return sum(cpu for cpu, _ in usages), sum(peak for _, peak in usages)
+
+
+def thread_usage(pid: int) -> tuple[float, float] | None:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    cpu = (int(stat[11]) + int(stat[12])) / sysconf("SC_CLK_TCK")
+    peak_kb = next((int(line.split()[1]) for line in status.splitlines() if line.startswith("VmHWM:")), 0)
+    return cpu, peak_kb / 1024
+
+
+async def start_gateway(stubs: dict[str, StubUpstream], port: int, workers: int = 1) -> Process:
+    env = {
+        **environ,
+        "PYTHONPATH": pathsep.join(filter(None, [str(ROOT), environ.get("PYTHONPATH")])),
+        "AUTH_SERVICE_URL": stubs["auth"].url,
+        "DEPEX_SERVICE_URL": stubs["depex"].url,
+        "VEXGEN_SERVICE_URL": stubs["vexgen"].url,
+        "GATEWAY_SERVICES": dumps({name: {"rate_limit": "1000000/second"} for name in stubs}),
+        "OPENAPI_REFRESH_INTERVAL": "0",
+        "GATEWAY_HOST": "127.0.0.1",
+        "GATEWAY_PORT": str(port),
+        "GATEWAY_WORKERS": str(workers),
+        "SERVER_ACCESS_LOG": "False",
+    }
+    process = await create_subprocess_exec(
+        executable, "-m", "app", cwd=mkdtemp(prefix="gateway-bench-"), env=env
+    )
+    async with AsyncClient() as client:
+        for _ in range(200):
+            try:
+                await client.get(f"http://127.0.0.1:{port}/health")
+                return process
+            except HTTPError:
+                pass
+            await sleep(0.05)
+    process.kill()
+    raise RuntimeError("Gateway did not start")
+
+
+async def drive(url: str, headers: dict[str, str], requests: int, concurrency: int) -> dict[str, float]:
+    errors = 0
+    limits = Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with AsyncClient(limits=limits, timeout=60.0) as client:
+
+        async def call() -> None:
+            nonlocal errors
+            response = await client.get(url, headers=headers)
+            errors += response.status_code >= 400
+
+        await measure(call, concurrency, concurrency)
+        errors = 0
+        samples, elapsed = await measure(call, requests, concurrency)
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": percentile(samples, 50),
+        "p99_ms": percentile(samples, 99),
+        "p999_ms": percentile(samples, 99.9),
+        "error_rate": errors / requests,
+    }
+
+
+async def run_scenarios(
+    names: list[str], requests: int, concurrency: int, latency: float, workers: int = 1
+) -> dict[str, dict]:
+    stubs = {name: StubUpstream(latency=latency) for name in ("auth", "depex", "vexgen")}
+    for stub in stubs.values():
+        await stub.start()
+    port = free_port()
+    gateway = await start_gateway(stubs, port, workers)
+    results: dict[str, dict] = {}
+    try:
+        for name in names:
+            scenario = SCENARIOS[name]
+            stub = stubs[scenario["service"]]
+            stub.body = b'{"data": "' + b"x" * max(0, scenario["size"] - 12) + b'"}'
+            stub.headers = scenario.get("headers", [])
+            stub.error_rate = scenario.get("error_rate", 0.0)
+            headers = scenario.get("request_headers", {})
+            count = max(concurrency, requests // 20) if scenario["size"] > 1024 * 1024 else requests
+
+            upstream_path = scenario["path"].split("/", 2)[2]
+            direct = await drive(f"{stub.url}/{upstream_path}", headers, count, concurrency)
+            before = process_usage(gateway.pid)
+            result = await drive(f"http://127.0.0.1:{port}{scenario['path']}", headers, count, concurrency)
+            after = process_usage(gateway.pid)
+
+            result["requests"] = count
+            result["overhead_p50_ms"] = result["p50_ms"] - direct["p50_ms"]
+            result["direct_rps"] = direct["rps"]
+            if before is not None and after is not None:
+                result["cpu_ms_per_request"] = (after[0] - before[0]) / count * 1000
+                result["peak_rss_mb"] = after[1]
+            results[name] = result
+            print(
+                f"{name:<18}{result['rps']:>9.0f}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+                f"{result['p999_ms']:>9.2f}{result['overhead_p50_ms']:>10.2f}"
+                f"{result.get('cpu_ms_per_request', 0):>9.3f}{result.get('peak_rss_mb', 0):>9.1f}"
+                f"{result['error_rate']:>8.1%}"
+            )
+    finally:
+        gateway.terminate()
+        await gateway.wait()
+        for stub in stubs.values():
+            await stub.stop()
+    return results
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    failures: list[str] = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["rps"] < previous["rps"] * (1 - tolerance):
+            failures.append(f"{name}: rps {result['rps']:.0f} < {previous['rps']:.0f}")
+        for key in ("p50_ms", "p99_ms", "cpu_ms_per_request"):
+            if key in result and key in previous and result[key] > previous[key] * (1 + tolerance):
+                failures.append(f"{name}: {key} {result[key]:.3f} > {previous[key]:.3f}")
+    return failures
+
+
+async def main(
+    names: list[str],
+    requests: int,
+    concurrency: int,
+    latency: float,
+    output: Path | None,
+    baseline: Path | None,
+    tolerance: float,
+    workers: int = 1,
+) -> int:
+    print(
+        f"{'scenario':<18}{'rps':>9}{'p50 ms':>9}{'p99 ms':>9}{'p999 ms':>9}{'overhead':>10}"
+        f"{'cpu ms':>9}{'rss MB':>9}{'errors':>8}"
+    )
+    results = await run_scenarios(names, requests, concurrency, latency, workers)
+    if output is not None:
+        output.write_text(
+            dumps(
+                {
+                    "timestamp": time(),
+                    "python": python_version(),
+                    "requests": requests,
+                    "concurrency": concurrency,
+                    "latency": latency,
+                    "workers": workers,
+                    "scenarios": results,
+                },
+                indent=2,
+            )
+        )
+    if baseline is None:
+        return 0
+    failures = regressions(results, loads(baseline.read_text())["scenarios"], tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Load-test the gateway against local stub upstreams.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub upstream latency in seconds")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Fail when results regress against this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    parser.add_argument("--workers", type=int, default=1, help="Gateway worker processes")
+    args = parser.parse_args()
+    exit(
+        run(
+            main(
+                args.scenarios,
+                args.requests,
+                args.concurrency,
+                args.latency,
+                args.output,
+                args.baseline,
+                args.tolerance,
+                args.workers,
+            )
+        )
+    )
@@ -0,0 +1,102 @@
+from argparse import ArgumentParser
+from asyncio import run
+from collections.abc import Callable
+from http import HTTPStatus
+from time import perf_counter, time
+
+from httpx import MockTransport
+from httpx import Response as HTTPXResponse
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp
+
+from app.domain import ProxyHandler, UpstreamPool
+from app.logger import logger
+from app.middleware import LogRequestMiddleware
+
+
+class BaseHTTPLogRequestMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        url = f"{request.url.path}?{request.query_params}" if request.query_params else request.url.path
+        start_time = time()
+        response = await call_next(request)
+        process_time = (time() - start_time) * 1000
+        host = getattr(getattr(request, "client", None), "host", None)
+        port = getattr(getattr(request, "client", None), "port", None)
+        try:
+            status_phrase = HTTPStatus(response.status_code).phrase
+        except ValueError:
+            status_phrase = ""
+        logger.info(
+            f'{host}:{port} - "{request.method} {url}" {response.status_code} {status_phrase} {process_time:.2f}ms'
+        )
+        return response
+
+
+def build_app(middleware: type | None) -> ASGIApp:
+    proxy_handler = ProxyHandler(
+        upstream_pool=UpstreamPool(
+            transport=MockTransport(lambda request: HTTPXResponse(200, json={"nodes": []}))
+        )
+    )
+
+    async def health(request: Request) -> Response:
+        return JSONResponse({"detail": "healthy"})
+
+    async def proxy(request: Request) -> Response:
+        return await proxy_handler.proxy_request(f"http://depex/{request.path_params['path']}", request)
+
+    app = Starlette(routes=[Route("/health", health), Route("/depex/{path:path}", proxy)])
+    return app if middleware is None else middleware(app)
+
+
+async def drive(app: ASGIApp, path: str, requests: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"gateway")],
+        "client": ("127.0.0.1", 5000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        pass
+
+    start = perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (perf_counter() - start) / requests * 1_000_000
+
+
+async def main(requests: int) -> None:
+    apps = {
+        "no middleware": build_app(None),
+        "BaseHTTPMiddleware": build_app(BaseHTTPLogRequestMiddleware),
+        "pure ASGI": build_app(LogRequestMiddleware),
+    }
+    print(f"{'middleware':<22}{'route':<16}{'us/request':>12}{'overhead us':>14}")
+    for path in ("/health", "/depex/graph"):
+        baseline = await drive(apps["no middleware"], path, requests)
+        for name, app in apps.items():
+            await drive(app, path, requests // 10)
+            cost = await drive(app, path, requests)
+            print(f"{name:<22}{path:<16}{cost:>12.1f}{cost - baseline:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Per-request cost of the access-logging middleware.")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    run(main(args.requests))
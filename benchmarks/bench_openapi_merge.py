@@ -0,0 +1,129 @@
+from argparse import ArgumentParser
+from collections.abc import Callable
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+from typing import Any
+
+from app.domain import OpenAPIManager
+
+SEGMENTS = {
+    "auth": ["user", "api-keys", "health"],
+    "depex": ["graph", "operation/ssc", "operation/smt", "health"],
+    "vexgen": ["vex", "tix", "vex_tix", "health"],
+}
+
+
+def operation(component: str) -> dict[str, Any]:
+    return {
+        "summary": f"Operation on {component}",
+        "parameters": [{"name": "limit", "in": "query", "schema": {"type": "integer"}}],
+        "responses": {
+            "200": {
+                "description": "OK",
+                "content": {"application/json": {"schema": {"$ref": f"#/components/schemas/{component}"}}},
+            },
+            "422": {
+                "description": "Validation Error",
+                "content": {
+                    "application/json": {"schema": {"$ref": "#/components/schemas/HTTPValidationError"}}
+                },
+            },
+        },
+    }
+
+
+def synthetic_schema(service: str, paths: int, revision: int = 0) -> dict[str, Any]:
+    segments = SEGMENTS[service]
+    models = max(1, paths // 10)
+    components = {
+        f"{service.title()}Model{i}": {"type": "object", "properties": {"revision": {"const": revision}}}
+        for i in range(models)
+    }
+    components["Page"] = {"type": "object", "properties": {service: {"type": "array"}}}
+    components["HTTPValidationError"] = {"type": "object", "properties": {"detail": {"type": "array"}}}
+    return {
+        "paths": {
+            f"/{segments[i % len(segments)]}/items{i}": {
+                "get": operation("Page" if i % 10 == 0 else f"{service.title()}Model{i % models}"),
+                "post": operation(f"{service.title()}Model{i % models}"),
+            }
+            for i in range(paths)
+        },
+        "components": {"schemas": components},
+    }
+
+
+class CopyingOpenAPIManager(OpenAPIManager):
+    def __init__(self) -> None:
+        super().__init__()
+        self.rules = {base_tag: list(rules.items()) for base_tag, rules in self.service_tags.values()}
+
+    def merge(self, schemas: dict[str, dict[str, Any]]) -> dict[str, Any]:
+        paths: dict[str, Any] = {}
+        components: dict[str, Any] = {}
+        tags: set[str] = set()
+        for name, schema in schemas.items():
+            base_tag = self.service_tags[name][0]
+            for path, methods in schema.get("paths", {}).items():
+                tag = self.legacy_tag(path, base_tag)
+                tags.add(tag)
+                paths[f"/{name}{path}"] = {method: {**details, "tags": [tag]} for method, details in methods.items()}
+            components.update(schema.get("components", {}).get("schemas", {}))
+        return {
+            "openapi": "3.1.0",
+            "info": {"title": self.title, "version": self.version},
+            "paths": paths,
+            "components": {"schemas": components},
+            "tags": [{"name": tag, "description": f"Endpoints for {tag}"} for tag in sorted(tags)],
+        }
+
+    def legacy_tag(self, path: str, base_tag: str) -> str:
+        for prefix, label in self.rules[base_tag]:
+            if prefix in path:
+                return f"{base_tag} - {label}"
+        return f"{base_tag} - Health"
+
+
+def measure(fn: Callable[[], object], rounds: int) -> tuple[float, float]:
+    started = perf_counter()
+    for _ in range(rounds):
+        fn()
+    elapsed = (perf_counter() - started) / rounds * 1000
+    start()
+    reset_peak()
+    fn()
+    peak = get_traced_memory()[1] / 1024 / 1024
+    stop()
+    return elapsed, peak
+
+
+def main(paths: int, rounds: int) -> None:
+    base = {name: synthetic_schema(name, paths) for name in SEGMENTS}
+    changed = {**base, "depex": synthetic_schema("depex", paths, revision=1)}
+    print(f"{len(SEGMENTS) * paths} paths, {rounds} rounds")
+    print(f"{'engine':<12}{'case':<18}{'ms/merge':>10}{'peak MB':>10}")
+    for label, manager_class in (("copying", CopyingOpenAPIManager), ("incremental", OpenAPIManager)):
+        manager = manager_class()
+        manager.merge(base)
+        flip = [base, changed]
+
+        def one_service(manager=manager, flip=flip) -> None:
+            flip.reverse()
+            manager.merge(flip[0])
+
+        cases = {
+            "cold": lambda manager_class=manager_class: manager_class().merge(base),
+            "unchanged": lambda manager=manager: manager.merge(base),
+            "one-service": one_service,
+        }
+        for case, fn in cases.items():
+            elapsed, peak = measure(fn, rounds)
+            print(f"{label:<12}{case:<18}{elapsed:>10.2f}{peak:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Merge cost of large synthetic OpenAPI schemas.")
+    parser.add_argument("--paths", type=int, default=3000, help="Paths per service")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    main(args.paths, args.rounds)
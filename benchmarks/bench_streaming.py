@@ -0,0 +1,65 @@
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+from tracemalloc import get_traced_memory, reset_peak, start, stop
+
+from starlette.requests import Request
+
+from app.domain import ProxyHandler, UpstreamPool
+from benchmarks.stub_upstream import StubUpstream
+
+
+def make_request() -> Request:
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+    return Request(scope, receive)
+
+
+async def relay(proxy_handler: ProxyHandler, url: str) -> tuple[float, float, int]:
+    timings: dict[str, float] = {}
+    received = 0
+
+    async def receive() -> dict:
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        nonlocal received
+        if message["type"] == "http.response.body":
+            timings.setdefault("first_byte", perf_counter())
+            received += len(message.get("body", b""))
+
+    start_time = perf_counter()
+    response = await proxy_handler.proxy_request(url, make_request())
+    await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+    return (timings["first_byte"] - start_time) * 1000, (perf_counter() - start_time) * 1000, received
+
+
+async def main(size_mb: int, chunk_kb: int, chunk_delay: float) -> None:
+    stub = StubUpstream(body=b"x" * size_mb * 1024 * 1024, chunk_size=chunk_kb * 1024, chunk_delay=chunk_delay)
+    url = f"{await stub.start()}/graph"
+    upstream_pool = UpstreamPool()
+
+    print(f"{'mode':<12}{'ttfb ms':>10}{'total ms':>10}{'bytes':>12}{'peak MiB':>10}")
+    for name, streaming in (("buffered", False), ("streaming", True)):
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool, streaming=streaming)
+        await relay(proxy_handler, url)
+        start()
+        reset_peak()
+        ttfb, total, received = await relay(proxy_handler, url)
+        peak = get_traced_memory()[1] / 1024 / 1024
+        stop()
+        print(f"{name:<12}{ttfb:>10.2f}{total:>10.2f}{received:>12}{peak:>10.2f}")
+
+    await upstream_pool.aclose()
+    await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare buffered and streaming proxy memory and time to first byte.")
+    parser.add_argument("--size-mb", type=int, default=32)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--chunk-delay", type=float, default=0.001, help="Stub delay between chunks in seconds")
+    args = parser.parse_args()
+    run(main(args.size_mb, args.chunk_kb, args.chunk_delay))
@@ -0,0 +1,68 @@
+from argparse import ArgumentParser
+from asyncio import Semaphore, gather, run
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+
+from httpx import AsyncClient
+
+from app.domain import UpstreamPool
+from benchmarks.stub_upstream import StubUpstream
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def measure(
+    call: Callable[[], Awaitable[object]], requests: int, concurrency: int
+) -> tuple[list[float], float]:
+    semaphore = Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def one() -> None:
+        async with semaphore:
+            start = perf_counter()
+            await call()
+            samples.append((perf_counter() - start) * 1000)
+
+    start = perf_counter()
+    await gather(*(one() for _ in range(requests)))
+    return samples, perf_counter() - start
+
+
+async def main(requests: int, concurrency: int, latency: float) -> None:
+    stub = StubUpstream(latency=latency)
+    url = f"{await stub.start()}/graph"
+
+    async def per_request_client() -> None:
+        async with AsyncClient() as client:
+            (await client.get(url)).raise_for_status()
+
+    upstream_pool = UpstreamPool(max_connections=concurrency)
+
+    async def pooled_client() -> None:
+        (await upstream_pool.client_for(url).get(url)).raise_for_status()
+
+    print(f"{'mode':<20}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'conns':>8}")
+    for name, call in (("per-request client", per_request_client), ("pooled client", pooled_client)):
+        stub.connections = 0
+        await measure(call, concurrency, concurrency)
+        samples, elapsed = await measure(call, requests, concurrency)
+        print(
+            f"{name:<20}{requests / elapsed:>10.0f}{percentile(samples, 50):>10.2f}"
+            f"{percentile(samples, 99):>10.2f}{stub.connections:>8}"
+        )
+
+    await upstream_pool.aclose()
+    await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Compare per-request httpx clients with the shared upstream pool.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub upstream latency in seconds")
+    args = parser.parse_args()
+    run(main(args.requests, args.concurrency, args.latency))
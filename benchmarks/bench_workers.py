@@ -0,0 +1,72 @@
+from argparse import ArgumentParser
+from asyncio import get_running_loop, run
+from concurrent.futures import ProcessPoolExecutor
+from os import process_cpu_count
+from time import perf_counter
+
+from benchmarks.bench_load import drive, free_port, start_gateway
+from benchmarks.stub_upstream import StubUpstream
+
+PATH = "/depex/graph/packages/requests"
+
+
+def client(url: str, requests: int, concurrency: int) -> dict[str, float]:
+    return run(drive(url, {}, requests, concurrency))
+
+
+async def measure_workers(
+    stubs: dict[str, StubUpstream], workers: int, clients: int, requests: int, concurrency: int
+) -> dict[str, float]:
+    port = free_port()
+    gateway = await start_gateway(stubs, port, workers)
+    loop = get_running_loop()
+    try:
+        with ProcessPoolExecutor(clients) as pool:
+            start = perf_counter()
+            results = [
+                await future
+                for future in [
+                    loop.run_in_executor(pool, client, f"http://127.0.0.1:{port}{PATH}", requests, concurrency)
+                    for _ in range(clients)
+                ]
+            ]
+            elapsed = perf_counter() - start
+    finally:
+        gateway.terminate()
+        await gateway.wait()
+    return {
+        "rps": clients * requests / elapsed,
+        "p50_ms": max(result["p50_ms"] for result in results),
+        "p99_ms": max(result["p99_ms"] for result in results),
+    }
+
+
+async def main(worker_counts: list[int], clients: int, requests: int, concurrency: int, latency: float) -> None:
+    stubs = {name: StubUpstream(latency=latency) for name in ("auth", "depex", "vexgen")}
+    for stub in stubs.values():
+        await stub.start()
+    try:
+        print(f"{'workers':<9}{'rps':>9}{'speedup':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        single: float | None = None
+        for workers in worker_counts:
+            result = await measure_workers(stubs, workers, clients, requests, concurrency)
+            single = single or result["rps"]
+            print(
+                f"{workers:<9}{result['rps']:>9.0f}{result['rps'] / single:>9.2f}"
+                f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            )
+    finally:
+        for stub in stubs.values():
+            await stub.stop()
+
+
+if __name__ == "__main__":
+    cores = process_cpu_count() or 1
+    parser = ArgumentParser(description="Gateway throughput as the number of worker processes grows.")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, max(1, cores // 2)}))
+    parser.add_argument("--clients", type=int, default=max(1, cores // 2), help="Load generator processes")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per client process")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrency per client process")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub upstream latency in seconds")
+    args = parser.parse_args()
+    run(main(args.workers, args.clients, args.requests, args.concurrency, args.latency))
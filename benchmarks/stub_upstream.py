@@ -0,0 +1,94 @@
+from asyncio import Server, StreamReader, StreamWriter, sleep, start_server
+from random import random
+
+
+class StubUpstream:
+    def __init__(
+        self,
+        body: bytes = b'{"status": "ok"}',
+        latency: float = 0.0,
+        chunk_size: int = 0,
+        chunk_delay: float = 0.0,
+        error_rate: float = 0.0,
+        headers: list[tuple[str, str]] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.body = body
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.headers = headers or []
+        self.host = host
+        self.port = port
+        self.server: Server | None = None
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> str:
+        self.server = await start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def read_request(self, reader: StreamReader) -> dict[str, str] | None:
+        head = await reader.readuntil(b"\r\n\r\n")
+        headers: dict[str, str] = {}
+        for line in head.decode("latin1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0"))
+        if length:
+            await reader.readexactly(length)
+        return headers
+
+    def head(self, status: str, length: int | None) -> bytes:
+        lines = [f"HTTP/1.1 {status}", "content-type: application/json"]
+        lines.extend(f"{name}: {value}" for name, value in self.headers)
+        lines.append("transfer-encoding: chunked" if length is None else f"content-length: {length}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin1")
+
+    async def write_chunked(self, writer: StreamWriter) -> None:
+        writer.write(self.head("200 OK", None))
+        view = memoryview(self.body)
+        for offset in range(0, len(view), self.chunk_size):
+            chunk = view[offset : offset + self.chunk_size]
+            writer.write(f"{len(chunk):x}\r\n".encode("latin1") + chunk + b"\r\n")
+            await writer.drain()
+            if self.chunk_delay:
+                await sleep(self.chunk_delay)
+        writer.write(b"0\r\n\r\n")
+
+    async def handle(self, reader: StreamReader, writer: StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    headers = await self.read_request(reader)
+                except Exception:
+                    break
+                if self.latency:
+                    await sleep(self.latency)
+                if self.error_rate and random() < self.error_rate:
+                    body = b'{"code": "unavailable"}'
+                    writer.write(self.head("503 Service Unavailable", len(body)) + body)
+                elif self.chunk_size:
+                    await self.write_chunked(writer)
+                else:
+                    writer.write(self.head("200 OK", len(self.body)))
+                    writer.write(self.body)
+                await writer.drain()
+                if headers is None or headers.get("connection") == "close":
+                    break
+        finally:
+            writer.close()
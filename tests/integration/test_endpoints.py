@@ -5,6 +5,8 @@ from starlette.responses import Response
 
 from app.dependencies import get_proxy_handler
 from app.main import app
+from app.metrics import metrics
+from app.settings import settings
 
 
 @pytest.mark.integration
@@ -17,6 +19,11 @@ class TestHealthEndpoint:
         assert "detail" in data
         assert data["detail"] == "healthy"
 
+    def test_health_check_server_timing(self, client):
+        response = client.get("/health")
+
+        assert "total;dur=" in response.headers["server-timing"]
+
 
 @pytest.mark.integration
 class TestProxyEndpoints:
@@ -74,6 +81,11 @@ class TestProxyEndpoints:
 
         app.dependency_overrides.clear()
 
+    def test_proxy_rejects_unsupported_method(self, client):
+        response = client.request("OPTIONS", "/depex/graph")
+
+        assert response.status_code == 405
+
 
 @pytest.mark.integration
 class TestRateLimiting:
@@ -107,6 +119,117 @@ class TestRateLimiting:
         app.dependency_overrides.clear()
 
 
+@pytest.mark.integration
+class TestMetricsEndpoint:
+    def test_metrics(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+        client.get("/health")
+
+        response = client.get("/metrics", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'gateway_requests_total{route="gateway",method="GET",status="200"}' in response.text
+
+    def test_metrics_requires_admin_token(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        assert client.get("/metrics").status_code == 403
+        assert client.get("/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    def test_metrics_counts_rate_limited(self, client):
+        metrics.reset()
+        for _ in range(30):
+            client.get("/health")
+
+        assert metrics.rate_limited.get(("gateway",)) > 0
+
+
+@pytest.mark.integration
+class TestOpenAPIDocumentEndpoint:
+    def test_openapi_document(self, client):
+        response = client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "openapi" in response.json()
+
+    def test_openapi_document_not_modified(self, client):
+        etag = client.get("/openapi.json").headers["etag"]
+
+        response = client.get("/openapi.json", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+
+@pytest.mark.integration
+class TestAdminEndpoints:
+    def test_upstream_stats_disabled_without_token(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", None)
+
+        response = client.get("/admin/upstreams")
+
+        assert response.status_code == 404
+
+    def test_upstream_stats_rejects_wrong_token(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/upstreams", headers={"X-Admin-Token": "wrong"})
+
+        assert response.status_code == 403
+
+    def test_upstream_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/upstreams", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert isinstance(response.json(), dict)
+
+    def test_cache_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/cache", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert {"hits", "misses", "evictions"} <= response.json().keys()
+
+    def test_circuit_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/circuits", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert isinstance(response.json(), dict)
+
+    def test_admission_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/admission", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert isinstance(response.json(), dict)
+
+    def test_profile_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "secret"})
+        missing = client.get("/admin/profiles/missing", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert {"captured", "skipped", "profiles"} <= response.json().keys()
+        assert missing.status_code == 404
+
+    def test_service_stats(self, client, mocker):
+        mocker.patch.object(settings, "ADMIN_TOKEN", "secret")
+
+        response = client.get("/admin/services", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert {"auth", "depex", "vexgen"} <= response.json().keys()
+
+
 @pytest.mark.integration
 class TestCORS:
     def test_cors_headers_present(self, client):
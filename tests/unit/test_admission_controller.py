@@ -0,0 +1,114 @@
+from asyncio import CancelledError, create_task, sleep
+
+import pytest
+
+from app.metrics import metrics
+from app.utils import AdmissionController
+
+
+class TestAdmissionController:
+    @pytest.fixture
+    def clock(self, mocker):
+        return mocker.patch("app.domain.admission_controller.monotonic", return_value=1000.0)
+
+    @pytest.fixture
+    def controller(self, clock):
+        return AdmissionController(
+            "depex", max_concurrency=2, min_concurrency=1, queue_size=2,
+            target_delay=0.1, interval=1.0, max_wait=5.0, backoff=0.5,
+        )
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_limit_then_queues(self, controller):
+        assert await controller.acquire()
+        assert await controller.acquire()
+        waiter = create_task(controller.acquire())
+        await sleep(0)
+        assert controller.stats()["queued"] == 1
+        assert not waiter.done()
+
+        controller.release(False)
+        assert await waiter
+        assert controller.stats()["in_flight"] == 2
+        assert controller.stats()["queued"] == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_is_full(self, controller):
+        metrics.reset()
+        await controller.acquire()
+        await controller.acquire()
+        waiters = [create_task(controller.acquire()) for _ in range(2)]
+        await sleep(0)
+
+        assert not await controller.acquire()
+        assert metrics.admission_shed.get(("depex", "queue_full")) == 1
+        assert metrics.admission_queue_depth.get(("depex",)) == 2
+        for waiter in waiters:
+            waiter.cancel()
+
+    @pytest.mark.asyncio
+    async def test_sheds_after_max_wait(self, clock):
+        metrics.reset()
+        controller = AdmissionController("depex", max_concurrency=1, max_wait=0.01)
+        await controller.acquire()
+
+        assert not await controller.acquire()
+        assert controller.stats()["queued"] == 0
+        assert metrics.admission_shed.get(("depex", "timeout")) == 1
+
+    @pytest.mark.asyncio
+    async def test_sheds_queue_while_delay_stays_above_target(self, controller, clock):
+        metrics.reset()
+        await controller.acquire()
+        await controller.acquire()
+        first = create_task(controller.acquire())
+        await sleep(0)
+
+        clock.return_value = 1000.5
+        controller.release(False)
+        assert await first
+
+        second = create_task(controller.acquire())
+        third = create_task(controller.acquire())
+        await sleep(0)
+        clock.return_value = 1002.0
+        controller.release(False)
+
+        assert not await second
+        assert controller.stats()["dropping"] is True
+        controller.release(False)
+        assert not await third
+        assert metrics.admission_shed.get(("depex", "queue_delay")) == 2
+        assert controller.stats()["dropping"] is False
+        assert controller.stats()["limit"] == 1
+
+    @pytest.mark.asyncio
+    async def test_decreases_on_failure_and_recovers_additively(self, controller, clock):
+        await controller.acquire()
+        controller.release(True)
+        assert controller.limit == 1.0
+        assert metrics.admission_limit.get(("depex",)) == 1
+
+        await controller.acquire()
+        controller.release(False)
+        assert controller.limit == 2.0
+
+        clock.return_value = 1000.5
+        await controller.acquire()
+        controller.release(True)
+        assert controller.limit == 2.0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self, controller):
+        await controller.acquire()
+        await controller.acquire()
+        waiter = create_task(controller.acquire())
+        await sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(CancelledError):
+            await waiter
+
+        assert controller.stats()["queued"] == 0
+        controller.release(False)
+        assert controller.stats()["in_flight"] == 1
@@ -0,0 +1,71 @@
+import pytest
+
+from app.constants import CircuitState
+from app.metrics import metrics
+from app.utils import CircuitBreaker
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def clock(self, mocker):
+        clock = mocker.patch("app.domain.circuit_breaker.monotonic", return_value=1000.0)
+        return clock
+
+    @pytest.fixture
+    def breaker(self, clock):
+        return CircuitBreaker(
+            "depex", window=10.0, min_requests=4, error_rate=0.5, slow_call_duration=1.0,
+            slow_call_rate=0.75, open_duration=5.0, half_open_calls=2,
+        )
+
+    def test_stays_closed_below_min_requests(self, breaker):
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record(0.1, failed=True)
+        assert breaker.state is CircuitState.CLOSED
+
+    def test_opens_on_error_rate(self, breaker):
+        metrics.reset()
+        for failed in (False, True, False, True):
+            breaker.allow()
+            breaker.record(0.1, failed)
+        assert breaker.state is CircuitState.OPEN
+        assert not breaker.allow()
+        assert breaker.retry_after() == 5
+        assert metrics.circuit_state.get(("depex",)) == 2
+        assert metrics.circuit_rejected.get(("depex",)) == 1
+
+    def test_opens_on_slow_calls(self, breaker):
+        for duration in (2.0, 2.0, 2.0, 0.1):
+            breaker.record(duration, failed=False)
+        assert breaker.state is CircuitState.OPEN
+
+    def test_old_outcomes_leave_the_window(self, breaker, clock):
+        for _ in range(3):
+            breaker.record(0.1, failed=True)
+        clock.return_value = 1011.0
+        breaker.record(0.1, failed=True)
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["requests"] == 1
+
+    def test_half_open_closes_after_successful_probes(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(0.1, failed=True)
+        clock.return_value = 1005.0
+        assert breaker.allow()
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record(0.1, failed=False)
+        breaker.record(0.1, failed=False)
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["requests"] == 0
+
+    def test_half_open_reopens_on_failure(self, breaker, clock):
+        for _ in range(4):
+            breaker.record(0.1, failed=True)
+        clock.return_value = 1006.0
+        assert breaker.allow()
+        breaker.record(0.1, failed=True)
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.stats()["retry_after"] == 5
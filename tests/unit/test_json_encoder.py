@@ -0,0 +1,62 @@
+from datetime import UTC, date, datetime
+from enum import Enum
+from json import loads
+from uuid import UUID
+
+import pytest
+
+from app import serialization
+from app.serialization import JSONBytesResponse, dumps
+from app.utils import JSONEncoder
+
+
+class Color(str, Enum):
+    RED = "red"
+
+
+PAYLOAD = {
+    "at": datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+    "day": date(2024, 5, 1),
+    "id": UUID("12345678-1234-5678-1234-567812345678"),
+    "color": Color.RED,
+    "tags": {"a"},
+    "name": "añ",
+    "nested": [{"n": 1}],
+}
+
+EXPECTED = {
+    "at": "2024-05-01T12:30:00+00:00",
+    "day": "2024-05-01",
+    "id": "12345678-1234-5678-1234-567812345678",
+    "color": "red",
+    "tags": ["a"],
+    "name": "añ",
+    "nested": [{"n": 1}],
+}
+
+
+class TestJSONEncoder:
+    @pytest.mark.parametrize("backend", ["stdlib", "orjson"])
+    def test_encodes_in_one_pass(self, backend, monkeypatch):
+        if backend == "orjson":
+            pytest.importorskip("orjson")
+        else:
+            monkeypatch.setattr(serialization, "orjson", None)
+
+        body = JSONEncoder().encode(PAYLOAD)
+
+        assert isinstance(body, bytes)
+        assert loads(body) == EXPECTED
+        assert b" " not in dumps({"a": [1, 2]})
+
+    def test_rejects_unknown_types(self):
+        with pytest.raises(TypeError):
+            dumps({"value": object()})
+
+    def test_bytes_response_passes_body_through(self):
+        body = dumps({"detail": "healthy"})
+        response = JSONBytesResponse(body)
+
+        assert response.body is body
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["content-length"] == str(len(body))
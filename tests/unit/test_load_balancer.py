@@ -0,0 +1,87 @@
+import httpx
+import pytest
+
+from app.metrics import metrics
+from app.utils import LoadBalancer, UpstreamPool
+
+REPLICAS = ["http://depex-1:8000", "http://depex-2:8000", "http://depex-3:8000"]
+
+
+class TestLoadBalancer:
+    @pytest.fixture
+    def health(self):
+        return {"depex-1": 200, "depex-2": 200, "depex-3": 200}
+
+    @pytest.fixture
+    def load_balancer(self, health):
+        def handler(request):
+            status = health[request.url.host]
+            if status is None:
+                raise httpx.ConnectError("down")
+            return httpx.Response(status)
+
+        return LoadBalancer(
+            UpstreamPool(transport=httpx.MockTransport(handler)),
+            {"http://depex:8000": REPLICAS},
+            eject_failures=2,
+            eject_duration=30.0,
+        )
+
+    def test_acquire_rewrites_url(self, load_balancer):
+        replica, url = load_balancer.acquire("http://depex:8000/graph/packages?x=1")
+        assert replica.url in REPLICAS
+        assert url == f"{replica.url}/graph/packages?x=1"
+        assert replica.outstanding == 1
+        load_balancer.release(replica, failed=False)
+        assert replica.outstanding == 0
+
+    def test_unknown_service_passes_through(self, load_balancer):
+        assert load_balancer.acquire("http://auth:8000/user") == (None, "http://auth:8000/user")
+
+    @pytest.mark.parametrize("strategy", ["p2c", "least_outstanding"])
+    def test_spreads_in_flight_requests(self, load_balancer, strategy):
+        load_balancer.strategy = strategy
+        acquired = [load_balancer.acquire("http://depex:8000/graph")[0] for _ in range(30)]
+        outstanding = sorted(replica.outstanding for replica in load_balancer.services["http://depex:8000"])
+        assert sum(outstanding) == len(acquired)
+        assert outstanding[-1] - outstanding[0] <= (1 if strategy == "least_outstanding" else 10)
+
+    def test_ejects_after_consecutive_failures(self, load_balancer):
+        metrics.reset()
+        replicas = load_balancer.services["http://depex:8000"]
+        bad = replicas[0]
+        for _ in range(2):
+            bad.outstanding += 1
+            load_balancer.release(bad, failed=True)
+        assert bad.ejected_until > 0
+        picked = {load_balancer.acquire("http://depex:8000/graph")[0].url for _ in range(50)}
+        assert bad.url not in picked
+        assert metrics.replica_ejections.get((bad.url,)) == 1
+
+    def test_success_resets_failure_count(self, load_balancer):
+        replica = load_balancer.services["http://depex:8000"][0]
+        for failed in (True, False, True):
+            replica.outstanding += 1
+            load_balancer.release(replica, failed)
+        assert replica.ejected_until == 0.0
+
+    def test_falls_back_when_all_replicas_are_out(self, load_balancer):
+        for replica in load_balancer.services["http://depex:8000"]:
+            replica.healthy = False
+        replica, _ = load_balancer.acquire("http://depex:8000/graph")
+        assert replica is not None
+
+    @pytest.mark.asyncio
+    async def test_health_checks_eject_and_restore(self, load_balancer, health):
+        replicas = load_balancer.services["http://depex:8000"]
+        health["depex-2"] = None
+        health["depex-3"] = 503
+        await load_balancer.check_all()
+        assert [replica.healthy for replica in replicas] == [True, False, False]
+        assert {load_balancer.acquire("http://depex:8000/graph")[0].url for _ in range(20)} == {REPLICAS[0]}
+
+        health["depex-2"] = 200
+        health["depex-3"] = 200
+        await load_balancer.check_all()
+        assert all(replica.healthy for replica in replicas)
+        assert load_balancer.stats()["http://depex:8000"][0]["outstanding"] == 20
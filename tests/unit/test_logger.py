@@ -0,0 +1,104 @@
+from json import loads
+from queue import Queue
+
+import pytest
+
+from app.logger import LoggerManager, QueueingHandler
+
+
+class TestLoggerManager:
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        return tmp_path / "logs" / "gateway.log"
+
+    @pytest.fixture
+    def logger_manager(self, log_file, request):
+        manager = LoggerManager(str(log_file), max_bytes=1024, backup_count=2, name=f"test.{request.node.name}")
+        yield manager
+        manager.shutdown()
+        manager.logger.removeHandler(manager.file_handler)
+        manager.file_handler.close()
+
+    def test_sync_mode_writes_immediately(self, logger_manager, log_file):
+        logger_manager.info("hello")
+
+        assert "INFO" in log_file.read_text()
+        assert "hello" in log_file.read_text()
+
+    def test_async_mode_flushes_on_shutdown(self, logger_manager, log_file):
+        logger_manager.configure(async_mode=True, batch_size=8)
+
+        for i in range(20):
+            logger_manager.info("line %d", i)
+        logger_manager.shutdown()
+
+        rotated = log_file.parent / "gateway.log.1"
+        lines = rotated.read_text().splitlines() + log_file.read_text().splitlines()
+        assert len(lines) == 20
+        assert lines[-1].endswith("line 19")
+        assert logger_manager.file_handler in logger_manager.logger.handlers
+
+    def test_async_mode_rotates(self, logger_manager, log_file):
+        logger_manager.configure(async_mode=True)
+
+        for _ in range(50):
+            logger_manager.info("x" * 100)
+        logger_manager.shutdown()
+
+        assert (log_file.parent / "gateway.log.1").exists()
+        assert log_file.stat().st_size < 1024
+
+    def test_json_format(self, logger_manager, log_file):
+        logger_manager.configure(json_format=True)
+
+        logger_manager.access("GET /depex/graph 200", "/depex/graph", 200, method="GET", duration_ms=1.5)
+
+        entry = loads(log_file.read_text())
+        assert entry["message"] == "GET /depex/graph 200"
+        assert entry["level"] == "INFO"
+        assert entry["path"] == "/depex/graph"
+        assert entry["status"] == 200
+        assert entry["method"] == "GET"
+        assert entry["duration_ms"] == 1.5
+
+    def test_access_sampling(self, logger_manager, log_file, mocker):
+        logger_manager.configure(sample_rates={"/depex": 0.0, "/depex/graph/important": 1.0})
+
+        logger_manager.access("skipped", "/depex/graph", 200)
+        logger_manager.access("kept", "/depex/graph/important", 200)
+        logger_manager.access("error", "/depex/graph", 502)
+        logger_manager.access("unsampled", "/auth/login", 200)
+
+        text = log_file.read_text()
+        assert "skipped" not in text
+        assert "kept" in text
+        assert "error" in text
+        assert "unsampled" in text
+
+    def test_sample_rate(self, logger_manager):
+        logger_manager.configure(sample_rates={"/depex": 0.1})
+
+        assert logger_manager.sample_rate("/depex/graph") == 0.1
+        assert logger_manager.sample_rate("/vexgen/vex") == 1.0
+
+
+class TestQueueingHandler:
+    def test_drop_on_overflow(self, mocker):
+        handler = QueueingHandler(Queue(maxsize=1), overflow="drop")
+        record = mocker.Mock(getMessage=mocker.Mock(return_value="msg"))
+
+        handler.emit(record)
+        handler.emit(record)
+
+        assert handler.dropped == 1
+        assert handler.queue.qsize() == 1
+
+    def test_resolves_message_before_enqueue(self, mocker):
+        handler = QueueingHandler(Queue())
+        record = mocker.Mock(getMessage=mocker.Mock(return_value="line 1"), args=(1,))
+
+        handler.emit(record)
+
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "line 1"
+        assert queued.args is None
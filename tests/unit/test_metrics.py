@@ -0,0 +1,86 @@
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, Metrics
+
+
+class TestMetrics:
+    @pytest.fixture
+    def registry(self):
+        return Metrics()
+
+    def test_route(self, registry):
+        assert registry.route("/depex/graph/pypi") == "depex"
+        assert registry.route("/auth/login") == "auth"
+        assert registry.route("/vexgen") == "vexgen"
+        assert registry.route("/health") == "gateway"
+        assert registry.route("/depexfoo/x") == "gateway"
+
+    def test_counter(self):
+        counter = Counter("c_total", "Help.", ("route",))
+
+        counter.inc(("depex",))
+        counter.inc(("depex",), 2)
+
+        assert counter.get(("depex",)) == 3
+        assert list(counter.samples()) == ['c_total{route="depex"} 3']
+
+    def test_gauge(self):
+        gauge = Gauge("g", "Help.")
+
+        gauge.set(value=5)
+        gauge.set(value=2)
+
+        assert list(gauge.samples()) == ["g 2"]
+
+    def test_histogram(self):
+        histogram = Histogram("h_seconds", "Help.", ("route",), buckets=(0.1, 1.0))
+
+        histogram.observe(("auth",), 0.05)
+        histogram.observe(("auth",), 0.5)
+        histogram.observe(("auth",), 5.0)
+
+        assert histogram.count(("auth",)) == 3
+        assert list(histogram.samples()) == [
+            'h_seconds_bucket{route="auth",le="0.1"} 1.0',
+            'h_seconds_bucket{route="auth",le="1.0"} 2.0',
+            'h_seconds_bucket{route="auth",le="+Inf"} 3.0',
+            'h_seconds_sum{route="auth"} 5.55',
+            'h_seconds_count{route="auth"} 3',
+        ]
+
+    def test_observe_request(self, registry):
+        registry.observe_request("depex", "GET", 200, 0.02, 0, 512)
+
+        assert registry.requests.get(("depex", "GET", 200)) == 1
+        assert registry.request_duration.count(("depex", "GET", 200)) == 1
+        assert registry.request_bytes.get(("depex", "GET", 200)) == 0
+        assert registry.response_bytes.get(("depex", "GET", 200)) == 512
+
+    def test_render(self, registry):
+        registry.rate_limited.inc(("auth",))
+
+        text = registry.render()
+
+        assert "# TYPE gateway_requests_total counter" in text
+        assert "# TYPE gateway_upstream_ttfb_seconds histogram" in text
+        assert 'gateway_rate_limited_total{route="auth"} 1' in text
+        assert text.endswith("\n")
+
+    def test_render_escapes_labels(self):
+        counter = Counter("c_total", "Help.", ("path",))
+        counter.inc(('a"b\\c',))
+
+        assert list(counter.samples()) == ['c_total{path="a\\"b\\\\c"} 1']
+
+    def test_register_and_reset(self, registry):
+        gauge = registry.register(Gauge("queue_depth", "Help."))
+        gauge.set(value=3)
+        registry.requests.inc(("auth", "GET", 200))
+        registry.upstream_ttfb.observe(("auth",), 0.1)
+
+        registry.reset()
+
+        assert "queue_depth" in registry.render()
+        assert gauge.values == {}
+        assert registry.requests.values == {}
+        assert registry.upstream_ttfb.series == {}
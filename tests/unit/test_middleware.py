@@ -0,0 +1,337 @@
+from gzip import decompress
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+
+from app.metrics import metrics
+from app.middleware import (
+    CompressionMiddleware,
+    LogRequestMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    ProxyDispatchMiddleware,
+    TracingMiddleware,
+)
+from app.tracing import MemorySpanSink, current_trace
+from app.utils import RequestProfiler, ServiceRegistry, ServiceRoute
+
+
+def make_scope(path="/health", query_string=b"", headers=None, method="GET"):
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [(k.encode("latin1"), v.encode("latin1")) for k, v in (headers or [])],
+        "client": ("127.0.0.1", 5000),
+    }
+
+
+async def collect(app, scope):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+class TestLogRequestMiddleware:
+    @pytest.mark.asyncio
+    async def test_logs_status_and_timing(self, mocker):
+        info = mocker.patch("app.middleware.logger.access")
+        middleware = LogRequestMiddleware(PlainTextResponse("ok", status_code=201))
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await middleware(make_scope(query_string=b"a=1"), receive, send)
+
+        assert [message["type"] for message in messages] == ["http.response.start", "http.response.body"]
+        line, path, status_code = info.call_args.args
+        assert line.startswith('127.0.0.1:5000 - "GET /health?a=1" 201 Created ')
+        assert line.endswith("ms")
+        assert (path, status_code) == ("/health", 201)
+        assert info.call_args.kwargs["method"] == "GET"
+
+    @pytest.mark.asyncio
+    async def test_passes_streaming_chunks_through(self, mocker):
+        mocker.patch("app.middleware.logger.access")
+
+        async def chunks():
+            yield b"a"
+            yield b"b"
+
+        middleware = LogRequestMiddleware(StreamingResponse(chunks()))
+        bodies = []
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                bodies.append(message["body"])
+
+        await middleware({**make_scope(), "asgi": {"spec_version": "2.4"}}, receive, send)
+
+        assert bodies == [b"a", b"b", b""]
+
+    @pytest.mark.asyncio
+    async def test_logs_server_error_on_exception(self, mocker):
+        info = mocker.patch("app.middleware.logger.access")
+
+        async def failing_app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await LogRequestMiddleware(failing_app)(make_scope(), receive, None)
+
+        assert '"GET /health" 500 Internal Server Error' in info.call_args.args[0]
+
+    @pytest.mark.asyncio
+    async def test_ignores_non_http_scopes(self, mocker):
+        info = mocker.patch("app.middleware.logger.access")
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["type"])
+
+        await LogRequestMiddleware(app)({"type": "lifespan"}, receive, None)
+
+        assert seen == ["lifespan"]
+        info.assert_not_called()
+
+
+class TestMetricsMiddleware:
+    @pytest.mark.asyncio
+    async def test_records_request(self):
+        metrics.reset()
+        messages = [{"type": "http.request", "body": b"abc", "more_body": False}]
+
+        async def receive_body():
+            return messages.pop(0)
+
+        async def app(scope, receive, send):
+            await receive()
+            await PlainTextResponse("graph")(scope, receive, send)
+
+        async def send(message):
+            pass
+
+        await MetricsMiddleware(app)(make_scope(path="/depex/graph"), receive_body, send)
+
+        labels = ("depex", "GET", 200)
+        assert metrics.requests.get(labels) == 1
+        assert metrics.request_bytes.get(labels) == 3
+        assert metrics.response_bytes.get(labels) == 5
+        assert metrics.request_duration.count(labels) == 1
+
+    @pytest.mark.asyncio
+    async def test_normalizes_unknown_methods(self):
+        metrics.reset()
+
+        async def send(message):
+            pass
+
+        scope = {**make_scope(), "method": "BREW"}
+        await MetricsMiddleware(PlainTextResponse("ok"))(scope, receive, send)
+
+        assert metrics.requests.get(("gateway", "OTHER", 200)) == 1
+
+
+class TestCompressionMiddleware:
+    @pytest.fixture
+    def payload(self):
+        return {"nodes": [{"id": i, "name": "package"} for i in range(200)]}
+
+    @pytest.mark.asyncio
+    async def test_compresses_negotiated_encoding(self, payload):
+        metrics.reset()
+        middleware = CompressionMiddleware(JSONResponse(payload, headers={"etag": '"abc"'}), encodings=("gzip",))
+        scope = make_scope(path="/depex/graph", headers=[("accept-encoding", "gzip, deflate")])
+
+        headers, body = await collect(middleware, scope)
+
+        assert headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "accept-encoding"
+        assert headers["etag"] == 'W/"abc"'
+        assert "content-length" not in headers
+        assert decompress(body) == JSONResponse(payload).body
+        assert metrics.compression_input_bytes.get(("depex", "gzip")) == len(decompress(body))
+        assert metrics.compression_output_bytes.get(("depex", "gzip")) == len(body)
+        assert metrics.compression_ratio.count(("depex", "gzip")) == 1
+
+    @pytest.mark.asyncio
+    async def test_compresses_streaming_body(self):
+        chunks = [b'{"nodes":[', b'{"id":1},' * 500, b"{}]}"]
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        middleware = CompressionMiddleware(
+            StreamingResponse(stream(), media_type="application/json"), encodings=("gzip",), offload_size=1024
+        )
+        scope = {**make_scope(path="/vexgen/vex", headers=[("accept-encoding", "gzip")]), "asgi": {"spec_version": "2.4"}}
+
+        headers, body = await collect(middleware, scope)
+
+        assert headers["content-encoding"] == "gzip"
+        assert decompress(body) == b"".join(chunks)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("path", "accept_encoding", "response"),
+        [
+            ("/depex/graph", "identity", JSONResponse({"a": "b" * 2048})),
+            ("/depex/graph", "gzip;q=0, *", JSONResponse({"a": "b" * 2048})),
+            ("/depex/graph", "gzip", JSONResponse({"a": "b"})),
+            ("/depex/graph", "gzip", Response(b"x" * 2048, headers={"content-encoding": "br"})),
+            ("/depex/graph", "gzip", Response(b"x" * 2048, media_type="image/png")),
+            ("/health", "gzip", JSONResponse({"a": "b" * 2048})),
+        ],
+    )
+    async def test_skips(self, path, accept_encoding, response):
+        middleware = CompressionMiddleware(response, encodings=("gzip",))
+        scope = make_scope(path=path, headers=[("accept-encoding", accept_encoding)])
+
+        headers, body = await collect(middleware, scope)
+
+        assert headers.get("content-encoding") == response.headers.get("content-encoding")
+        assert body == response.body
+
+    @pytest.mark.asyncio
+    async def test_brotli(self, payload):
+        brotli = pytest.importorskip("brotli")
+        middleware = CompressionMiddleware(JSONResponse(payload))
+        scope = make_scope(path="/auth/user", headers=[("accept-encoding", "gzip, br")])
+
+        headers, body = await collect(middleware, scope)
+
+        assert headers["content-encoding"] == "br"
+        assert brotli.decompress(body) == JSONResponse(payload).body
+
+
+class TestProxyDispatchMiddleware:
+    @pytest.fixture
+    def proxy_handler(self):
+        proxy_handler = MagicMock()
+        proxy_handler.proxy_request = AsyncMock(return_value=PlainTextResponse("proxied"))
+        return proxy_handler
+
+    def make_middleware(self, proxy_handler, rate_limit="5/minute"):
+        registry = ServiceRegistry([ServiceRoute("depex", "http://depex:8000", rate_limit=rate_limit, methods=["GET"])])
+        return ProxyDispatchMiddleware(
+            PlainTextResponse("app"),
+            registry=registry,
+            proxy_handler=lambda: proxy_handler,
+            limiter=Limiter(key_func=get_remote_address),
+        )
+
+    @pytest.mark.asyncio
+    async def test_dispatches_registered_prefix(self, proxy_handler):
+        _, body = await collect(self.make_middleware(proxy_handler), make_scope("/depex/graph/pypi"))
+
+        assert body == b"proxied"
+        assert proxy_handler.proxy_request.await_args.args[0] == "http://depex:8000/graph/pypi"
+
+    @pytest.mark.asyncio
+    async def test_falls_through_for_other_paths(self, proxy_handler):
+        _, body = await collect(self.make_middleware(proxy_handler), make_scope("/health"))
+
+        assert body == b"app"
+        proxy_handler.proxy_request.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rejects_unlisted_method(self, proxy_handler):
+        headers, _ = await collect(self.make_middleware(proxy_handler), make_scope("/depex/graph", method="POST"))
+
+        assert headers["allow"] == "GET"
+        proxy_handler.proxy_request.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_per_service(self, proxy_handler):
+        middleware = self.make_middleware(proxy_handler, rate_limit="2/minute")
+        before = metrics.rate_limited.get(("depex",))
+
+        bodies = [(await collect(middleware, make_scope("/depex/graph")))[1] for _ in range(3)]
+
+        assert bodies[:2] == [b"proxied", b"proxied"]
+        assert b"2 per 1 minute" in bodies[2]
+        assert metrics.rate_limited.get(("depex",)) == before + 1
+
+
+class TestProfilingMiddleware:
+    @pytest.mark.asyncio
+    async def test_profiles_requested_request(self, tmp_path):
+        seen = []
+
+        async def app(scope, receive, send):
+            seen.append(scope["headers"])
+            await PlainTextResponse("ok")(scope, receive, send)
+
+        profiler = RequestProfiler(str(tmp_path), token="secret")
+        middleware = ProfilingMiddleware(app, profiler)
+
+        headers, _ = await collect(middleware, make_scope("/depex/graph", headers=[("x-gateway-profile", "secret")]))
+
+        assert seen == [[]]
+        assert [entry["name"] for entry in profiler.profiles()] == [headers["x-gateway-profile-id"]]
+        assert not profiler.active
+
+    @pytest.mark.asyncio
+    async def test_passes_through_unsampled_requests(self, tmp_path):
+        profiler = RequestProfiler(str(tmp_path), token="secret")
+        middleware = ProfilingMiddleware(PlainTextResponse("ok"), profiler)
+
+        headers, _ = await collect(middleware, make_scope("/depex/graph"))
+
+        assert "x-gateway-profile-id" not in headers
+        assert profiler.profiles() == []
+
+
+class TestTracingMiddleware:
+    @pytest.mark.asyncio
+    async def test_adds_server_timing_and_exports_span(self):
+        seen = []
+
+        async def app(scope, receive, send):
+            trace = current_trace.get()
+            trace.add("ttfb", 0.002)
+            seen.append(trace)
+            await PlainTextResponse("ok")(scope, receive, send)
+
+        sink = MemorySpanSink()
+        middleware = TracingMiddleware(app, sink=sink)
+        traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+        headers, _ = await collect(middleware, make_scope("/depex/graph", headers=[("traceparent", traceparent)]))
+
+        assert headers["server-timing"].startswith("ttfb;dur=2.00, total;dur=")
+        assert seen[0].trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert current_trace.get() is None
+        span = sink.spans[0]
+        assert span["trace_id"] == "0af7651916cd43dd8448eb211c80319c"
+        assert span["name"] == "GET depex"
+        assert span["status"] == 200
+
+    @pytest.mark.asyncio
+    async def test_server_timing_can_be_disabled(self):
+        middleware = TracingMiddleware(PlainTextResponse("ok"), server_timing=False)
+
+        headers, _ = await collect(middleware, make_scope())
+
+        assert "server-timing" not in headers
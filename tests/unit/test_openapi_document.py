@@ -0,0 +1,53 @@
+from gzip import decompress
+from json import loads
+
+import pytest
+from starlette.datastructures import Headers
+
+from app.utils import OpenAPIDocument
+
+
+class TestOpenAPIDocument:
+    @pytest.fixture
+    def document(self):
+        return OpenAPIDocument({"openapi": "3.1.0", "paths": {"/depex/graph": {"get": {}}}})
+
+    def test_variants_are_precomputed(self, document):
+        body = document.variants["identity"]
+        assert loads(body)["paths"] == {"/depex/graph": {"get": {}}}
+        assert decompress(document.variants["gzip"]) == body
+        assert document.etags["gzip"] != document.etags["identity"]
+
+    def test_same_schema_same_etag(self, document):
+        other = OpenAPIDocument({"openapi": "3.1.0", "paths": {"/depex/graph": {"get": {}}}})
+        assert other.etags == document.etags
+        assert other.variants["gzip"] == document.variants["gzip"]
+
+    def test_negotiate(self, document):
+        assert document.negotiate("") == "identity"
+        assert document.negotiate("gzip, deflate") == "gzip"
+        assert document.negotiate("gzip;q=0, identity") == "identity"
+        assert document.negotiate("GZIP;q=0.5") == "gzip"
+        assert document.negotiate("gzip;q=0, *") != "gzip"
+
+    def test_negotiate_brotli(self, document):
+        brotli = pytest.importorskip("brotli")
+        assert document.negotiate("gzip, br") == "br"
+        assert brotli.decompress(document.variants["br"]) == document.variants["identity"]
+
+    def test_response(self, document):
+        response = document.response(Headers({"accept-encoding": "gzip"}))
+        assert response.status_code == 200
+        assert response.body == document.variants["gzip"]
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"] == document.etags["gzip"]
+        assert response.headers["vary"] == "accept-encoding"
+
+    def test_conditional_request(self, document):
+        etag = document.etags["identity"]
+        assert document.response(Headers({"if-none-match": etag})).status_code == 304
+        assert document.response(Headers({"if-none-match": f"W/{etag}"})).status_code == 304
+        assert document.response(Headers({"if-none-match": '"other"'})).status_code == 200
+        not_modified = document.response(Headers({"if-none-match": "*"}))
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
@@ -119,3 +119,60 @@ class TestOpenAPIManager:
         assert "Node" in merged["components"]["schemas"]
         assert "VEX" in merged["components"]["schemas"]
         assert len(merged["tags"]) > 0
+
+    def test_determine_tag_unknown_service(self, openapi_manager):
+        assert openapi_manager.determine_tag("/items", "Unknown") is None
+
+    def test_tags_already_prefixed_paths(self, openapi_manager):
+        prefixed_paths, _ = openapi_manager.prefix_and_tag_paths(
+            {"paths": {"/depex/graph/nodes": {"get": {}}}}, "/depex", "Secure Chain Depex"
+        )
+
+        assert prefixed_paths["/depex/graph/nodes"]["get"]["tags"] == ["Secure Chain Depex - Graph"]
+
+    def test_keeps_path_level_fields(self, openapi_manager):
+        parameters = [{"name": "id", "in": "path"}]
+        schema = {"paths": {"/users/{id}": {"parameters": parameters, "get": {}}}}
+
+        prefixed_paths, _ = openapi_manager.prefix_and_tag_paths(schema, "/auth", "Secure Chain Auth")
+
+        assert prefixed_paths["/auth/users/{id}"]["parameters"] is parameters
+        assert prefixed_paths["/auth/users/{id}"]["get"]["tags"] == ["Secure Chain Auth - User"]
+
+    def test_merge_namespaces_colliding_components(self, openapi_manager):
+        def service(path, properties):
+            return {
+                "paths": {path: {"get": {"responses": {"200": {"$ref": "#/components/schemas/Item"}}}}},
+                "components": {
+                    "schemas": {
+                        "Item": {"type": "object", "properties": properties},
+                        "HTTPValidationError": {"type": "object"},
+                    }
+                },
+            }
+
+        merged = openapi_manager.merge_schemas(
+            service("/user/items", {"id": {"type": "integer"}}),
+            service("/graph/items", {"name": {"type": "string"}}),
+            {},
+        )
+
+        schemas = merged["components"]["schemas"]
+        assert set(schemas) == {"auth.Item", "depex.Item", "HTTPValidationError"}
+        assert merged["paths"]["/auth/user/items"]["get"]["responses"]["200"]["$ref"] == "#/components/schemas/auth.Item"
+        assert (
+            merged["paths"]["/depex/graph/items"]["get"]["responses"]["200"]["$ref"]
+            == "#/components/schemas/depex.Item"
+        )
+
+    def test_merge_reuses_unchanged_services(self, openapi_manager, sample_schema):
+        depex_schema = {"paths": {"/graph/nodes": {"get": {"summary": "Get nodes"}}}}
+        first = openapi_manager.merge_schemas(sample_schema, depex_schema, {})
+
+        vexgen_schema = {"paths": {"/vex/generate": {"post": {"summary": "Generate VEX"}}}}
+        second = openapi_manager.merge_schemas(sample_schema, depex_schema, vexgen_schema)
+
+        assert second["paths"]["/auth/users"] is first["paths"]["/auth/users"]
+        assert second["paths"]["/depex/graph/nodes"] is first["paths"]["/depex/graph/nodes"]
+        assert "/vexgen/vex/generate" in second["paths"]
+        assert "tags" not in sample_schema["paths"]["/users"]["get"]
@@ -0,0 +1,183 @@
+from asyncio import gather, sleep, to_thread
+
+import httpx
+import pytest
+
+from app.utils import OpenAPIManager, OpenAPIRefresher, UpstreamPool
+
+SERVICES = {
+    "auth": "http://auth:8000",
+    "depex": "http://depex:8000",
+    "vexgen": "http://vexgen:8000",
+}
+
+
+def make_schema(path):
+    return {"paths": {path: {"get": {}}}, "components": {"schemas": {}}}
+
+
+class TestOpenAPIRefresher:
+    @pytest.fixture
+    def upstreams(self):
+        return {
+            "auth": make_schema("/user/login"),
+            "depex": make_schema("/graph/packages"),
+            "vexgen": make_schema("/vex/generate"),
+        }
+
+    @pytest.fixture
+    def requests(self):
+        return []
+
+    @pytest.fixture
+    def snapshot_path(self, tmp_path):
+        return str(tmp_path / "openapi.json")
+
+    @pytest.fixture
+    def refresher(self, upstreams, requests, snapshot_path):
+        def handler(request):
+            requests.append(request)
+            name = request.url.host
+            schema = upstreams[name]
+            if isinstance(schema, Exception):
+                raise schema
+            etag = f'"{name}-{len(schema["paths"])}"'
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, json=schema, headers={"etag": etag})
+
+        upstream_pool = UpstreamPool(transport=httpx.MockTransport(handler))
+        return OpenAPIRefresher(
+            OpenAPIManager(),
+            upstream_pool,
+            SERVICES,
+            timeout=2.0,
+            service_timeouts={"depex": 10.0},
+            snapshot_path=snapshot_path,
+        )
+
+    async def test_refresh_merges_all_services(self, refresher):
+        schema = await refresher.refresh()
+        assert set(schema["paths"]) == {"/auth/user/login", "/depex/graph/packages", "/vexgen/vex/generate"}
+        assert refresher.swaps == 1
+        assert refresher.etags["auth"] == '"auth-1"'
+        assert b"/depex/graph/packages" in refresher.document.variants["identity"]
+
+    async def test_per_service_timeouts(self, refresher, requests):
+        await refresher.refresh()
+        timeouts = {request.url.host: request.extensions["timeout"]["read"] for request in requests}
+        assert timeouts == {"auth": 2.0, "depex": 10.0, "vexgen": 2.0}
+
+    async def test_failed_service_keeps_last_known_good(self, refresher, upstreams):
+        await refresher.refresh()
+        upstreams["depex"] = httpx.ConnectError("down")
+        upstreams["auth"] = {**make_schema("/user/login"), "paths": {"/user/login": {}, "/user/logout": {}}}
+        schema = await refresher.refresh()
+        assert "/depex/graph/packages" in schema["paths"]
+        assert "/auth/user/logout" in schema["paths"]
+        assert refresher.swaps == 2
+
+    async def test_partial_schema_when_service_never_answered(self, refresher, upstreams):
+        upstreams["vexgen"] = httpx.ConnectError("down")
+        schema = await refresher.refresh()
+        assert set(schema["paths"]) == {"/auth/user/login", "/depex/graph/packages"}
+
+    async def test_unchanged_etag_does_not_swap(self, refresher, requests):
+        first = await refresher.refresh()
+        second = await refresher.refresh()
+        assert second is first
+        assert refresher.swaps == 1
+        assert requests[-1].headers["if-none-match"] == f'"{requests[-1].url.host}-1"'
+
+    async def test_all_services_down(self, refresher, upstreams):
+        for name in upstreams:
+            upstreams[name] = httpx.ConnectError("down")
+        assert await refresher.refresh() is None
+        assert b'"Error"' in refresher.document.variants["identity"]
+
+    async def test_background_refresh(self, refresher, upstreams):
+        await refresher.refresh()
+        upstreams["auth"] = {"paths": {"/user/login": {}, "/api-keys": {}}}
+        refresher.start(0.01)
+        await sleep(0.05)
+        await refresher.stop()
+        assert refresher.task is None
+        assert "/auth/api-keys" in refresher.schema["paths"]
+
+    async def test_retries_until_every_service_answered(self, refresher, upstreams):
+        depex = upstreams["depex"]
+        upstreams["depex"] = httpx.ConnectError("down")
+        refresher.retry_delay = 0.01
+
+        refresher.start(300.0)
+        await sleep(0.02)
+        assert "/depex/graph/packages" not in (refresher.schema or {}).get("paths", {})
+        upstreams["depex"] = depex
+        await sleep(0.1)
+        await refresher.stop()
+
+        assert "/depex/graph/packages" in refresher.schema["paths"]
+        assert refresher.complete()
+
+    async def test_restores_snapshot_and_revalidates(self, refresher, requests, snapshot_path):
+        schema = await refresher.refresh()
+        restarted = OpenAPIRefresher(
+            OpenAPIManager(), refresher.upstream_pool, SERVICES, snapshot_path=snapshot_path
+        )
+
+        assert await restarted.restore()
+        assert restarted.schema == schema
+        assert restarted.document.etags == refresher.document.etags
+
+        requests.clear()
+        await restarted.refresh()
+        assert {request.headers["if-none-match"] for request in requests} == set(refresher.etags.values())
+        assert restarted.swaps == 0
+
+    async def test_concurrent_saves_use_separate_temp_files(self, refresher, snapshot_path, tmp_path):
+        schema = await refresher.refresh()
+
+        await gather(*(to_thread(refresher.save, schema) for _ in range(8)))
+
+        assert [path.name for path in tmp_path.iterdir()] == ["openapi.json"]
+        assert await OpenAPIRefresher(
+            OpenAPIManager(), refresher.upstream_pool, SERVICES, snapshot_path=snapshot_path
+        ).restore()
+
+    async def test_failed_save_removes_temp_file(self, refresher, tmp_path, mocker):
+        schema = await refresher.refresh()
+        mocker.patch("app.domain.openapi_refresher.replace", side_effect=OSError("disk full"))
+
+        refresher.save(schema)
+
+        assert [path.name for path in tmp_path.iterdir()] == ["openapi.json"]
+
+    async def test_ignores_snapshot_for_other_services(self, refresher, snapshot_path):
+        await refresher.refresh()
+        restarted = OpenAPIRefresher(
+            OpenAPIManager(), refresher.upstream_pool, {"auth": SERVICES["auth"]}, snapshot_path=snapshot_path
+        )
+
+        assert not await restarted.restore()
+        assert restarted.schema is None
+
+    async def test_ignores_corrupt_snapshot(self, refresher, snapshot_path):
+        with open(snapshot_path, "wb") as snapshot:
+            snapshot.write(b"{not json")
+
+        assert not await refresher.restore()
+        assert refresher.schema is None
+
+    async def test_start_serves_snapshot_before_upstreams_answer(self, refresher, upstreams, snapshot_path):
+        await refresher.refresh()
+        for name in upstreams:
+            upstreams[name] = httpx.ConnectError("down")
+        restarted = OpenAPIRefresher(
+            OpenAPIManager(), refresher.upstream_pool, SERVICES, snapshot_path=snapshot_path
+        )
+
+        restarted.start(0)
+        await restarted.task
+
+        assert restarted.restored
+        assert "/auth/user/login" in restarted.schema["paths"]
@@ -1,10 +1,51 @@
+from asyncio import Event, create_task, gather, sleep
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from fastapi import Request
+from fastapi.responses import StreamingResponse
+from httpx import Headers, MockTransport, ReadError, ReadTimeout
 from httpx import Response as HTTPXResponse
+from starlette.requests import ClientDisconnect
 
-from app.utils import ProxyHandler
+from app.constants import CircuitState
+from app.metrics import metrics
+from app.tracing import Trace, current_trace
+from app.utils import (
+    AdmissionController,
+    CircuitBreaker,
+    LoadBalancer,
+    ProxyHandler,
+    ResponseCache,
+    RetryPolicy,
+    SingleFlight,
+    TimeoutPolicy,
+    UpstreamPool,
+)
+
+
+def make_request(method="GET", headers=None, chunks=(b"",), query=b""):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/depex/graph",
+        "query_string": query,
+        "headers": [(k.encode("latin1"), v.encode("latin1")) for k, v in (headers or [])],
+    }
+    return Request(scope, receive)
+
+
+async def iter_chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
 
 
 class TestProxyHandler:
@@ -14,82 +55,102 @@ class TestProxyHandler:
 
     def test_filter_request_headers(self, proxy_handler):
         headers = [
-            ("host", "example.com"),
-            ("user-agent", "test"),
-            ("connection", "keep-alive"),
-            ("content-length", "100"),
-            ("authorization", "Bearer token"),
+            (b"host", b"example.com"),
+            (b"user-agent", b"test"),
+            (b"connection", b"keep-alive"),
+            (b"content-length", b"100"),
+            (b"authorization", b"Bearer token"),
+            (b"accept", b"application/json"),
+            (b"accept", b"text/plain"),
         ]
 
         filtered = proxy_handler.filter_request_headers(headers)
 
-        assert "user-agent" in filtered
-        assert "authorization" in filtered
-        assert "host" not in filtered
-        assert "connection" not in filtered
-        assert "content-length" not in filtered
+        assert filtered == [
+            (b"user-agent", b"test"),
+            (b"authorization", b"Bearer token"),
+            (b"accept", b"application/json"),
+            (b"accept", b"text/plain"),
+        ]
 
     def test_filter_response_headers(self, proxy_handler):
-        upstream_headers = {
-            "content-type": "application/json",
-            "content-length": "100",
-            "date": "Mon, 01 Jan 2024 00:00:00 GMT",
-            "server": "nginx",
-            "x-custom-header": "value",
-        }
+        upstream_headers = [
+            (b"Content-Type", b"application/json"),
+            (b"content-length", b"100"),
+            (b"Date", b"Mon, 01 Jan 2024 00:00:00 GMT"),
+            (b"server", b"nginx"),
+            (b"x-custom-header", b"value"),
+            (b"Set-Cookie", b"cookie1=value1"),
+            (b"set-cookie", b"cookie2=value2"),
+        ]
 
         filtered = proxy_handler.filter_response_headers(upstream_headers)
 
-        assert "content-type" in filtered
-        assert "x-custom-header" in filtered
-        assert "content-length" not in filtered
-        assert "date" not in filtered
-        assert "server" not in filtered
-
-    def test_extract_cookies_with_get_list(self, proxy_handler):
-        mock_headers = Mock()
-        mock_headers.get_list = Mock(return_value=["cookie1=value1", "cookie2=value2"])
+        assert filtered == [
+            (b"content-type", b"application/json"),
+            (b"x-custom-header", b"value"),
+            (b"set-cookie", b"cookie1=value1"),
+            (b"set-cookie", b"cookie2=value2"),
+        ]
 
-        cookies = proxy_handler.extract_cookies(mock_headers)
+    def test_build_response_keeps_duplicate_headers(self, proxy_handler):
+        upstream_headers = Headers(
+            [("content-type", "application/json"), ("vary", "accept"), ("vary", "cookie"), ("connection", "close")]
+        )
 
-        assert len(cookies) == 2
-        assert "cookie1=value1" in cookies
-        assert "cookie2=value2" in cookies
+        response = proxy_handler.build_response(b"{}", 200, upstream_headers)
 
-    def test_extract_cookies_with_raw_headers(self, proxy_handler):
-        mock_headers = Mock()
-        mock_headers.get_list = Mock(return_value=[])
-        mock_headers.raw = [
-            (b"set-cookie", b"cookie1=value1"),
+        assert response.raw_headers == [
+            (b"content-length", b"2"),
             (b"content-type", b"application/json"),
-            (b"set-cookie", b"cookie2=value2"),
+            (b"vary", b"accept"),
+            (b"vary", b"cookie"),
         ]
 
-        cookies = proxy_handler.extract_cookies(mock_headers)
+    def test_request_key_varies_by_identity(self, proxy_handler):
+        url = "http://depex/graph"
+        anonymous = proxy_handler.request_key(url, make_request())
+        alice = proxy_handler.request_key(url, make_request(headers=[("authorization", "Bearer alice")]))
+        bob = proxy_handler.request_key(url, make_request(headers=[("authorization", "Bearer bob")]))
+        cookie = proxy_handler.request_key(url, make_request(headers=[("cookie", "access_token=alice")]))
+
+        assert len({anonymous, alice, bob, cookie}) == 4
+        assert alice == proxy_handler.request_key(url, make_request(headers=[("authorization", "Bearer alice")]))
+
+    def test_request_key_varies_by_query_and_method(self, proxy_handler):
+        url = "http://depex/graph"
+
+        assert proxy_handler.request_key(url, make_request(query=b"a=1")) != proxy_handler.request_key(
+            url, make_request(query=b"a=2")
+        )
+        assert proxy_handler.request_key(url, make_request("GET")) != proxy_handler.request_key(
+            url, make_request("HEAD")
+        )
 
-        assert len(cookies) == 2
-        assert "cookie1=value1" in cookies
-        assert "cookie2=value2" in cookies
+    def test_is_shareable(self, proxy_handler):
+        assert proxy_handler.is_shareable(make_request("GET"))
+        assert not proxy_handler.is_shareable(make_request("POST"))
+        assert not proxy_handler.is_shareable(make_request("GET", headers=[("content-length", "2")]))
 
     @pytest.mark.asyncio
     async def test_proxy_request_success(self, proxy_handler, mocker):
         mock_request = Mock(spec=Request)
         mock_request.method = "GET"
-        mock_request.headers.items = Mock(return_value=[("user-agent", "test")])
+        mock_request.url.path = "/depex/graph"
+        mock_request.headers.raw = [(b"user-agent", b"test")]
         mock_request.query_params = {}
         mock_request.body = AsyncMock(return_value=b"")
 
         mock_response = Mock(spec=HTTPXResponse)
         mock_response.content = b'{"status": "ok"}'
         mock_response.status_code = 200
-        mock_response.headers = {"content-type": "application/json"}
+        mock_response.headers = Headers({"content-type": "application/json"})
 
         mock_client = AsyncMock()
-        mock_client.request = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
+        mock_client.build_request = Mock()
+        mock_client.send = AsyncMock(return_value=mock_response)
 
-        mocker.patch("app.domain.proxy_handler.AsyncClient", return_value=mock_client)
+        mocker.patch.object(proxy_handler.upstream_pool, "client_for", return_value=mock_client)
 
         response = await proxy_handler.proxy_request("http://test.com", mock_request)
 
@@ -100,17 +161,792 @@ class TestProxyHandler:
     async def test_proxy_request_error(self, proxy_handler, mocker):
         mock_request = Mock(spec=Request)
         mock_request.method = "GET"
-        mock_request.headers.items = Mock(return_value=[])
+        mock_request.url.path = "/depex/graph"
+        mock_request.headers.raw = []
         mock_request.query_params = {}
         mock_request.body = AsyncMock(return_value=b"")
 
         mock_client = AsyncMock()
-        mock_client.request = AsyncMock(side_effect=Exception("Connection error"))
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
+        mock_client.build_request = Mock()
+        mock_client.send = AsyncMock(side_effect=Exception("Connection error"))
 
-        mocker.patch("app.domain.proxy_handler.AsyncClient", return_value=mock_client)
+        mocker.patch.object(proxy_handler.upstream_pool, "client_for", return_value=mock_client)
 
         response = await proxy_handler.proxy_request("http://test.com", mock_request)
 
         assert response.status_code == 502
+
+    @pytest.mark.asyncio
+    async def test_proxy_request_reuses_pooled_client(self, mocker):
+        upstream_pool = UpstreamPool()
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool)
+        mock_request = Mock(spec=Request)
+        mock_request.method = "GET"
+        mock_request.url.path = "/depex/graph"
+        mock_request.headers.raw = []
+        mock_request.query_params = {}
+        mock_request.body = AsyncMock(return_value=b"")
+
+        mock_response = Mock(spec=HTTPXResponse)
+        mock_response.content = b"{}"
+        mock_response.status_code = 200
+        mock_response.headers = Headers({"content-type": "application/json"})
+
+        request_mock = mocker.patch(
+            "httpx.AsyncClient.send", AsyncMock(return_value=mock_response)
+        )
+
+        await proxy_handler.proxy_request("http://test.com/a", mock_request)
+        await proxy_handler.proxy_request("http://test.com/b", mock_request)
+
+        assert request_mock.await_count == 2
+        assert list(upstream_pool.clients) == ["http://test.com"]
+        await upstream_pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_request_relays_chunks(self):
+        transport = MockTransport(
+            lambda request: HTTPXResponse(
+                200,
+                headers=[
+                    ("content-type", "application/json"),
+                    ("connection", "keep-alive"),
+                    ("set-cookie", "access_token=a; HttpOnly"),
+                    ("set-cookie", "refresh_token=b; HttpOnly"),
+                ],
+                content=iter_chunks(b'{"nodes": [', b"1, 2", b"]}"),
+            )
+        )
+        proxy_handler = ProxyHandler(upstream_pool=UpstreamPool(transport=transport), streaming=True)
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        chunks = [chunk async for chunk in response.body_iterator]
+
+        assert isinstance(response, StreamingResponse)
+        assert response.status_code == 200
+        assert chunks == [b'{"nodes": [', b"1, 2", b"]}"]
+        assert response.headers["content-type"] == "application/json"
+        assert "connection" not in response.headers
+        assert [v for k, v in response.raw_headers if k == b"set-cookie"] == [
+            b"access_token=a; HttpOnly",
+            b"refresh_token=b; HttpOnly",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_request_forwards_body_chunks(self):
+        received = {}
+
+        async def handler(request):
+            received["body"] = await request.aread()
+            received["content-length"] = request.headers.get("content-length")
+            return HTTPXResponse(201, content=iter_chunks(b"created"))
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)), streaming=True
+        )
+        request = make_request(
+            "POST",
+            headers=[("content-length", "12"), ("content-type", "application/json")],
+            chunks=[b'{"vex"', b': "tix"}', b""],
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com/vex", request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert response.status_code == 201
+        assert body == b"created"
+        assert received == {"body": b'{"vex": "tix"}', "content-length": "12"}
+
+    @pytest.mark.asyncio
+    async def test_stream_request_without_body(self):
+        received = {}
+
+        async def handler(request):
+            received["headers"] = request.headers
+            return HTTPXResponse(200, content=iter_chunks(b"ok"))
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)), streaming=True
+        )
+
+        await proxy_handler.proxy_request("http://test.com/health", make_request())
+
+        assert "transfer-encoding" not in received["headers"]
+
+    @pytest.mark.asyncio
+    async def test_stream_request_error(self):
+        def handler(request):
+            raise ConnectionError("Connection refused")
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)), streaming=True
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com", make_request())
+
+        assert response.status_code == 502
+
+    @pytest.mark.asyncio
+    async def test_cached_request_hit_preserves_headers(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return HTTPXResponse(
+                200,
+                headers=[
+                    ("content-type", "application/json"),
+                    ("cache-control", "max-age=60"),
+                    ("x-graph", "a"),
+                    ("x-graph", "b"),
+                ],
+                content=b'{"nodes": []}',
+            )
+
+        response_cache = ResponseCache()
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=response_cache,
+        )
+
+        first = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        second = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert len(calls) == 1
+        assert second.body == first.body == b'{"nodes": []}'
+        assert second.raw_headers == first.raw_headers
+        assert response_cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_request_varies_by_authorization(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.headers["authorization"])
+            return HTTPXResponse(
+                200, headers={"cache-control": "max-age=60"}, content=request.headers["authorization"]
+            )
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=ResponseCache(),
+        )
+
+        alice = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("authorization", "alice")])
+        )
+        bob = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("authorization", "bob")])
+        )
+
+        assert calls == ["alice", "bob"]
+        assert alice.body == b"alice"
+        assert bob.body == b"bob"
+
+    @pytest.mark.asyncio
+    async def test_cached_request_bypasses_non_idempotent(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.method)
+            return HTTPXResponse(200, headers={"cache-control": "max-age=60"}, content=b"ok")
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=ResponseCache(),
+        )
+
+        await proxy_handler.proxy_request("http://test.com/vex", make_request("POST"))
+        await proxy_handler.proxy_request("http://test.com/vex", make_request("POST"))
+
+        assert calls == ["POST", "POST"]
+
+    @pytest.mark.asyncio
+    async def test_cached_request_error(self):
+        def handler(request):
+            raise ConnectionError("Connection refused")
+
+        response_cache = ResponseCache()
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=response_cache,
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert response.status_code == 502
+        assert response_cache.stats()["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_coalesced_requests_share_upstream_call(self):
+        calls = []
+        release = Event()
+
+        async def handler(request):
+            calls.append(request.url.path)
+            await release.wait()
+            return HTTPXResponse(200, headers={"content-type": "application/json"}, content=b"[]")
+
+        single_flight = SingleFlight()
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            single_flight=single_flight,
+        )
+
+        tasks = [
+            create_task(proxy_handler.proxy_request("http://test.com/graph", make_request()))
+            for _ in range(5)
+        ]
+        await sleep(0.01)
+        release.set()
+        responses = await gather(*tasks)
+
+        assert calls == ["/graph"]
+        assert [response.body for response in responses] == [b"[]"] * 5
+        assert single_flight.stats() == {"in_flight": 0, "upstream_calls": 1, "saved": 4}
+
+    @pytest.mark.asyncio
+    async def test_coalesced_waiters_never_receive_another_callers_cookie(self):
+        calls = []
+        release = Event()
+
+        async def handler(request):
+            calls.append(request.headers.get("x-caller"))
+            await release.wait()
+            return HTTPXResponse(200, headers={"set-cookie": f"session={request.headers['x-caller']}"})
+
+        single_flight = SingleFlight()
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=ResponseCache(),
+            single_flight=single_flight,
+        )
+
+        tasks = [
+            create_task(
+                proxy_handler.proxy_request("http://test.com/graph", make_request(headers=[("x-caller", caller)]))
+            )
+            for caller in ("alice", "bob", "carol")
+        ]
+        await sleep(0.01)
+        release.set()
+        responses = await gather(*tasks)
+
+        assert [response.headers["set-cookie"] for response in responses] == [
+            "session=alice", "session=bob", "session=carol"
+        ]
+        assert sorted(calls) == ["alice", "bob", "carol"]
+
+    @pytest.mark.asyncio
+    async def test_coalesced_request_survives_leader_cancellation(self):
+        release = Event()
+
+        async def handler(request):
+            await release.wait()
+            return HTTPXResponse(200, content=b"ok")
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            single_flight=SingleFlight(),
+        )
+
+        leader = create_task(proxy_handler.proxy_request("http://test.com/graph", make_request()))
+        await sleep(0.01)
+        follower = create_task(proxy_handler.proxy_request("http://test.com/graph", make_request()))
+        await sleep(0.01)
+        leader.cancel()
+        await sleep(0.01)
+        release.set()
+
+        response = await follower
+
+        assert leader.cancelled()
+        assert response.status_code == 200
+        assert response.body == b"ok"
+
+    @pytest.mark.asyncio
+    async def test_coalesced_error_fans_out(self):
+        async def handler(request):
+            await sleep(0.01)
+            raise ConnectionError("Connection refused")
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            single_flight=SingleFlight(),
+        )
+
+        responses = await gather(
+            *(proxy_handler.proxy_request("http://test.com/graph", make_request()) for _ in range(3))
+        )
+
+        assert [response.status_code for response in responses] == [502] * 3
+
+    @pytest.mark.asyncio
+    async def test_proxy_request_records_upstream_metrics(self):
+        metrics.reset()
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(lambda request: HTTPXResponse(200)))
+        )
+
+        await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert metrics.upstream_ttfb.count(("depex",)) == 1
+        assert metrics.upstream_duration.count(("depex",)) == 1
+
+    @pytest.mark.asyncio
+    async def test_proxy_request_counts_upstream_errors(self):
+        metrics.reset()
+
+        def handler(request):
+            raise ConnectionError("Connection refused")
+
+        proxy_handler = ProxyHandler(upstream_pool=UpstreamPool(transport=MockTransport(handler)))
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert response.status_code == 502
+        assert metrics.upstream_errors.get(("depex",)) == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return HTTPXResponse(503)
+
+        breaker = CircuitBreaker("depex", min_requests=2, open_duration=30.0)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            circuit_breakers={"depex": breaker},
+        )
+
+        responses = [await proxy_handler.proxy_request("http://test.com/graph", make_request()) for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [503, 503, 503]
+        assert len(calls) == 2
+        assert responses[-1].headers["retry-after"] == "30"
+        assert breaker.state is CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_cache_hits_bypass_and_do_not_move_the_circuit(self, mocker):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return HTTPXResponse(200, headers={"cache-control": "max-age=60"}, content=b"ok")
+
+        breaker = CircuitBreaker("depex", min_requests=1, open_duration=5.0, half_open_calls=3)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=ResponseCache(),
+            circuit_breakers={"depex": breaker},
+        )
+        await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        breaker.record(0.1, failed=True)
+        assert breaker.state is CircuitState.OPEN
+
+        open_hit = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        mocker.patch("app.domain.circuit_breaker.monotonic", return_value=breaker.opened_at + 5.0)
+        breaker.allow()
+        half_open_hits = [
+            await proxy_handler.proxy_request("http://test.com/graph", make_request()) for _ in range(3)
+        ]
+
+        assert open_hit.status_code == 200
+        assert [response.body for response in half_open_hits] == [b"ok"] * 3
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert breaker.probe_successes == 0
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_circuit_counts_transport_errors(self):
+        def handler(request):
+            raise ConnectionError("Connection refused")
+
+        breaker = CircuitBreaker("depex", min_requests=1)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            circuit_breakers={"depex": breaker},
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert response.status_code == 502
+        assert breaker.state is CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_admission_sheds_when_upstream_is_saturated(self):
+        release = Event()
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            await release.wait()
+            return HTTPXResponse(200, content=b"ok")
+
+        controller = AdmissionController("depex", max_concurrency=1, queue_size=0, interval=2.0)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            admission_controllers={"depex": controller},
+        )
+
+        first = create_task(proxy_handler.proxy_request("http://test.com/graph", make_request()))
+        await sleep(0.01)
+        shed = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        release.set()
+        response = await first
+
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "2"
+        assert response.status_code == 200
+        assert len(calls) == 1
+        assert controller.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_admission_queue_wait_is_bounded_by_the_deadline(self):
+        metrics.reset()
+        release = Event()
+        deadlines = []
+
+        async def handler(request):
+            deadlines.append(request.headers.get("x-request-timeout-ms"))
+            await release.wait()
+            return HTTPXResponse(200)
+
+        controller = AdmissionController("depex", max_concurrency=1, max_wait=5.0)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            timeout_policy=TimeoutPolicy(),
+            admission_controllers={"depex": controller},
+        )
+
+        first = create_task(proxy_handler.proxy_request("http://test.com/graph", make_request()))
+        await sleep(0.01)
+        expired = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "30")])
+        )
+        queued = create_task(
+            proxy_handler.proxy_request("http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "1000")]))
+        )
+        await sleep(0.2)
+        release.set()
+        await first
+        await queued
+
+        assert expired.status_code == 504
+        assert metrics.deadline_exceeded.get(("depex",)) == 1
+        assert metrics.admission_shed.get(("depex", "timeout")) == 0
+        assert int(deadlines[1]) <= 800
+        assert controller.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_admission_holds_slot_until_stream_ends(self):
+        controller = AdmissionController("depex", max_concurrency=1)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(
+                transport=MockTransport(lambda request: HTTPXResponse(200, content=iter_chunks(b"a", b"b")))
+            ),
+            streaming=True,
+            admission_controllers={"depex": controller},
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+        assert controller.stats()["in_flight"] == 1
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert body == b"ab"
+        assert controller.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_admission_skips_cache_hits_and_coalesced_followers(self):
+        release = Event()
+
+        async def handler(request):
+            await release.wait()
+            return HTTPXResponse(200, headers={"cache-control": "max-age=60"}, content=b"ok")
+
+        controller = AdmissionController("depex", max_concurrency=1, queue_size=0)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            response_cache=ResponseCache(),
+            single_flight=SingleFlight(),
+            admission_controllers={"depex": controller},
+        )
+
+        tasks = [
+            create_task(proxy_handler.proxy_request("http://test.com/graph", make_request())) for _ in range(5)
+        ]
+        await sleep(0.01)
+        release.set()
+        coalesced = await gather(*tasks)
+        admitted, limit = controller.admitted, controller.limit
+        hits = [await proxy_handler.proxy_request("http://test.com/graph", make_request()) for _ in range(5)]
+
+        assert [response.status_code for response in coalesced + hits] == [200] * 10
+        assert admitted == 1
+        assert controller.admitted == 1
+        assert controller.limit == limit
+        assert controller.stats()["shed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_admission_ignores_open_circuit_rejections(self):
+        breaker = CircuitBreaker("depex", min_requests=1)
+        breaker.record(0.1, failed=True)
+        controller = AdmissionController("depex", max_concurrency=10)
+        proxy_handler = ProxyHandler(
+            circuit_breakers={"depex": breaker},
+            admission_controllers={"depex": controller},
+        )
+
+        responses = [await proxy_handler.proxy_request("http://test.com/graph", make_request()) for _ in range(20)]
+
+        assert [response.status_code for response in responses] == [503] * 20
+        assert controller.limit == 10.0
+
+    @pytest.mark.asyncio
+    async def test_proxy_request_balances_across_replicas(self):
+        hosts = []
+
+        def handler(request):
+            hosts.append(request.url.host)
+            return HTTPXResponse(200, content=b"ok")
+
+        upstream_pool = UpstreamPool(transport=MockTransport(handler))
+        load_balancer = LoadBalancer(
+            upstream_pool, {"http://depex:8000": ["http://depex-1:8000", "http://depex-2:8000"]}
+        )
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool, load_balancer=load_balancer)
+
+        for _ in range(10):
+            response = await proxy_handler.proxy_request("http://depex:8000/graph", make_request())
+            assert response.body == b"ok"
+
+        assert set(hosts) <= {"depex-1", "depex-2"}
+        assert all(replica.outstanding == 0 for replica in load_balancer.services["http://depex:8000"])
+
+    @pytest.mark.asyncio
+    async def test_stream_request_releases_replica_after_body(self):
+        upstream_pool = UpstreamPool(
+            transport=MockTransport(lambda request: HTTPXResponse(200, content=iter_chunks(b"a", b"b")))
+        )
+        load_balancer = LoadBalancer(upstream_pool, {"http://depex:8000": ["http://depex-1:8000"]})
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool, streaming=True, load_balancer=load_balancer)
+        replica = load_balancer.services["http://depex:8000"][0]
+
+        response = await proxy_handler.proxy_request("http://depex:8000/graph", make_request())
+        assert replica.outstanding == 1
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+        assert body == b"ab"
+        assert replica.outstanding == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_request_releases_replica_when_body_fails(self):
+        async def failing_body():
+            yield b"a"
+            raise ReadError("Connection reset")
+
+        upstream_pool = UpstreamPool(
+            transport=MockTransport(lambda request: HTTPXResponse(200, content=failing_body()))
+        )
+        load_balancer = LoadBalancer(
+            upstream_pool, {"http://depex:8000": ["http://depex-1:8000", "http://depex-2:8000"]}
+        )
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool, streaming=True, load_balancer=load_balancer)
+
+        for _ in range(3):
+            response = await proxy_handler.proxy_request("http://depex:8000/graph", make_request())
+            with pytest.raises(ReadError):
+                [chunk async for chunk in response.body_iterator]
+
+        replicas = load_balancer.services["http://depex:8000"]
+        assert [replica.outstanding for replica in replicas] == [0, 0]
+        assert sum(replica.errors for replica in replicas) == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_request_releases_replica_when_client_disconnects(self):
+        upstream_pool = UpstreamPool(
+            transport=MockTransport(lambda request: HTTPXResponse(200, content=iter_chunks(b"a", b"b")))
+        )
+        load_balancer = LoadBalancer(upstream_pool, {"http://depex:8000": ["http://depex-1:8000"]})
+        proxy_handler = ProxyHandler(upstream_pool=upstream_pool, streaming=True, load_balancer=load_balancer)
+        replica = load_balancer.services["http://depex:8000"][0]
+
+        async def send(message):
+            raise OSError("Client disconnected")
+
+        response = await proxy_handler.proxy_request("http://depex:8000/graph", make_request())
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, AsyncMock(), send)
+
+        assert replica.outstanding == 0
+        assert replica.errors == 0
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(("method", "expected_calls"), [("GET", 2), ("POST", 1)])
+    async def test_retry_policy_only_retries_idempotent_methods(self, method, expected_calls):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return HTTPXResponse(503 if len(calls) == 1 else 200)
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            retry_policy=RetryPolicy(retry_routes=["/depex"], backoff_base=0.001),
+        )
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request(method))
+
+        assert len(calls) == expected_calls
+        assert response.status_code == (200 if method == "GET" else 503)
+
+    @pytest.mark.asyncio
+    async def test_deadline_header_forwards_remaining_budget(self):
+        seen = []
+
+        def handler(request):
+            seen.append((request.headers["x-request-timeout-ms"], request.extensions["timeout"]))
+            return HTTPXResponse(200)
+
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            timeout_policy=TimeoutPolicy(read=30.0),
+        )
+
+        response = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "2000")])
+        )
+
+        assert response.status_code == 200
+        remaining, timeouts = seen[0]
+        assert 0 < int(remaining) <= 2000
+        assert timeouts["read"] <= 2.0
+
+    @pytest.mark.asyncio
+    async def test_spent_deadline_returns_504_without_upstream_call(self):
+        calls = []
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(lambda request: calls.append(request))),
+            timeout_policy=TimeoutPolicy(),
+        )
+
+        response = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "0")])
+        )
+
+        assert response.status_code == 504
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_spent_deadlines_do_not_count_against_upstream(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return HTTPXResponse(200)
+
+        breaker = CircuitBreaker("depex", min_requests=2)
+        controller = AdmissionController("depex", max_concurrency=10)
+        proxy_handler = ProxyHandler(
+            upstream_pool=UpstreamPool(transport=MockTransport(handler)),
+            circuit_breakers={"depex": breaker},
+            timeout_policy=TimeoutPolicy(),
+            admission_controllers={"depex": controller},
+        )
+
+        for _ in range(20):
+            response = await proxy_handler.proxy_request(
+                "http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "0")])
+            )
+            assert response.status_code == 504
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert response.status_code == 200
+        assert len(calls) == 1
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["failures"] == 0
+        assert controller.limit == 10.0
+
+    @pytest.mark.asyncio
+    async def test_deadline_expiry_is_not_an_upstream_failure(self):
+        metrics.reset()
+
+        async def handler(request):
+            await sleep(1)
+            return HTTPXResponse(200)
+
+        upstream_pool = UpstreamPool(transport=MockTransport(handler))
+        load_balancer = LoadBalancer(upstream_pool, {"http://depex:8000": ["http://depex-1:8000"]})
+        breaker = CircuitBreaker("depex", min_requests=1)
+        controller = AdmissionController("depex", max_concurrency=10)
+        proxy_handler = ProxyHandler(
+            upstream_pool=upstream_pool,
+            circuit_breakers={"depex": breaker},
+            load_balancer=load_balancer,
+            timeout_policy=TimeoutPolicy(),
+            admission_controllers={"depex": controller},
+        )
+
+        response = await proxy_handler.proxy_request(
+            "http://depex:8000/graph", make_request(headers=[("x-request-timeout-ms", "20")])
+        )
+
+        replica = load_balancer.services["http://depex:8000"][0]
+        assert response.status_code == 504
+        assert response.body == b'{"code":"deadline_exceeded"}'
+        assert metrics.deadline_exceeded.get(("depex",)) == 1
+        assert metrics.upstream_timeouts.get(("depex",)) == 0
+        assert (replica.outstanding, replica.errors) == (0, 0)
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.stats()["requests"] == 0
+        assert controller.limit == 10.0
+
+    @pytest.mark.asyncio
+    async def test_deadline_expiry_returns_504(self):
+        async def slow(url, request):
+            await sleep(1)
+
+        proxy_handler = ProxyHandler(timeout_policy=TimeoutPolicy())
+        proxy_handler.forward = slow
+
+        response = await proxy_handler.proxy_request(
+            "http://test.com/graph", make_request(headers=[("x-request-timeout-ms", "20")])
+        )
+
+        assert response.status_code == 504
+
+    @pytest.mark.asyncio
+    async def test_upstream_timeout_returns_504(self):
+        def handler(request):
+            raise ReadTimeout("timed out", request=request)
+
+        proxy_handler = ProxyHandler(upstream_pool=UpstreamPool(transport=MockTransport(handler)))
+        before = metrics.upstream_timeouts.get(("depex",))
+
+        response = await proxy_handler.proxy_request("http://test.com/graph", make_request())
+
+        assert response.status_code == 504
+        assert metrics.upstream_timeouts.get(("depex",)) == before + 1
+
+    @pytest.mark.asyncio
+    async def test_forwards_gateway_traceparent(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request.headers.get_list("traceparent"))
+            return HTTPXResponse(200)
+
+        proxy_handler = ProxyHandler(upstream_pool=UpstreamPool(transport=MockTransport(handler)))
+        incoming = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+        trace = Trace(incoming)
+        token = current_trace.set(trace)
+        try:
+            await proxy_handler.proxy_request(
+                "http://test.com/graph", make_request(headers=[("traceparent", incoming)])
+            )
+        finally:
+            current_trace.reset(token)
+
+        assert seen == [[trace.traceparent]]
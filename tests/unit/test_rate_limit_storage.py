@@ -0,0 +1,92 @@
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from app.rate_limit_storage import SharedMemoryStorage
+
+
+class TestSharedMemoryStorage:
+    @pytest.fixture
+    def uri(self, tmp_path):
+        return f"shm://{tmp_path}/ratelimit?slots=64"
+
+    @pytest.fixture
+    def storage(self, uri):
+        storage = SharedMemoryStorage(uri)
+        yield storage
+        storage.close()
+
+    def test_registered_scheme(self, uri):
+        storage = storage_from_string(uri)
+        assert isinstance(storage, SharedMemoryStorage)
+        assert storage.slots == 64
+        assert storage.check()
+        storage.close()
+
+    def test_fixed_window_counters(self, storage):
+        assert storage.incr("client", 60) == 1
+        assert storage.incr("client", 60, amount=2) == 3
+        assert storage.get("client") == 3
+        assert storage.get("unknown") == 0
+        assert storage.get_expiry("client") > 0
+        storage.clear("client")
+        assert storage.get("client") == 0
+
+    def test_counters_shared_between_workers(self, uri, storage):
+        other = SharedMemoryStorage(uri)
+        limit = RateLimitItemPerMinute(5)
+        first = SlidingWindowCounterRateLimiter(storage)
+        second = SlidingWindowCounterRateLimiter(other)
+        results = [(first if i % 2 else second).hit(limit, "10.0.0.1") for i in range(6)]
+        assert results == [True] * 5 + [False]
+        assert not first.test(limit, "10.0.0.1")
+        assert second.test(limit, "10.0.0.2")
+        other.close()
+
+    def test_fixed_window_strategy(self, storage):
+        limiter = FixedWindowRateLimiter(storage)
+        limit = RateLimitItemPerMinute(2)
+        assert limiter.hit(limit, "client")
+        assert limiter.hit(limit, "client")
+        assert not limiter.hit(limit, "client")
+
+    def test_sliding_window_weights_previous_window(self, storage, mocker):
+        mocker.patch("app.rate_limit_storage.time", return_value=6000.0)
+        for _ in range(4):
+            assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert not storage.acquire_sliding_window_entry("client", 4, 60)
+
+        mocker.patch("app.rate_limit_storage.time", return_value=6090.0)
+        previous, previous_ttl, current, _ = storage.get_sliding_window("client", 60)
+        assert (previous, current) == (4, 0)
+        assert previous_ttl == 30.0
+        assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert storage.acquire_sliding_window_entry("client", 4, 60)
+        assert not storage.acquire_sliding_window_entry("client", 4, 60)
+
+        mocker.patch("app.rate_limit_storage.time", return_value=6200.0)
+        assert storage.get_sliding_window("client", 60)[:3] == (0, 0.0, 0)
+
+    def test_idle_keys_are_reused_and_table_is_bounded(self, tmp_path, mocker):
+        storage = SharedMemoryStorage(f"shm://{tmp_path}/small?slots=4", probes=4)
+        mocker.patch("app.rate_limit_storage.time", return_value=1000.0)
+        for client in ("a", "b", "c", "d"):
+            storage.acquire_sliding_window_entry(client, 10, 60)
+        assert storage.evictions == 0
+
+        storage.acquire_sliding_window_entry("e", 10, 60)
+        assert storage.evictions == 1
+
+        mocker.patch("app.rate_limit_storage.time", return_value=2000.0)
+        storage.acquire_sliding_window_entry("f", 10, 60)
+        assert storage.evictions == 1
+        assert storage.path.stat().st_size == 16 + 4 * 56
+        storage.close()
+
+    def test_reset(self, storage):
+        storage.incr("a", 60)
+        storage.acquire_sliding_window_entry("b", 10, 60)
+        assert storage.reset() == 2
+        assert storage.get("a") == 0
+        assert storage.get_sliding_window("b", 60)[2] == 0
@@ -0,0 +1,65 @@
+from cProfile import Profile
+
+import pytest
+from starlette.datastructures import Headers
+
+from app.utils import RequestProfiler
+
+
+def busy_loop():
+    return sum(i * i for i in range(20000))
+
+
+def capture() -> Profile:
+    profile = Profile()
+    profile.enable()
+    busy_loop()
+    profile.disable()
+    return profile
+
+
+class TestRequestProfiler:
+    def test_wants_privileged_header_only(self, tmp_path):
+        profiler = RequestProfiler(str(tmp_path), token="secret")
+
+        assert profiler.wants(Headers({"x-gateway-profile": "secret"}))
+        assert not profiler.wants(Headers({"x-gateway-profile": "wrong"}))
+        assert not profiler.wants(Headers({}))
+        assert not RequestProfiler(str(tmp_path)).wants(Headers({"x-gateway-profile": "secret"}))
+
+    def test_wants_sampled_requests(self, tmp_path):
+        assert RequestProfiler(str(tmp_path), sample_rate=1.0).wants(Headers({}))
+
+    def test_skips_while_another_profile_runs(self, tmp_path):
+        profiler = RequestProfiler(str(tmp_path), sample_rate=1.0)
+        profile = profiler.start()
+
+        assert not profiler.wants(Headers({}))
+        profiler.stop(profile)
+        assert profiler.skipped == 1
+        assert profiler.wants(Headers({}))
+
+    @pytest.mark.asyncio
+    async def test_ring_keeps_newest_profiles(self, tmp_path):
+        profiler = RequestProfiler(str(tmp_path), max_files=2)
+        names = [profiler.name_for("GET", "depex") for _ in range(3)]
+
+        for name in names:
+            await profiler.save(capture(), name)
+
+        assert [entry["name"] for entry in profiler.profiles()] == names[:0:-1]
+        assert profiler.profiles()[0]["route"] == "depex"
+        assert profiler.captured == 3
+
+    @pytest.mark.asyncio
+    async def test_summary_lists_top_frames(self, tmp_path):
+        profiler = RequestProfiler(str(tmp_path))
+        name = profiler.name_for("GET", "depex")
+        await profiler.save(capture(), name)
+
+        summary = profiler.summary(name, limit=5)
+
+        assert len(summary["frames"]) <= 5
+        assert any("busy_loop" in frame["function"] for frame in summary["frames"])
+        assert profiler.summary("../etc/passwd") is None
+        assert profiler.summary("missing") is None
@@ -0,0 +1,104 @@
+import pytest
+from fastapi import Request
+from httpx import Headers
+
+from app.utils import ResponseCache
+
+
+def make_request(method="GET", query=b"", headers=None):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/depex/graph",
+        "query_string": query,
+        "headers": [(k.encode("latin1"), v.encode("latin1")) for k, v in (headers or [])],
+    }
+    return Request(scope)
+
+
+class TestResponseCache:
+    @pytest.fixture
+    def response_cache(self):
+        return ResponseCache(max_bytes=4096, max_entry_bytes=2048, route_ttls={"/depex/graph": 60.0})
+
+    def test_is_cacheable_request(self, response_cache):
+        assert response_cache.is_cacheable_request(make_request("GET"))
+        assert response_cache.is_cacheable_request(make_request("HEAD"))
+        assert not response_cache.is_cacheable_request(make_request("POST"))
+        assert not response_cache.is_cacheable_request(
+            make_request("GET", headers=[("cache-control", "no-cache")])
+        )
+
+    def test_ttl_for_upstream_max_age(self):
+        response_cache = ResponseCache()
+
+        assert response_cache.ttl_for("/vexgen/vex", Headers({"cache-control": "public, max-age=30"})) == 30.0
+        assert response_cache.ttl_for("/vexgen/vex", Headers({"cache-control": "max-age=30", "age": "10"})) == 20.0
+        assert response_cache.ttl_for("/vexgen/vex", Headers({"cache-control": "s-maxage=5, max-age=30"})) == 5.0
+
+    def test_ttl_for_expires(self):
+        headers = Headers(
+            {"date": "Mon, 01 Jan 2024 00:00:00 GMT", "expires": "Mon, 01 Jan 2024 00:02:00 GMT"}
+        )
+
+        assert ResponseCache().ttl_for("/vexgen/vex", headers) == 120.0
+        assert ResponseCache().ttl_for("/vexgen/vex", Headers({"expires": "0"})) == 0.0
+
+    def test_ttl_for_route_override(self, response_cache):
+        assert response_cache.ttl_for("/depex/graph/pypi", Headers()) == 60.0
+        assert response_cache.ttl_for("/depex/graph/pypi", Headers({"cache-control": "max-age=5"})) == 60.0
+        assert response_cache.ttl_for("/depex/graph/pypi", Headers({"cache-control": "no-store"})) == 0.0
+        assert response_cache.ttl_for("/depex/graph/pypi", Headers({"cache-control": "private"})) == 0.0
+        assert response_cache.ttl_for("/vexgen/vex", Headers()) == 0.0
+
+    def test_store_and_get(self, response_cache):
+        headers = Headers([("content-type", "application/json"), ("x-trace", "a"), ("x-trace", "b")])
+
+        response_cache.store("k", "/depex/graph", 200, headers, b"{}")
+        entry = response_cache.get("k")
+
+        assert entry.content == b"{}"
+        assert entry.headers.get_list("x-trace") == ["a", "b"]
+        assert response_cache.stats()["hits"] == 1
+
+    def test_store_skips_uncacheable(self, response_cache):
+        assert response_cache.store("a", "/depex/graph", 500, Headers(), b"") is None
+        assert response_cache.store("b", "/depex/graph", 200, Headers({"set-cookie": "a=1"}), b"") is None
+        assert response_cache.store("c", "/vexgen/vex", 200, Headers(), b"") is None
+        assert response_cache.store("d", "/depex/graph", 200, Headers(), b"x" * 4096) is None
+        assert response_cache.stats()["entries"] == 0
+
+    def test_get_expired(self, response_cache, mocker):
+        response_cache.store("k", "/depex/graph", 200, Headers(), b"{}")
+        mocker.patch("app.domain.response_cache.monotonic", return_value=float("inf"))
+
+        assert response_cache.get("k") is None
+        assert response_cache.stats()["misses"] == 1
+        assert response_cache.stats()["bytes"] == 0
+
+    def test_evicts_least_recently_used_by_bytes(self, response_cache):
+        for key in ("a", "b", "c"):
+            response_cache.store(key, "/depex/graph", 200, Headers(), b"x" * 1000)
+        response_cache.get("a")
+        response_cache.store("d", "/depex/graph", 200, Headers(), b"x" * 1000)
+
+        assert list(response_cache.entries) == ["c", "a", "d"]
+        assert response_cache.stats()["evictions"] == 1
+        assert response_cache.size <= response_cache.max_bytes
+
+    def test_clear(self, response_cache):
+        response_cache.store("k", "/depex/graph", 200, Headers(), b"{}")
+        response_cache.clear()
+
+        assert response_cache.stats()["entries"] == 0
+        assert response_cache.size == 0
+
+    def test_stats_shape(self):
+        assert set(ResponseCache().stats()) == {
+            "entries",
+            "bytes",
+            "max_bytes",
+            "hits",
+            "misses",
+            "evictions",
+        }
@@ -0,0 +1,153 @@
+from asyncio import sleep
+
+import httpx
+import pytest
+from fastapi import Request
+
+from app.metrics import metrics
+from app.utils import RetryBudget, RetryPolicy
+
+
+def make_request(method="GET", path="/depex/graph"):
+    return Request({"type": "http", "method": method, "path": path, "query_string": b"", "headers": []})
+
+
+def make_upstream(*outcomes, delays=None):
+    calls = []
+
+    async def fn():
+        index = len(calls)
+        calls.append(index)
+        if delays:
+            await sleep(delays[min(index, len(delays) - 1)])
+        outcome = outcomes[min(index, len(outcomes) - 1)]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+    return fn, calls
+
+
+class TestRetryBudget:
+    def test_starts_at_steady_state_allowance(self):
+        assert RetryBudget(min_per_second=2.0, max_tokens=100).tokens == 2.0
+        assert RetryBudget(min_per_second=5.0, max_tokens=1).tokens == 1
+
+    def test_withdraw_until_empty(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=1)
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+        assert not budget.withdraw()
+        budget.deposit()
+        budget.deposit()
+        assert budget.withdraw()
+
+
+class TestRetryPolicy:
+    @pytest.fixture
+    def policy(self):
+        return RetryPolicy(
+            retry_routes=["/depex/graph"], backoff_base=0.001, time_budget=1.0,
+            budget=RetryBudget(min_per_second=10.0),
+        )
+
+    def test_applies_only_to_idempotent_opted_in_routes(self, policy):
+        assert policy.applies(make_request("GET"))
+        assert policy.applies(make_request("HEAD"))
+        assert not policy.applies(make_request("POST"))
+        assert not policy.applies(make_request("GET", path="/auth/user"))
+
+    @pytest.mark.asyncio
+    async def test_retries_connect_errors_and_5xx(self, policy):
+        metrics.reset()
+        fn, calls = make_upstream(httpx.ConnectError("refused"), 503, 200)
+
+        response = await policy.execute(make_request(), "depex", fn)
+
+        assert response.status_code == 200
+        assert len(calls) == 3
+        assert metrics.upstream_retries.get(("depex",)) == 2
+
+    @pytest.mark.asyncio
+    async def test_returns_last_failure_after_max_attempts(self, policy):
+        fn, calls = make_upstream(502)
+
+        response = await policy.execute(make_request(), "depex", fn)
+
+        assert response.status_code == 502
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_raises_last_error_after_max_attempts(self, policy):
+        fn, calls = make_upstream(httpx.ConnectError("refused"))
+
+        with pytest.raises(httpx.ConnectError):
+            await policy.execute(make_request(), "depex", fn)
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_other_errors(self, policy):
+        fn, calls = make_upstream(httpx.ReadTimeout("slow"))
+
+        with pytest.raises(httpx.ReadTimeout):
+            await policy.execute(make_request(), "depex", fn)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_budget_caps_retries(self):
+        metrics.reset()
+        policy = RetryPolicy(
+            retry_routes=["/depex"], backoff_base=0.001,
+            budget=RetryBudget(ratio=1, min_per_second=0, max_tokens=1),
+        )
+        fn, calls = make_upstream(503)
+
+        await policy.execute(make_request(), "depex", fn)
+
+        assert len(calls) == 2
+        assert metrics.retry_budget_exhausted.get(("depex",)) == 1
+
+    @pytest.mark.asyncio
+    async def test_time_budget_stops_retries(self):
+        policy = RetryPolicy(retry_routes=["/depex"], backoff_base=10.0, backoff_max=10.0, time_budget=0.01)
+        policy.backoff = lambda attempt: 10.0
+        fn, calls = make_upstream(503)
+
+        await policy.execute(make_request(), "depex", fn)
+
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_time_budget_bounds_each_attempt(self):
+        policy = RetryPolicy(retry_routes=["/depex"], time_budget=0.05)
+        fn, calls = make_upstream(200, delays=[10.0])
+
+        with pytest.raises(httpx.TimeoutException):
+            await policy.execute(make_request(), "depex", fn)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_hedges_after_observed_quantile(self):
+        metrics.reset()
+        policy = RetryPolicy(hedge_routes=["/depex/graph"], hedge_min_samples=20)
+        for _ in range(20):
+            policy.observe("depex", 0.01)
+        assert policy.hedge_delays["depex"] == 0.01
+
+        fn, calls = make_upstream(200, delays=[1.0, 0.0])
+        response = await policy.execute(make_request(), "depex", fn)
+
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert metrics.upstream_hedges.get(("depex",)) == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        policy = RetryPolicy(hedge_routes=["/depex/graph"])
+        fn, calls = make_upstream(200, delays=[0.02])
+
+        await policy.execute(make_request(), "depex", fn)
+
+        assert len(calls) == 1
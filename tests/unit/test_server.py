@@ -0,0 +1,86 @@
+from socket import SO_REUSEPORT, SOL_SOCKET
+from unittest.mock import Mock
+
+from app import server
+from app.server import Supervisor, bind_socket, worker_count
+
+
+def fake_process(alive: bool = True) -> Mock:
+    process = Mock()
+    process.is_alive.return_value = alive
+    process.exitcode = None if alive else 1
+    return process
+
+
+class TestServer:
+    def test_worker_count_defaults_to_cpu_cores(self, mocker):
+        mocker.patch("app.server.process_cpu_count", return_value=8)
+
+        assert worker_count(0) == 8
+        assert worker_count(3) == 3
+
+    def test_reuse_port_sockets_share_a_port(self):
+        first = bind_socket("127.0.0.1", 0, reuse_port=True)
+        second = bind_socket("127.0.0.1", first.getsockname()[1], reuse_port=True)
+        try:
+            assert second.getsockopt(SOL_SOCKET, SO_REUSEPORT)
+            assert first.getsockname() == second.getsockname()
+        finally:
+            first.close()
+            second.close()
+
+
+class TestSupervisor:
+    def test_restarts_crashed_workers_with_backoff(self, mocker):
+        supervisor = Supervisor(workers=2, restart_delay=1.0)
+        mocker.patch.object(supervisor, "spawn", side_effect=[fake_process(), fake_process(False), fake_process()])
+        monotonic = mocker.patch("app.server.monotonic", return_value=100.0)
+        supervisor.pool = [server.Worker(supervisor.spawn()), server.Worker(supervisor.spawn())]
+
+        monotonic.return_value = 101.0
+        supervisor.reap()
+        assert supervisor.pool[1].restart_at == 102.0
+        assert supervisor.spawn.call_count == 2
+
+        monotonic.return_value = 102.0
+        supervisor.reap()
+        assert supervisor.spawn.call_count == 3
+        assert supervisor.pool[1].process.is_alive()
+
+    def test_backoff_doubles_for_crash_loops(self, mocker):
+        supervisor = Supervisor(workers=1, restart_delay=1.0, restart_delay_max=4.0)
+        mocker.patch.object(supervisor, "spawn", side_effect=lambda: fake_process(False))
+        mocker.patch("app.server.monotonic", return_value=0.0)
+        supervisor.pool = [server.Worker(supervisor.spawn())]
+
+        delays = []
+        for _ in range(4):
+            supervisor.reap()
+            delays.append(supervisor.pool[0].backoff)
+            supervisor.pool[0].restart_at = -1.0
+            supervisor.reap()
+
+        assert delays == [1.0, 2.0, 4.0, 4.0]
+
+    def test_stop_drains_then_kills_stragglers(self):
+        supervisor = Supervisor(workers=2, graceful_timeout=0.0)
+        drained, stuck = fake_process(), fake_process()
+        drained.join.side_effect = lambda timeout=None: drained.is_alive.configure_mock(return_value=False)
+        supervisor.pool = [server.Worker(drained), server.Worker(stuck)]
+
+        supervisor.stop()
+
+        drained.terminate.assert_called_once()
+        drained.kill.assert_not_called()
+        stuck.terminate.assert_called_once()
+        stuck.kill.assert_called_once()
+
+    def test_multiple_workers_share_rate_limit_storage(self, mocker, monkeypatch):
+        monkeypatch.setattr(server.settings, "GATEWAY_WORKERS", 2)
+        monkeypatch.setattr(server, "environ", {})
+        run = mocker.patch.object(Supervisor, "run")
+
+        server.main()
+
+        run.assert_called_once()
+        assert server.environ["RATE_LIMIT_STORAGE_URI"] == server.SHARED_RATE_LIMIT_STORAGE
@@ -0,0 +1,30 @@
+from app.metrics import metrics
+from app.utils import ServiceRegistry, ServiceRoute
+
+
+class TestServiceRegistry:
+    def test_match_by_first_segment(self):
+        registry = ServiceRegistry([ServiceRoute("depex", "http://depex:8000/")])
+
+        assert registry.match("/depex/graph/pypi").name == "depex"
+        assert registry.match("/depex/").name == "depex"
+        assert registry.match("/depex") is None
+        assert registry.match("/depexfoo/graph") is None
+        assert registry.match("/health") is None
+
+    def test_upstream_url_strips_prefix(self):
+        route = ServiceRoute("depex", "http://depex:8000/")
+
+        assert route.upstream_url("/depex/graph/pypi") == "http://depex:8000/graph/pypi"
+        assert route.upstream_url("/depex/") == "http://depex:8000/"
+
+    def test_from_config(self):
+        registry = ServiceRegistry.from_config(
+            {"scorer": {"url": "http://scorer:8000", "rate_limit": "10/second", "methods": ["get"]}}
+        )
+        route = registry.routes["scorer"]
+
+        assert route.methods == frozenset({"GET"})
+        assert str(route.limit) == "10 per 1 second"
+        assert metrics.route("/scorer/score") == "scorer"
+        assert registry.stats()["scorer"]["url"] == "http://scorer:8000"
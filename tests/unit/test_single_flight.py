@@ -0,0 +1,104 @@
+from asyncio import CancelledError, Event, create_task, gather, sleep
+
+import pytest
+
+from app.utils import SingleFlight
+
+
+class TestSingleFlight:
+    @pytest.fixture
+    def single_flight(self):
+        return SingleFlight()
+
+    @pytest.mark.asyncio
+    async def test_do_shares_concurrent_calls(self, single_flight):
+        calls = 0
+        release = Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "graph"
+
+        tasks = [create_task(single_flight.do("key", fetch)) for _ in range(3)]
+        await sleep(0)
+        release.set()
+
+        assert await gather(*tasks) == ["graph"] * 3
+        assert calls == 1
+        assert single_flight.stats() == {"in_flight": 0, "upstream_calls": 1, "saved": 2}
+
+    @pytest.mark.asyncio
+    async def test_do_separates_keys(self, single_flight):
+        async def fetch(value):
+            await sleep(0)
+            return value
+
+        results = await gather(
+            single_flight.do("a", lambda: fetch("a")),
+            single_flight.do("b", lambda: fetch("b")),
+        )
+
+        assert results == ["a", "b"]
+        assert single_flight.stats()["saved"] == 0
+
+    @pytest.mark.asyncio
+    async def test_do_runs_again_after_completion(self, single_flight):
+        async def fetch():
+            return "graph"
+
+        await single_flight.do("key", fetch)
+        await single_flight.do("key", fetch)
+
+        assert single_flight.stats()["upstream_calls"] == 2
+
+    @pytest.mark.asyncio
+    async def test_do_propagates_errors(self, single_flight):
+        async def fetch():
+            await sleep(0)
+            raise ValueError("upstream failed")
+
+        results = await gather(
+            single_flight.do("key", fetch), single_flight.do("key", fetch), return_exceptions=True
+        )
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    @pytest.mark.asyncio
+    async def test_do_keeps_call_for_remaining_waiters(self, single_flight):
+        release = Event()
+
+        async def fetch():
+            await release.wait()
+            return "graph"
+
+        first = create_task(single_flight.do("key", fetch))
+        second = create_task(single_flight.do("key", fetch))
+        await sleep(0)
+        first.cancel()
+        await sleep(0)
+        release.set()
+
+        assert await second == "graph"
+        with pytest.raises(CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_do_cancels_call_without_waiters(self, single_flight):
+        cancelled = Event()
+
+        async def fetch():
+            try:
+                await Event().wait()
+            except CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = create_task(single_flight.do("key", fetch))
+        await sleep(0)
+        waiter.cancel()
+        await sleep(0.01)
+
+        assert cancelled.is_set()
+        assert single_flight.stats()["in_flight"] == 0
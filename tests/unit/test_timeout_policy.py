@@ -0,0 +1,66 @@
+from time import perf_counter
+
+import pytest
+from fastapi import Request
+
+from app.utils import TimeoutPolicy
+
+
+def make_request(path="/depex/graph", headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [(k.encode("latin1"), v.encode("latin1")) for k, v in (headers or [])],
+        }
+    )
+
+
+class TestTimeoutPolicy:
+    def test_route_overrides_use_longest_prefix(self):
+        policy = TimeoutPolicy(
+            read=5.0,
+            route_timeouts={"/depex": {"read": 30.0}, "/depex/graph": {"read": 60.0, "connect": 1.0}},
+        )
+
+        assert policy.timeouts_for("/depex/graph/expand")["read"] == 60.0
+        assert policy.timeouts_for("/depex/graph/expand")["connect"] == 1.0
+        assert policy.timeouts_for("/depex/operation")["read"] == 30.0
+        assert policy.timeouts_for("/vexgen/tix") == {"connect": 5.0, "read": 5.0, "write": 5.0, "pool": 5.0}
+
+    def test_deadline_parses_milliseconds_and_caps_budget(self):
+        policy = TimeoutPolicy(max_deadline=1.0)
+        now = perf_counter()
+
+        assert policy.deadline(make_request()) is None
+        assert policy.deadline(make_request(headers=[("x-request-timeout-ms", "soon")])) is None
+        assert now < policy.deadline(make_request(headers=[("x-request-timeout-ms", "500")])) <= perf_counter() + 0.5
+        assert policy.deadline(make_request(headers=[("x-request-timeout-ms", "60000")])) <= perf_counter() + 1.0
+
+    @pytest.mark.parametrize("value", ["nan", "inf", "-inf", "1e999"])
+    def test_deadline_ignores_non_finite_values(self, value):
+        assert TimeoutPolicy().deadline(make_request(headers=[("x-request-timeout-ms", value)])) is None
+
+    def test_upstream_timeout_without_deadline_keeps_route_defaults(self):
+        policy = TimeoutPolicy(read=7.0)
+        headers = [(b"accept", b"application/json")]
+
+        timeout = policy.upstream_timeout(make_request(), headers)
+
+        assert timeout.read == 7.0
+        assert headers == [(b"accept", b"application/json")]
+
+    def test_upstream_timeout_clamps_to_remaining_deadline(self):
+        policy = TimeoutPolicy(read=30.0, connect=0.1)
+        request = make_request()
+        request.state.deadline = perf_counter() + 2.0
+        headers = [(b"x-request-timeout-ms", b"2000"), (b"accept", b"application/json")]
+
+        timeout = policy.upstream_timeout(request, headers)
+
+        assert timeout.read <= 2.0
+        assert timeout.connect == 0.1
+        assert [name for name, _ in headers] == [b"accept", b"x-request-timeout-ms"]
+        assert 0 < int(headers[-1][1]) <= 2000
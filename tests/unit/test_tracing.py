@@ -0,0 +1,124 @@
+from json import loads
+
+import pytest
+
+from app.tracing import (
+    FileSpanSink,
+    MemorySpanSink,
+    Trace,
+    UpstreamTrace,
+    load_sink,
+    parse_traceparent,
+)
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class TestTraceparent:
+    def test_parse_valid(self):
+        assert parse_traceparent(TRACEPARENT) == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", "01")
+
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "",
+            "garbage",
+            "ff-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+            "00-00000000000000000000000000000000-b7ad6b7169203331-01",
+            "00-0af7651916cd43dd8448eb211c80319c-0000000000000000-01",
+            "00-0AF7651916CD43DD8448EB211C80319C-b7ad6b7169203331-01",
+            f"{TRACEPARENT}-extra",
+        ],
+    )
+    def test_parse_invalid(self, value):
+        assert parse_traceparent(value) is None
+
+    def test_continues_incoming_trace(self):
+        trace = Trace(TRACEPARENT)
+
+        assert trace.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert trace.parent_span_id == "b7ad6b7169203331"
+        assert trace.traceparent.startswith("00-0af7651916cd43dd8448eb211c80319c-")
+        assert not trace.traceparent.endswith("-b7ad6b7169203331-01")
+
+    def test_starts_new_trace(self):
+        trace = Trace("invalid")
+
+        assert parse_traceparent(trace.traceparent) is not None
+        assert trace.parent_span_id is None
+        assert trace.trace_id != Trace().trace_id
+
+
+class TestTrace:
+    def test_server_timing_orders_phases(self):
+        trace = Trace()
+        trace.add("ttfb", 0.012)
+        trace.add("ratelimit", 0.0001)
+        trace.add("pool", 0.001)
+        trace.add("pool", 0.001)
+
+        timing = trace.server_timing()
+
+        assert timing.startswith("ratelimit;dur=0.10, pool;dur=2.00, ttfb;dur=12.00, total;dur=")
+
+    @pytest.mark.asyncio
+    async def test_upstream_trace_records_phases(self):
+        trace = Trace()
+        upstream_trace = UpstreamTrace(trace)
+
+        for event in (
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "http11.send_request_headers.started",
+            "http11.receive_response_headers.complete",
+            "http11.receive_response_body.complete",
+        ):
+            await upstream_trace(event, {})
+
+        assert set(trace.phases) == {"pool", "connect", "ttfb", "body"}
+
+    @pytest.mark.asyncio
+    async def test_upstream_trace_on_reused_connection(self):
+        trace = Trace()
+        upstream_trace = UpstreamTrace(trace)
+
+        await upstream_trace("http11.send_request_headers.started", {})
+        await upstream_trace("http11.receive_response_headers.complete", {})
+
+        assert set(trace.phases) == {"pool", "ttfb"}
+
+    def test_span(self):
+        trace = Trace(TRACEPARENT)
+        trace.add("ttfb", 0.005)
+
+        span = trace.span("GET", "depex", "/depex/graph", 200)
+
+        assert span["name"] == "GET depex"
+        assert span["parent_span_id"] == "b7ad6b7169203331"
+        assert span["phases"] == {"ttfb": 5.0}
+
+
+class TestSpanSinks:
+    def test_memory_sink_is_bounded(self):
+        sink = MemorySpanSink(max_spans=2)
+
+        for i in range(3):
+            sink.export({"i": i})
+
+        assert [span["i"] for span in sink.spans] == [1, 2]
+
+    def test_file_sink_writes_json_lines(self, tmp_path):
+        path = tmp_path / "spans" / "spans.jsonl"
+        sink = FileSpanSink(str(path))
+
+        sink.export({"trace_id": "a"})
+        sink.export({"trace_id": "b"})
+        sink.close()
+
+        assert [loads(line)["trace_id"] for line in path.read_text().splitlines()] == ["a", "b"]
+
+    def test_load_sink(self, tmp_path):
+        assert load_sink("none", "") is None
+        assert isinstance(load_sink("memory", ""), MemorySpanSink)
+        assert isinstance(load_sink("file", str(tmp_path / "spans.jsonl")), FileSpanSink)
+        assert isinstance(load_sink("app.tracing:MemorySpanSink", ""), MemorySpanSink)
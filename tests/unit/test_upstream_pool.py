@@ -0,0 +1,137 @@
+from asyncio import start_server
+from unittest.mock import Mock
+
+import pytest
+from httpx import MockTransport
+from httpx import Response as HTTPXResponse
+
+from app.utils import UpstreamPool
+
+
+class TestUpstreamPool:
+    @pytest.fixture
+    def upstream_pool(self):
+        return UpstreamPool(
+            max_connections=50,
+            max_keepalive_connections=10,
+            keepalive_expiry=15.0,
+            host_max_connections={"securechain-depex": 200, "http://securechain-auth:8000": 5},
+        )
+
+    def test_origin(self, upstream_pool):
+        assert upstream_pool.origin("http://Securechain-Depex:8000/graph?x=1") == "http://securechain-depex:8000"
+
+    def test_limits_for_defaults(self, upstream_pool):
+        limits = upstream_pool.limits_for("http://securechain-vexgen:8000")
+
+        assert limits.max_connections == 50
+        assert limits.max_keepalive_connections == 10
+        assert limits.keepalive_expiry == 15.0
+
+    def test_limits_for_host_override(self, upstream_pool):
+        assert upstream_pool.limits_for("http://securechain-depex:8000").max_connections == 200
+
+    def test_limits_for_origin_override(self, upstream_pool):
+        limits = upstream_pool.limits_for("http://securechain-auth:8000")
+
+        assert limits.max_connections == 5
+        assert limits.max_keepalive_connections == 5
+
+    def test_http2_falls_back_without_h2(self, mocker):
+        mocker.patch("app.domain.upstream_pool.find_spec", return_value=None)
+
+        assert UpstreamPool(http2=True).http2 is False
+
+    @pytest.mark.asyncio
+    async def test_client_for_reuses_client_per_origin(self, upstream_pool):
+        auth = upstream_pool.client_for("http://securechain-auth:8000/login")
+
+        assert upstream_pool.client_for("http://securechain-auth:8000/signup") is auth
+        assert upstream_pool.client_for("http://securechain-depex:8000/graph") is not auth
+        assert len(upstream_pool.clients) == 2
+        await upstream_pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_aclose_recreates_clients(self, upstream_pool):
+        client = upstream_pool.client_for("http://securechain-auth:8000")
+
+        await upstream_pool.aclose()
+
+        assert client.is_closed
+        assert upstream_pool.clients == {}
+        assert upstream_pool.client_for("http://securechain-auth:8000") is not client
+        await upstream_pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_client_uses_injected_transport(self):
+        transport = MockTransport(lambda request: HTTPXResponse(200, json={"ok": True}))
+        upstream_pool = UpstreamPool(transport=transport)
+
+        response = await upstream_pool.client_for("http://test.com").get("http://test.com/health")
+
+        assert response.json() == {"ok": True}
+        await upstream_pool.aclose()
+
+    @pytest.mark.asyncio
+    async def test_client_does_not_replay_upstream_cookies(self):
+        cookies = []
+
+        def handler(request):
+            cookies.append(request.headers.get("cookie"))
+            return HTTPXResponse(200, headers={"set-cookie": "access_token=ALICE; Path=/"})
+
+        upstream_pool = UpstreamPool(transport=MockTransport(handler))
+        client = upstream_pool.client_for("http://test.com")
+
+        await client.get("http://test.com/auth/login")
+        await client.get("http://test.com/graph")
+
+        assert cookies == [None, None]
+        assert not client.cookies
+        await upstream_pool.aclose()
+
+    def test_stats(self, upstream_pool):
+        idle = Mock(is_idle=Mock(return_value=True), is_closed=Mock(return_value=False))
+        busy = Mock(is_idle=Mock(return_value=False), is_closed=Mock(return_value=False))
+        queued = Mock(is_queued=Mock(return_value=True))
+        assigned = Mock(is_queued=Mock(return_value=False))
+        transport = Mock()
+        transport._pool.connections = [idle, busy]
+        transport._pool._requests = [queued, assigned]
+        upstream_pool.transports["http://securechain-depex:8000"] = transport
+
+        stats = upstream_pool.stats()
+
+        assert stats == {
+            "http://securechain-depex:8000": {"connections": 2, "in_use": 1, "idle": 1, "waiting": 1}
+        }
+
+    @pytest.mark.asyncio
+    async def test_stats_reads_real_httpx_transport(self):
+        async def serve(reader, writer):
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: 2\r\n\r\nok")
+                await writer.drain()
+
+        server = await start_server(serve, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        upstream_pool = UpstreamPool()
+        try:
+            response = await upstream_pool.client_for(url).get(f"{url}/health")
+            stats = upstream_pool.stats()[upstream_pool.origin(url)]
+        finally:
+            await upstream_pool.aclose()
+            server.close()
+
+        assert response.text == "ok"
+        assert stats == {"connections": 1, "in_use": 0, "idle": 1, "waiting": 0}
+
+    def test_stats_without_pool(self, upstream_pool):
+        upstream_pool.transports["http://test.com"] = MockTransport(lambda request: HTTPXResponse(200))
+
+        assert upstream_pool.stats()["http://test.com"] == {
+            "connections": 0,
+            "in_use": 0,
+            "idle": 0,
+            "waiting": 0,
+        }